@@ -0,0 +1,276 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from resume_parser.parser import ParseError
+from resume_parser.worker_pool import ParseBusy, parse_resume
+from resume_parser.parsed_resume import ParsedResume
+from llm_modules.formatter import aformat_resume_sections_with_llm, formatting_succeeded
+from llm_modules.model_router import get_routing_stats
+from llm_modules.jd_comparator import acompare_resume_with_jd
+from llm_modules.bullet_rewriter import aoptimize_resume_bullets
+from llm_modules.keyword_analyzer import aanalyze_ats_keywords
+from llm_modules.cover_letter import agenerate_cover_letter, agenerate_cover_letter_variants
+from utils.pipeline import cover_letter_succeeded
+from utils.jd_fingerprint import similar_jd_result
+from utils.metrics import render_prometheus
+from utils.result_store import get_result, put_result, is_cacheable, hash_bytes, hash_text, hash_payload
+
+API_LLM_WORKERS = int(os.getenv("API_LLM_WORKERS", "32"))
+API_STAGE_TIMEOUT = float(os.getenv("API_STAGE_TIMEOUT", "120"))
+
+app = FastAPI(title="AI Resume Tailor API")
+
+_llm_executor = ThreadPoolExecutor(max_workers=API_LLM_WORKERS, thread_name_prefix="llm-call")
+
+class SectionsRequest(BaseModel):
+    sections: Dict[str, str]
+
+class ResumeJDRequest(BaseModel):
+    resume: Dict[str, str]
+    job_description: str
+
+class CoverLetterRequest(BaseModel):
+    formatted_resume: Dict[str, str]
+    # Parsed sections (as returned by /parse); when given, the prompt sends the shared resume digest
+    resume: Optional[Dict[str, str]] = None
+    job_description: str
+    candidate_name: str = "Candidate"
+    company_name: str = "the company"
+    role_title: str = "this position"
+    tone: str = "professional"
+    length: str = "standard"
+
+class CoverLetterVariantsRequest(BaseModel):
+    formatted_resume: Dict[str, str]
+    resume: Optional[Dict[str, str]] = None
+    job_description: str
+    candidate_name: str = "Candidate"
+    company_name: str = "the company"
+    role_title: str = "this position"
+    tones: List[str] = ["professional"]
+    lengths: List[str] = ["standard"]
+
+async def run_parse(resume_bytes: bytes) -> ParsedResume:
+    """Parses a resume on the parse worker pool, reusing a stored result when available"""
+    resume_hash = hash_bytes(resume_bytes)
+    loop = asyncio.get_running_loop()
+
+    cached = await loop.run_in_executor(_llm_executor, get_result, "parsed", resume_hash)
+    if cached is not None:
+        return ParsedResume.from_payload(cached)
+
+    try:
+        parsed = await loop.run_in_executor(_llm_executor, parse_resume, resume_bytes)
+    except ParseBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ParseError as e:
+        raise HTTPException(status_code=413 if e.reason in ("size", "pages") else 422, detail=str(e))
+    if parsed:
+        await loop.run_in_executor(_llm_executor, put_result, "parsed", resume_hash, parsed.to_payload())
+    return parsed
+
+async def run_stage(kind: str, stage, *args, resume_hash: str, jd_hash: str = "", variant: str = "", cacheable=is_cacheable, fallback=None):
+    """Awaits an async LLM stage on the event loop, reusing and persisting stored results.
+
+    Only the short result store reads and writes use the thread pool; a stage that
+    exceeds API_STAGE_TIMEOUT is cancelled and reported as a 504. fallback is a blocking
+    lookup tried after the exact key misses, e.g. a result for a near-identical JD.
+    """
+    loop = asyncio.get_running_loop()
+    cached = await loop.run_in_executor(_llm_executor, get_result, kind, resume_hash, jd_hash, variant)
+    if cached is not None:
+        return cached
+    if fallback is not None:
+        reused = await loop.run_in_executor(_llm_executor, fallback)
+        if reused is not None:
+            await loop.run_in_executor(_llm_executor, put_result, kind, resume_hash, reused, jd_hash, variant)
+            return reused
+
+    try:
+        result = await stage(*args, timeout=API_STAGE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"{kind} did not finish within {API_STAGE_TIMEOUT:g}s")
+    if cacheable(result):
+        await loop.run_in_executor(_llm_executor, put_result, kind, resume_hash, result, jd_hash, variant)
+    return result
+
+@app.post("/parse")
+async def parse_endpoint(resume: UploadFile = File(...)) -> dict:
+    resume_bytes = await resume.read()
+    if not resume_bytes:
+        raise HTTPException(status_code=400, detail="Empty resume file")
+    parsed = await run_parse(resume_bytes)
+    return {"sections": parsed.to_dict(), "contact": parsed.contact}
+
+@app.post("/format")
+async def format_endpoint(request: SectionsRequest) -> dict:
+    formatted = await run_stage(
+        "formatted", aformat_resume_sections_with_llm, request.sections,
+        resume_hash=hash_payload(request.sections), cacheable=formatting_succeeded
+    )
+    return {"formatted": formatted}
+
+def similar_comparison(resume_hash: str, jd_hash: str, job_description: str):
+    return lambda: similar_jd_result("jd_comparison", resume_hash, jd_hash, job_description)
+
+@app.post("/compare")
+async def compare_endpoint(request: ResumeJDRequest) -> dict:
+    resume_hash, jd_hash = hash_payload(request.resume), hash_text(request.job_description)
+    return await run_stage(
+        "jd_comparison", acompare_resume_with_jd, request.resume, request.job_description,
+        resume_hash=resume_hash, jd_hash=jd_hash, fallback=similar_comparison(resume_hash, jd_hash, request.job_description)
+    )
+
+@app.post("/ats")
+async def ats_endpoint(request: ResumeJDRequest) -> dict:
+    """Scores from the stored comparison when /compare already ran for the same inputs"""
+    resume_hash, jd_hash = hash_payload(request.resume), hash_text(request.job_description)
+    comparison = await run_stage(
+        "jd_comparison", acompare_resume_with_jd, request.resume, request.job_description,
+        resume_hash=resume_hash, jd_hash=jd_hash, fallback=similar_comparison(resume_hash, jd_hash, request.job_description)
+    )
+    return await run_stage(
+        "ats_analysis", aanalyze_ats_keywords, request.resume, request.job_description, comparison,
+        resume_hash=resume_hash, jd_hash=jd_hash
+    )
+
+@app.post("/bullets")
+async def bullets_endpoint(request: ResumeJDRequest) -> dict:
+    return await run_stage(
+        "bullet_optimization", aoptimize_resume_bullets, request.resume, request.job_description,
+        resume_hash=hash_payload(request.resume), jd_hash=hash_text(request.job_description)
+    )
+
+@app.post("/cover-letter")
+async def cover_letter_endpoint(request: CoverLetterRequest) -> dict:
+    letter = await run_stage(
+        "cover_letter", partial(agenerate_cover_letter, parsed_resume=request.resume),
+        request.formatted_resume, request.job_description, request.candidate_name,
+        request.company_name, request.role_title, request.tone, request.length,
+        resume_hash=hash_payload(request.formatted_resume),
+        jd_hash=hash_text(request.job_description),
+        variant=hash_payload([request.candidate_name, request.company_name, request.role_title, request.tone, request.length]),
+        cacheable=cover_letter_succeeded
+    )
+    return {"cover_letter": letter}
+
+@app.post("/cover-letter/variants")
+async def cover_letter_variants_endpoint(request: CoverLetterVariantsRequest) -> dict:
+    """Generates every tone/length combination concurrently from one shared context"""
+    variants = [(tone, length) for tone in request.tones for length in request.lengths]
+    try:
+        letters = await agenerate_cover_letter_variants(
+            request.formatted_resume, request.job_description, request.candidate_name,
+            request.company_name, request.role_title, variants, timeout=API_STAGE_TIMEOUT,
+            parsed_resume=request.resume
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"cover letter variants did not finish within {API_STAGE_TIMEOUT:g}s")
+    return {"variants": letters}
+
+async def run_pipeline_stages(parsed: ParsedResume, job_description: str, resume_hash: str, jd_hash: str, letter: Optional[tuple]) -> dict:
+    """The stage DAG of utils.pipeline as tasks on the event loop; each stage starts once its inputs are ready.
+
+    letter holds (candidate_name, company_name, role_title, tone, length), or None to skip the cover letter.
+    """
+    async def ats() -> dict:
+        return await run_stage(
+            "ats_analysis", aanalyze_ats_keywords, None, job_description, await stages["comparison"],
+            resume_hash=resume_hash, jd_hash=jd_hash
+        )
+
+    async def bullets() -> dict:
+        return await run_stage(
+            "bullet_optimization", aoptimize_resume_bullets, await stages["formatted"], job_description,
+            resume_hash=resume_hash, jd_hash=jd_hash
+        )
+
+    async def cover_letter() -> str:
+        return await run_stage(
+            "cover_letter", partial(agenerate_cover_letter, parsed_resume=parsed),
+            await stages["formatted"], job_description, *letter,
+            resume_hash=resume_hash, jd_hash=jd_hash, variant=hash_payload(list(letter)), cacheable=cover_letter_succeeded
+        )
+
+    stages = {
+        "formatted": asyncio.ensure_future(run_stage(
+            "formatted", aformat_resume_sections_with_llm, parsed, resume_hash=resume_hash, cacheable=formatting_succeeded
+        )),
+        "comparison": asyncio.ensure_future(run_stage(
+            "jd_comparison", acompare_resume_with_jd, parsed, job_description,
+            resume_hash=resume_hash, jd_hash=jd_hash, fallback=similar_comparison(resume_hash, jd_hash, job_description)
+        )),
+    }
+    stages["ats"] = asyncio.ensure_future(ats())
+    stages["bullets"] = asyncio.ensure_future(bullets())
+    if letter is not None:
+        stages["cover_letter"] = asyncio.ensure_future(cover_letter())
+    try:
+        results = await asyncio.gather(*stages.values())
+    finally:
+        # A failed or timed-out stage stops the rest instead of leaving them running unowned
+        for task in stages.values():
+            task.cancel()
+    return dict(zip(stages, results))
+
+@app.post("/pipeline")
+async def pipeline_endpoint(
+    resume: UploadFile = File(...),
+    job_description: str = Form(...),
+    candidate_name: str = Form("Candidate"),
+    company_name: str = Form("the company"),
+    role_title: str = Form("this position"),
+    tone: str = Form("professional"),
+    include_cover_letter: bool = Form(True),
+) -> dict:
+    """Parses on the parse worker pool, then runs the stage DAG so independent stages overlap.
+
+    The same result store keys as the UI pipeline are used, so either side reuses the other's results.
+    """
+    resume_bytes = await resume.read()
+    if not resume_bytes:
+        raise HTTPException(status_code=400, detail="Empty resume file")
+
+    resume_hash = hash_bytes(resume_bytes)
+    jd_hash = hash_text(job_description)
+
+    parsed = await run_parse(resume_bytes)
+    if not parsed:
+        raise HTTPException(status_code=422, detail="No sections could be parsed from the resume")
+
+    letter = (candidate_name, company_name, role_title, tone, "standard") if include_cover_letter else None
+    try:
+        results = await asyncio.wait_for(
+            run_pipeline_stages(parsed, job_description, resume_hash, jd_hash, letter), API_STAGE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"pipeline did not finish within {API_STAGE_TIMEOUT:g}s")
+
+    response = {
+        "parsed": parsed.to_dict(),
+        "contact": parsed.contact,
+        "formatted": results["formatted"],
+        "jd_comparison": results["comparison"],
+        "ats_analysis": results["ats"],
+        "bullet_optimization": results["bullets"],
+    }
+    if include_cover_letter:
+        response["cover_letter"] = results["cover_letter"]
+    return response
+
+@app.get("/routing-stats")
+async def routing_stats_endpoint() -> dict:
+    return get_routing_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> str:
+    return render_prometheus()
+
+@app.get("/health")
+async def health_endpoint() -> dict:
+    return {"status": "ok"}
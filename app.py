@@ -1,264 +1,455 @@
 import streamlit as st
-import tempfile
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import os
-from io import BytesIO
-from docx import Document
-from fpdf import FPDF
-from resume_parser.parser import parse_resume_sections, initialize_analyzer
-from llm_modules.formatter import format_resume_sections_with_llm
-from llm_modules.jd_comparator import compare_resume_with_jd, generate_interview_focus_areas
-from llm_modules.bullet_rewriter import optimize_resume_bullets, get_top_optimized_bullets
-from llm_modules.keyword_analyzer import analyze_ats_keywords
-from utils.field_extractor import extract_fields_from_resume
-from llm_modules.cover_letter import generate_cover_letter
+import time
+import uuid
+from functools import wraps
+from resume_parser.parser import ParseError
+from resume_parser.worker_pool import parse_pool, parse_resume
+from resume_parser.parsed_resume import ParsedResume
+from llm_modules.formatter import format_resume_sections_with_llm, formatting_succeeded
+from llm_modules.jd_comparator import generate_interview_focus_areas
+from llm_modules.cover_letter import variant_key
+from utils.job_queue import get_job
+from utils.result_store import get_result, get_or_compute, hash_bytes, hash_text, hash_payload
+from utils.exporter import (
+    EXPORT_FORMATS, render_export, render_bundle, bundle_key, submit_export_batch, get_cached_export,
+    export_file_name, export_mime, build_tailored_resume
+)
+from utils.stage_jobs import (
+    job_key, submit_comparison, submit_ats_report, submit_cover_letters, cover_letter_variant_hash,
+    start_prefetch, cancel_prefetch
+)
+from utils.admission import AdmissionRejected, controller as admission
+from utils.metrics import start_metrics_server
+from utils.sessions import SessionArtifacts, track_session
+
+JOB_POLL_INTERVAL = 1.0
+STREAM_POLL_INTERVAL = 0.3
+EXPORT_INLINE_LIMIT = 4
+# Set only behind an auth proxy that overwrites client-sent X-Forwarded-Email/-User headers
+TRUST_FORWARDED_USER = os.getenv("TRUST_FORWARDED_USER", "0") == "1"
 
 st.set_page_config(page_title="AI Resume Tailor", layout="wide")
 
-st.sidebar.title("Navigation")
-section = st.sidebar.radio(
-    "Go to",
-    [
-        "Upload Resume & JD",
-        "Resume Contents",
-        "Resume vs JD Analysis",
-        "ATS Report with Resume Suggestions",
-        "Generate Cover Letter",
-    ]
-)
+start_metrics_server()
+parse_pool()
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+artifacts = SessionArtifacts(st.session_state, codecs={"parsed": (ParsedResume.to_payload, ParsedResume.from_payload)})
+
+def current_owner() -> tuple:
+    """(user_id, session_id) used for admission control.
+
+    The signed-in user is read from X-Forwarded-Email / X-Forwarded-User only with
+    TRUST_FORWARDED_USER=1, since any client can send those headers unless a proxy strips them.
+    """
+    user_id = None
+    if TRUST_FORWARDED_USER:
+        try:
+            headers = st.context.headers
+            user_id = headers.get("X-Forwarded-Email") or headers.get("X-Forwarded-User")
+        except AttributeError:
+            pass
+    session_id = st.session_state["session_id"]
+    return (user_id or session_id, session_id)
+
+def submit_admitted(submit, *args) -> str:
+    """Submits a stage job for the current owner, showing a warning when their line is full"""
+    try:
+        return submit(*args, owner=current_owner())
+    except AdmissionRejected as e:
+        st.warning(str(e))
+        return None
+
+def wait_for_job(job: dict, poll_interval: float = JOB_POLL_INTERVAL) -> None:
+    """Shows job progress and polls until the background job finishes"""
+    st.progress(job["progress"], text=job["message"])
+    if job.get("queue_position"):
+        st.caption("Requests are admitted in turn across users so everyone gets a fair share.")
+    st.caption(f"Job ID: `{job['id']}` - you can leave this page and come back later.")
+    time.sleep(poll_interval)
+    st.rerun(scope="fragment")
+
+def render_matched_skill(match: dict) -> None:
+    st.markdown(f"""
+    - **{match.get('skill', '')}**  
+      JD: `{match.get('jd_term', '')}` | Resume: `{match.get('resume_term', '')}`  
+      Match Type: `{match.get('match_type', '')}` | Confidence: `{match.get('confidence', '')}`  
+      Reason: {match.get('reasoning', '')}
+    """)
+
+def render_skill_gap(gap: dict) -> None:
+    st.markdown(f"""
+    - **{gap.get('skill', '')}** ({gap.get('importance', '')}, {gap.get('category', '')})  
+      Alternatives: `{', '.join(gap.get('alternatives', []))}`  
+    """)
+
+def page_fragment(render):
+    """Runs a page as a fragment, so its widgets rerun the page instead of the whole script"""
+    @st.fragment
+    @wraps(render)
+    def fragment(*args):
+        track_session(st.session_state["session_id"], st.session_state, get_script_run_ctx().session_state)
+        render(*args)
+    return fragment
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def tailored_resume_text(formatted_ref: str, optimization_ref: str, _formatted: dict, _optimization_results: dict) -> str:
+    """build_tailored_resume, keyed by the artifact hashes of its inputs instead of hashing them on every rerun"""
+    return build_tailored_resume(_formatted, _optimization_results)
+
+@st.fragment
+def tailored_resume_export(tailored_resume: str) -> None:
+    resume_format = st.radio(
+        "Choose export format",
+        list(EXPORT_FORMATS),
+        horizontal=True,
+        index=0,
+        key="tailored_resume_format"
+    )
+    st.download_button(
+        label=f"Download Tailored Resume as {resume_format}",
+        data=render_export(tailored_resume, resume_format),
+        file_name=export_file_name("tailored_resume", resume_format),
+        mime=export_mime(resume_format)
+    )
+
+@st.fragment
+def document_exports(documents: dict) -> None:
+    export_format = st.radio(
+        "Choose export format",
+        list(EXPORT_FORMATS),
+        horizontal=True,
+        index=0,
+        key="cover_letter_format"
+    )
+
+    st.download_button(
+        label=f"Download as {export_format}",
+        data=render_export(documents["cover_letter"], export_format),
+        file_name=export_file_name("cover_letter", export_format),
+        mime=export_mime(export_format)
+    )
+
+    formats = list(EXPORT_FORMATS)
+
+    # Every document in every format is only rendered once the user asks for the ZIP
+    requested = bundle_key(documents, formats)
+    if st.button("Prepare all documents as ZIP"):
+        st.session_state["export_bundle"] = requested
+    if st.session_state.get("export_bundle") != requested:
+        return
+
+    if len(documents) * len(formats) <= EXPORT_INLINE_LIMIT:
+        bundle = render_bundle(documents, formats)
+    else:
+        export_job = get_job(submit_export_batch(documents, formats))
+        if export_job["status"] == "failed":
+            st.error(f"Export failed: {export_job['error']}")
+            bundle = None
+        elif export_job["status"] != "done":
+            wait_for_job(export_job)
+        else:
+            bundle = get_cached_export(export_job["result"]) or render_bundle(documents, formats)
+
+    if bundle:
+        st.download_button(
+            label="Download all documents (ZIP)",
+            data=bundle,
+            file_name="application_documents.zip",
+            mime="application/zip"
+        )
+
+@page_fragment
+def upload_page():
+    st.title("Upload Resume and Job Description")
+
+    # File uploaders OUTSIDE the form
+    uploaded_resume = st.file_uploader("Upload Resume (PDF)", type=["pdf"], key="resume_file")
+
+    jd_input_method = st.radio(
+        "How would you like to provide the Job Description?",
+        ["Paste Job Description", "Upload JD File (.txt)"],
+        index=0
+    )
+
+    jd_text_input = ""
+    jd_provided = False
+
+    if jd_input_method == "Upload JD File (.txt)":
+        uploaded_jd = st.file_uploader(
+            "Upload Job Description File (.txt)", 
+            type=["txt"], 
+            key="jd_file"
+        )
+        if uploaded_jd:
+            jd_text_input = uploaded_jd.read().decode("utf-8")
+            jd_provided = True
+            st.success("Job Description file uploaded successfully!")
+
+    # Form only for the text area and submit button
+    with st.form("jd_resume_form"):
+        if jd_input_method == "Paste Job Description":
+            jd_text_input = st.text_area(
+                "Paste the Job Description below",
+                height=250,
+                placeholder="Paste the job description you're applying to...",
+                key="jd_text_area"
+            )
+            jd_provided = bool(jd_text_input.strip())
+
+        submitted = st.form_submit_button("Start Processing")
+
+    if uploaded_resume and jd_provided and submitted:
+        with st.spinner("Parsing and formatting your resume..."):
+            resume_bytes = uploaded_resume.read()
+            resume_hash = hash_bytes(resume_bytes)
+
+            try:
+                parsed = ParsedResume.from_payload(get_or_compute(
+                    "parsed", lambda: parse_resume(resume_bytes).to_payload(), resume_hash
+                ))
+            except ParseError as e:
+                st.error(str(e))
+                return
+
+            degraded = admission.saturated() and get_result("formatted", resume_hash) is None
+            formatted = get_or_compute(
+                "formatted",
+                lambda: format_resume_sections_with_llm(parsed, local_only=degraded),
+                resume_hash,
+                cacheable=lambda result: formatting_succeeded(result) and not degraded
+            )
+            if degraded:
+                st.info("The service is busy, so your resume was formatted locally without AI polish. Upload again later for the full formatting.")
+
+            jd_text = jd_text_input.strip()
+            artifacts.update({"parsed": parsed, "formatted": formatted, "jd_text": jd_text})
+            st.session_state["resume_hash"] = resume_hash
+            st.session_state["jd_hash"] = hash_text(jd_text)
+            for stale_key in ["jd_comparison_job", "ats_job"]:
+                st.session_state.pop(stale_key, None)
+            for stale_artifact in ["bullet_optimization_result", "ats_analysis_result", "tailored_resume", "cover_letter_variants", "cover_letter"]:
+                artifacts.discard(stale_artifact)
+
+            previous_prefetch = st.session_state.pop("prefetch", None)
+            if previous_prefetch and previous_prefetch["inputs"] != job_key(resume_hash, st.session_state["jd_hash"]):
+                cancel_prefetch(previous_prefetch, current_owner())
+
+            if st.session_state.get("prefetch_enabled") and not degraded:
+                try:
+                    prefetch = start_prefetch(
+                        parsed, formatted, jd_text, resume_hash, st.session_state["jd_hash"],
+                        owner=current_owner()
+                    )
+                except AdmissionRejected as e:
+                    st.info(f"Analyses were not started in the background ({e}). Run them from their pages.")
+                else:
+                    st.session_state["prefetch"] = prefetch
+                    st.session_state["jd_comparison_job"] = prefetch["jd_comparison_job"]
+                    st.session_state["ats_job"] = prefetch["ats_job"]
+
+            st.session_state["extracted_fields"] = parsed.contact
+
+        st.success("Resume and Job Description processed successfully.")
 
-if "parsed" not in st.session_state:
-    st.session_state["parsed"] = None
-    st.session_state["formatted"] = None
-    st.session_state["jd_text"] = None
-
-if section == "Upload Resume & JD":
-   st.title("Upload Resume and Job Description")
-
-   # File uploaders OUTSIDE the form
-   uploaded_resume = st.file_uploader("Upload Resume (PDF)", type=["pdf"], key="resume_file")
-
-   jd_input_method = st.radio(
-       "How would you like to provide the Job Description?",
-       ["Paste Job Description", "Upload JD File (.txt)"],
-       index=0
-   )
-
-   jd_text_input = ""
-   jd_provided = False
-
-   if jd_input_method == "Upload JD File (.txt)":
-       uploaded_jd = st.file_uploader(
-           "Upload Job Description File (.txt)", 
-           type=["txt"], 
-           key="jd_file"
-       )
-       if uploaded_jd:
-           jd_text_input = uploaded_jd.read().decode("utf-8")
-           jd_provided = True
-           st.success("Job Description file uploaded successfully!")
-
-   # Form only for the text area and submit button
-   with st.form("jd_resume_form"):
-       if jd_input_method == "Paste Job Description":
-           jd_text_input = st.text_area(
-               "Paste the Job Description below",
-               height=250,
-               placeholder="Paste the job description you're applying to...",
-               key="jd_text_area"
-           )
-           jd_provided = bool(jd_text_input.strip())
-
-       submitted = st.form_submit_button("Start Processing")
-
-   if uploaded_resume and jd_provided and submitted:
-       with st.spinner("Parsing and formatting your resume..."):
-           with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-               tmp_file.write(uploaded_resume.read())
-               resume_path = tmp_file.name
-
-           analyzer = initialize_analyzer()
-           parsed = parse_resume_sections(resume_path, analyzer)
-           formatted = format_resume_sections_with_llm(parsed)
-
-           st.session_state["parsed"] = parsed
-           st.session_state["formatted"] = formatted
-           st.session_state["jd_text"] = jd_text_input.strip()
-
-           raw_resume_text = "\n".join(parsed.values())
-           st.session_state["extracted_fields"] = extract_fields_from_resume(raw_resume_text)
-
-       st.success("Resume and Job Description processed successfully.")
-
-   elif uploaded_resume and not jd_provided and submitted:
-       st.info("Please provide the Job Description to continue.")
-
-if section == "Resume Contents":
+    elif uploaded_resume and not jd_provided and submitted:
+        st.info("Please provide the Job Description to continue.")
+
+@page_fragment
+def resume_contents_page():
     st.title("Resume Contents")
 
-    formatted_sections = st.session_state.get("formatted")
+    formatted_sections = artifacts.get("formatted")
     if formatted_sections:
         for formatted_text in formatted_sections.values():
             st.markdown(formatted_text, unsafe_allow_html=True)
     else:
         st.warning("Please upload and process your resume first.")
 
-if section == "Resume vs JD Analysis":
+@page_fragment
+def analysis_page():
     st.title("Resume vs Job Description Match Report")
 
-    if st.session_state.get("parsed") and st.session_state.get("jd_text"):
-        if "jd_comparison_triggered" not in st.session_state:
-            st.session_state["jd_comparison_triggered"] = False
+    if artifacts.get("parsed") and artifacts.get("jd_text"):
+        stored = get_result("jd_comparison", st.session_state["resume_hash"], st.session_state["jd_hash"])
+        job = get_job(st.session_state.get("jd_comparison_job"))
+        if stored is not None:
+            job = {"status": "done", "result": stored}
 
-        if not st.session_state["jd_comparison_triggered"]:
+        failed_result = job is not None and job["status"] == "done" and "error" in job["result"]
+        if job is None or job["status"] in ("failed", "cancelled") or failed_result:
+            if failed_result:
+                st.error("Error during JD comparison.")
+                st.code(job["result"].get("raw_response", "No response"), language="json")
+            elif job is not None and job["status"] == "failed":
+                st.error(f"Previous analysis failed: {job['error']}")
             if st.button("Run Resume vs JD Analysis"):
-                st.session_state["jd_comparison_triggered"] = True
-                st.rerun()
+                job_id = submit_admitted(
+                    submit_comparison, artifacts["parsed"], artifacts["jd_text"],
+                    st.session_state["resume_hash"], st.session_state["jd_hash"]
+                )
+                if job_id:
+                    st.session_state["jd_comparison_job"] = job_id
+                    st.rerun(scope="fragment")
+        elif job["status"] != "done":
+            partial = job.get("partial") or {}
+            if partial:
+                st.info("Analysis in progress - results appear as they arrive.")
+            if partial.get("matched_skills"):
+                st.subheader("Matched Skills")
+                for match in partial["matched_skills"]:
+                    render_matched_skill(match)
+            if partial.get("missing_critical"):
+                st.subheader("Critical Skill Gaps")
+                for gap in partial["missing_critical"]:
+                    render_skill_gap(gap)
+            wait_for_job(job, STREAM_POLL_INTERVAL if job["status"] == "running" else JOB_POLL_INTERVAL)
         else:
-            spinner_container = st.empty()
-            with spinner_container:
-                with st.spinner("Analyzing Resume vs Job Description..."):
-                    result = compare_resume_with_jd(st.session_state["parsed"], st.session_state["jd_text"])
-
-            spinner_container.empty()
-            st.session_state["jd_comparison_triggered"] = False
-
-            if "error" in result:
-                st.error("Error during JD comparison.")
-                st.code(result.get("raw_response", "No response"), language="json")
+            result = job["result"]
+            oa = result["overall_assessment"]
+            st.subheader("Executive Summary")
+            st.markdown(f"""
+            **Match Score:** {oa['match_percentage']}%  
+            **Fit Level:** {oa['fit_level'].capitalize()}  
+            **Recommendation:** {oa['recommendation'].capitalize()}  
+            **Summary:** {oa['reasoning']}
+            """)
+
+            st.divider()
+            st.subheader("Key Strengths")
+            for strength in oa["key_strengths"]:
+                st.markdown(f"- {strength}")
+
+            st.subheader("Critical Skill Gaps")
+            if result["missing_critical"]:
+                for gap in result["missing_critical"]:
+                    render_skill_gap(gap)
             else:
-                oa = result["overall_assessment"]
-                st.subheader("Executive Summary")
-                st.markdown(f"""
-                **Match Score:** {oa['match_percentage']}%  
-                **Fit Level:** {oa['fit_level'].capitalize()}  
-                **Recommendation:** {oa['recommendation'].capitalize()}  
-                **Summary:** {oa['reasoning']}
-                """)
-
-                st.divider()
-                st.subheader("Key Strengths")
-                for strength in oa["key_strengths"]:
-                    st.markdown(f"- {strength}")
+                st.markdown("No major gaps identified.")
 
-                st.subheader("Critical Skill Gaps")
-                if result["missing_critical"]:
-                    for gap in result["missing_critical"]:
-                        st.markdown(f"""
-                        - **{gap['skill']}** ({gap['importance']}, {gap['category']})  
-                          Alternatives: `{', '.join(gap.get('alternatives', []))}`  
-                        """)
-                else:
-                    st.markdown("No major gaps identified.")
+            st.subheader("Matched Skills")
+            for match in result["matched_skills"]:
+                render_matched_skill(match)
 
-                st.subheader("Matched Skills")
-                for match in result["matched_skills"]:
-                    st.markdown(f"""
-                    - **{match['skill']}**  
-                      JD: `{match['jd_term']}` | Resume: `{match['resume_term']}`  
-                      Match Type: `{match['match_type']}` | Confidence: `{match['confidence']}`  
-                      Reason: {match['reasoning']}
-                    """)
-
-                st.subheader("Additional Resume Strengths")
-                if result["resume_strengths"]:
-                    for s in result["resume_strengths"]:
-                        st.markdown(f"- **{s['skill']}** ({s['relevance']}) - {s['value_add']}")
-                else:
-                    st.markdown("None found.")
-
-                st.subheader("Domain Alignment")
-                domain = result["domain_insights"]
-                st.markdown(f"""
-                - Resume Domain: `{domain['resume_domain']}`  
-                - JD Domain: `{domain['jd_domain']}`  
-                - Cross-Domain Applicability: `{domain['cross_domain_applicability']}`  
-                - Notes: {domain['domain_specific_notes']}
-                """)
-
-                st.subheader("Suggested Interview Focus Areas")
-                focus_areas = generate_interview_focus_areas(result)
-                if focus_areas:
-                    for item in focus_areas:
-                        st.markdown(f"- {item}")
-                else:
-                    st.markdown("None generated.")
+            st.subheader("Additional Resume Strengths")
+            if result["resume_strengths"]:
+                for s in result["resume_strengths"]:
+                    st.markdown(f"- **{s['skill']}** ({s['relevance']}) - {s['value_add']}")
+            else:
+                st.markdown("None found.")
+
+            st.subheader("Domain Alignment")
+            domain = result["domain_insights"]
+            st.markdown(f"""
+            - Resume Domain: `{domain['resume_domain']}`  
+            - JD Domain: `{domain['jd_domain']}`  
+            - Cross-Domain Applicability: `{domain['cross_domain_applicability']}`  
+            - Notes: {domain['domain_specific_notes']}
+            """)
+
+            st.subheader("Suggested Interview Focus Areas")
+            focus_areas = generate_interview_focus_areas(result)
+            if focus_areas:
+                for item in focus_areas:
+                    st.markdown(f"- {item}")
+            else:
+                st.markdown("None generated.")
     else:
         st.warning("Please upload your resume and JD.")
 
-if section == "ATS Report with Resume Suggestions":
+@page_fragment
+def ats_report_page():
     st.title("ATS Report with Resume Suggestions")
-    if "bullet_optimization_triggered" not in st.session_state:
-        st.session_state["bullet_optimization_triggered"] = False
-    if "bullet_optimization_result" not in st.session_state:
-        st.session_state["bullet_optimization_result"] = None
-    if "ats_analysis_result" not in st.session_state:
-        st.session_state["ats_analysis_result"] = None
-
-    if st.session_state.get("formatted") and st.session_state.get("jd_text"):
-        if not st.session_state["bullet_optimization_triggered"]:
-            if st.button("Run Optimization"):
-                st.session_state["bullet_optimization_triggered"] = True
-                st.rerun()
-        else:
-            with st.spinner("Analyzing resume and optimizing bullets..."):
-                if not st.session_state["bullet_optimization_result"]:
-                    st.session_state["bullet_optimization_result"] = optimize_resume_bullets(
-                        st.session_state["formatted"], st.session_state["jd_text"]
-                    )
-                if not st.session_state["ats_analysis_result"]:
-                    st.session_state["ats_analysis_result"] = analyze_ats_keywords(
-                        st.session_state["formatted"], st.session_state["jd_text"]
-                    )
-
-            optimization_results = st.session_state["bullet_optimization_result"]
-            ats_data = st.session_state["ats_analysis_result"]
-
+    if artifacts.get("formatted") and artifacts.get("jd_text"):
+        stored_bullets = get_result("bullet_optimization", st.session_state["resume_hash"], st.session_state["jd_hash"])
+        stored_ats = get_result("ats_analysis", st.session_state["resume_hash"], st.session_state["jd_hash"])
+        job = get_job(st.session_state.get("ats_job"))
+        if stored_bullets is not None and stored_ats is not None:
+            job = {"status": "done", "result": {
+                "bullet_optimization_result": stored_bullets, "ats_analysis_result": stored_ats
+            }}
+
+        failed_result = None
+        if job is not None and job["status"] == "done":
+            optimization_results = job["result"]["bullet_optimization_result"]
+            ats_data = job["result"]["ats_analysis_result"]
             if "error" in optimization_results:
-                st.error("Bullet optimization failed.")
-                st.code(optimization_results["error"])
+                failed_result = ("Bullet optimization failed.", optimization_results["error"])
             elif "error" in ats_data:
-                st.error("ATS Analysis failed.")
-                st.code(ats_data["error"])
+                failed_result = ("ATS Analysis failed.", ats_data["error"])
             else:
-                st.subheader("ATS Keyword Analysis")
-                st.metric("ATS Score", f"{ats_data['ats_score']['ats_score']}%")
-                st.caption(ats_data['ats_score']['ats_category'])
-
-                st.markdown("**Top Missing Keywords:**")
-                for missing in ats_data["missing_keywords"][:5]:
-                    st.markdown(f"- **{missing['keyword']}** ({missing['importance']})")
-
-                st.markdown("**Priority Suggestions:**")
-                for action in ats_data["priority_actions"]:
-                    st.markdown(f"- {action}")
-
-                st.subheader("Resume Content Suggestions")
-
-                with st.expander("Suggestions by Section"):
-                    for section, bullets in optimization_results["organized_by_section"].items():
-                        st.markdown(f"### {section.title()}")
-                        for b in bullets:
-                            st.markdown(
-                                f"- **Original:** {b['original']}  \n"
-                                f"  **Optimized:** {b['optimized']}  \n"
-                                f"  **Keywords:** `{', '.join(b.get('jd_keywords_added', []))}`  \n"
-                                f"  **Score:** `{b.get('impact_score', '-')}`  \n"
-                                f"  **Improvements:** `{', '.join(b.get('improvements', []))}`"
-                            )
-
-                with st.expander("Resume Enhancement Summary"):
-                    summary = optimization_results["optimization_summary"]
-                    st.markdown(f"- **Total Suggestions Made:** {summary.get('total_bullets_processed', '-')}")
-                    st.markdown(f"- **Average Impact Score:** {summary.get('avg_improvement_score', '-')}")
-                    st.markdown(f"- **JD Alignment (%):** {summary.get('jd_alignment_percentage', '-')}")
-                    st.markdown(f"- **Key Themes Emphasized:** {', '.join(summary.get('key_themes_emphasized', []))}")
+                artifacts.update(job["result"])
+
+        if job is None or job["status"] in ("failed", "cancelled") or failed_result:
+            if failed_result:
+                st.error(failed_result[0])
+                st.code(failed_result[1])
+            elif job is not None and job["status"] == "failed":
+                st.error(f"Previous optimization failed: {job['error']}")
+            if st.button("Run Optimization"):
+                job_id = submit_admitted(
+                    submit_ats_report, artifacts["parsed"], artifacts["formatted"], artifacts["jd_text"],
+                    st.session_state["resume_hash"], st.session_state["jd_hash"]
+                )
+                if job_id:
+                    st.session_state["ats_job"] = job_id
+                    st.rerun(scope="fragment")
+        elif job["status"] != "done":
+            wait_for_job(job)
+        else:
+            optimization_results = artifacts["bullet_optimization_result"]
+            ats_data = artifacts["ats_analysis_result"]
+
+            st.subheader("ATS Keyword Analysis")
+            st.metric("ATS Score", f"{ats_data['ats_score']['ats_score']}%")
+            st.caption(ats_data['ats_score']['ats_category'])
+
+            st.markdown("**Top Missing Keywords:**")
+            for missing in ats_data["missing_keywords"][:5]:
+                st.markdown(f"- **{missing['keyword']}** ({missing['importance']})")
+
+            st.markdown("**Priority Suggestions:**")
+            for action in ats_data["priority_actions"]:
+                st.markdown(f"- {action}")
+
+            st.subheader("Resume Content Suggestions")
+
+            with st.expander("Suggestions by Section"):
+                for section, bullets in optimization_results["organized_by_section"].items():
+                    st.markdown(f"### {section.title()}")
+                    for b in bullets:
+                        st.markdown(
+                            f"- **Original:** {b['original']}  \n"
+                            f"  **Optimized:** {b['optimized']}  \n"
+                            f"  **Keywords:** `{', '.join(b.get('jd_keywords_added', []))}`  \n"
+                            f"  **Score:** `{b.get('impact_score', '-')}`  \n"
+                            f"  **Improvements:** `{', '.join(b.get('improvements', []))}`"
+                        )
+
+            with st.expander("Resume Enhancement Summary"):
+                summary = optimization_results["optimization_summary"]
+                st.markdown(f"- **Total Suggestions Made:** {summary.get('total_bullets_processed', '-')}")
+                st.markdown(f"- **Average Impact Score:** {summary.get('avg_improvement_score', '-')}")
+                st.markdown(f"- **JD Alignment (%):** {summary.get('jd_alignment_percentage', '-')}")
+                st.markdown(f"- **Key Themes Emphasized:** {', '.join(summary.get('key_themes_emphasized', []))}")
+
+            st.subheader("Export Tailored Resume")
+            tailored_resume = tailored_resume_text(
+                artifacts.ref("formatted"), artifacts.ref("bullet_optimization_result"),
+                artifacts["formatted"], optimization_results
+            )
+            artifacts["tailored_resume"] = tailored_resume
+            tailored_resume_export(tailored_resume)
     else:
         st.warning("Please upload both resume and job description first.")
 
-if section == "Generate Cover Letter":
+@page_fragment
+def cover_letter_page():
     st.title("Cover Letter Generator")
 
-    if st.session_state.get("formatted") and st.session_state.get("jd_text"):
+    if artifacts.get("formatted") and artifacts.get("jd_text"):
         name = st.session_state.get("extracted_fields", {}).get("name", "Candidate")
 
         company_name = st.text_input("Company Name", placeholder="e.g. Google")
@@ -266,93 +457,123 @@ if section == "Generate Cover Letter":
 
         tone_options_display = ["Professional", "Friendly", "Confident", "Enthusiastic", "Conversational"]
         tone_map = {display: display.lower() for display in tone_options_display}
+        length_options_display = ["Short", "Standard", "Detailed"]
 
-        selected_display = st.selectbox(
-            "Tone of the Letter", 
-            tone_options_display, 
-            index=0, 
-            help="Select the desired tone for your cover letter"
+        selected_displays = st.multiselect(
+            "Tones of the Letter",
+            tone_options_display,
+            default=["Professional"],
+            help="Select one or more tones; all selected variants are generated at once"
         )
-
-        selected_tone = tone_map[selected_display]
-
-        if st.button("Generate Cover Letter"):
-            with st.spinner("Generating Cover Letter..."):
-                cover_letter = generate_cover_letter(
-                    formatted_resume=st.session_state["formatted"],
-                    job_description=st.session_state["jd_text"],
-                    candidate_name=name,
-                    company_name=company_name,
-                    role_title=role_title,
-                    tone=selected_tone
+        selected_length = st.selectbox(
+            "Length of the Letter",
+            length_options_display,
+            index=1
+        ).lower()
+
+        letter_inputs = hash_payload([st.session_state["resume_hash"], st.session_state["jd_hash"], name, company_name, role_title])
+        if st.session_state.get("cover_letter_inputs") != letter_inputs:
+            st.session_state["cover_letter_inputs"] = letter_inputs
+            artifacts.discard("cover_letter_variants")
+
+        if st.button("Generate Cover Letter") and selected_displays:
+            variants = dict(artifacts.get("cover_letter_variants", {}))
+            missing = []
+            for display in selected_displays:
+                tone = tone_map[display]
+                label = f"{display} ({selected_length})"
+                stored = get_result(
+                    "cover_letter", st.session_state["resume_hash"], st.session_state["jd_hash"],
+                    variant=cover_letter_variant_hash(name, company_name, role_title, tone, selected_length)
                 )
-                st.session_state["cover_letter"] = cover_letter
-
-        if st.session_state.get("cover_letter"):
-            st.subheader("Cover Letter Preview")
-            st.markdown(st.session_state["cover_letter"])
-
-            export_format = st.radio(
-                "Choose export format",
-                ["TXT", "PDF", "DOCX"],
+                if stored is not None:
+                    variants[label] = stored
+                elif label not in variants:
+                    missing.append((display, tone))
+            artifacts["cover_letter_variants"] = variants
+
+            if missing:
+                job_id = submit_admitted(
+                    submit_cover_letters, artifacts["parsed"], artifacts["formatted"], artifacts["jd_text"],
+                    name, company_name, role_title, [(tone, selected_length) for _, tone in missing],
+                    st.session_state["resume_hash"], st.session_state["jd_hash"]
+                )
+                if job_id:
+                    st.session_state["cover_letter_job"] = {
+                        "id": job_id,
+                        "inputs": letter_inputs,
+                        "labels": {f"{display} ({selected_length})": variant_key(tone, selected_length) for display, tone in missing},
+                    }
+
+            st.session_state["cover_letter_choice"] = f"{selected_displays[0]} ({selected_length})"
+
+        pending_letters = st.session_state.get("cover_letter_job")
+        if pending_letters and pending_letters["inputs"] == letter_inputs:
+            letter_job = get_job(pending_letters["id"])
+            if letter_job is None or letter_job["status"] in ("failed", "cancelled"):
+                st.session_state.pop("cover_letter_job")
+                if letter_job is not None and letter_job["status"] == "failed":
+                    st.error(f"Cover letter generation failed: {letter_job['error']}")
+            elif letter_job["status"] != "done":
+                wait_for_job(letter_job)
+            else:
+                st.session_state.pop("cover_letter_job")
+                variants = dict(artifacts.get("cover_letter_variants", {}))
+                for label, key in pending_letters["labels"].items():
+                    letter = letter_job["result"][key]
+                    if letter.startswith("[Error"):
+                        # Left out so the next Generate click retries this variant
+                        st.error(f"{label}: {letter}")
+                    else:
+                        variants[label] = letter
+                artifacts["cover_letter_variants"] = variants
+        elif pending_letters:
+            st.session_state.pop("cover_letter_job")
+
+        variants = artifacts.get("cover_letter_variants", {})
+        if variants:
+            variant_labels = list(variants)
+            if st.session_state.get("cover_letter_choice") not in variant_labels:
+                st.session_state.pop("cover_letter_choice", None)
+            choice = st.radio(
+                "Cover letter variant",
+                variant_labels,
                 horizontal=True,
-                index=0
+                key="cover_letter_choice"
             )
+            artifacts["cover_letter"] = variants[choice]
+        else:
+            artifacts.discard("cover_letter")
 
-            if export_format == "TXT":
-                st.download_button(
-                    label="Download as TXT",
-                    data=st.session_state["cover_letter"],
-                    file_name="cover_letter.txt",
-                    mime="text/plain"
-                )
-
-            elif export_format == "PDF":
-                from fpdf import FPDF
-                import unicodedata
-
-                def clean_text(text):
-                    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
-
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_auto_page_break(auto=True, margin=12)
-                pdf.set_font("Arial", size=11)
-
-                cleaned_text = clean_text(st.session_state["cover_letter"])
-                line_height = 6
-                for line in cleaned_text.split("\n"):
-                    if line.strip():
-                        pdf.multi_cell(0, line_height, line)
-                    else:
-                        pdf.ln(line_height)
+        if artifacts.get("cover_letter"):
+            st.subheader("Cover Letter Preview")
+            st.markdown(artifacts["cover_letter"])
 
-                pdf_output = pdf.output(dest="S").encode("latin-1")
+            documents = {"cover_letter": artifacts["cover_letter"]}
+            if artifacts.get("tailored_resume"):
+                documents["tailored_resume"] = artifacts["tailored_resume"]
+            document_exports(documents)
+    else:
+        st.warning("Please upload both resume and job description first.")
 
-                st.download_button(
-                    label="Download as PDF",
-                    data=pdf_output,
-                    file_name="cover_letter.pdf",
-                    mime="application/pdf"
-                )
+PAGES = {
+    "Upload Resume & JD": upload_page,
+    "Resume Contents": resume_contents_page,
+    "Resume vs JD Analysis": analysis_page,
+    "ATS Report with Resume Suggestions": ats_report_page,
+    "Generate Cover Letter": cover_letter_page,
+}
 
-            elif export_format == "DOCX":
-                from docx import Document
-                import io
+st.sidebar.title("Navigation")
+section = st.sidebar.radio("Go to", list(PAGES))
 
-                doc = Document()
-                for line in st.session_state["cover_letter"].split("\n"):
-                    doc.add_paragraph(line)
+prefetch_enabled = st.sidebar.checkbox(
+    "Prefetch analyses after upload",
+    key="prefetch_enabled",
+    help="Start the JD comparison, ATS analysis and bullet optimization in the background as soon as processing finishes"
+)
 
-                doc_io = io.BytesIO()
-                doc.save(doc_io)
-                doc_io.seek(0)
+if st.session_state.get("prefetch") and not prefetch_enabled:
+    cancel_prefetch(st.session_state.pop("prefetch"), current_owner())
 
-                st.download_button(
-                    label="Download as DOCX",
-                    data=doc_io,
-                    file_name="cover_letter.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                )
-    else:
-        st.warning("Please upload both resume and job description first.")
\ No newline at end of file
+PAGES[section]()
@@ -0,0 +1,222 @@
+"""Concurrent-user load test of the full tailoring pipeline against the mock LLM.
+
+Each simulated session runs upload -> parse -> format -> compare -> ATS ->
+bullets -> cover letter, and the harness reports throughput, p50/p95/p99
+latency per stage and memory growth per session.
+
+    python -m benchmarks.load_test --users 20 --sessions 100 --latency-ms 800 --error-rate 0.02
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+STAGES = ["upload", "parse", "format", "compare", "ats", "bullets", "cover_letter"]
+
+SAMPLE_JD = (
+    "Backend Engineer\n"
+    "We are looking for a backend engineer to build and scale REST APIs.\n"
+    "Requirements:\n"
+    "- 3+ years of Python experience\n"
+    "- Strong SQL and PostgreSQL skills\n"
+    "- Experience with Docker and Kubernetes\n"
+    "- Familiarity with Terraform and CI/CD pipelines\n"
+)
+
+SAMPLE_RESUME_LINES = [
+    "Jane Doe",
+    "jane.doe@example.com | 9876543210",
+    "SUMMARY",
+    "Backend developer with four years of experience building Python services.",
+    "EXPERIENCE",
+    "- Developed Flask APIs serving 2M requests per day for internal tools",
+    "- Reduced PostgreSQL query latency by 30% through indexing and query rewrites",
+    "- Built CI pipelines with GitHub Actions and Docker for six services",
+    "- Led migration of batch jobs to event-driven workers",
+    "PROJECTS",
+    "- Created a recommendation engine using content-based filtering in Python",
+    "SKILLS",
+    "Python, Flask, PostgreSQL, Docker, Git, Linux",
+    "EDUCATION",
+    "B.Tech in Computer Science, 2019",
+]
+
+def write_sample_resume(path: str) -> None:
+    """Writes a small synthetic resume PDF for runs without a real one"""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=11)
+    for line in SAMPLE_RESUME_LINES:
+        pdf.multi_cell(0, 6, line)
+    pdf.output(path)
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class StageRecorder:
+    """Thread-safe latency and error samples per stage"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.errors: Dict[str, int] = {stage: 0 for stage in STAGES}
+
+    def record(self, stage: str, seconds: float, failed: bool) -> None:
+        with self.lock:
+            self.latencies[stage].append(seconds)
+            if failed:
+                self.errors[stage] += 1
+
+def is_failed(result) -> bool:
+    if isinstance(result, dict):
+        return "error" in result or any(
+            isinstance(v, str) and v.startswith("[Error") for v in result.values()
+        )
+    return isinstance(result, str) and result.startswith("[Error")
+
+def run_session(resume_bytes: bytes, jd_text: str, recorder: StageRecorder) -> None:
+    """Drives one user's full path through the pipeline"""
+    from resume_parser.parser import parse_resume_sections, initialize_analyzer
+    from llm_modules.formatter import format_resume_sections_with_llm
+    from llm_modules.jd_comparator import compare_resume_with_jd
+    from llm_modules.keyword_analyzer import analyze_ats_keywords
+    from llm_modules.bullet_rewriter import optimize_resume_bullets
+    from llm_modules.cover_letter import generate_cover_letter
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+            failed = is_failed(result)
+        except Exception:
+            result, failed = None, True
+        recorder.record(stage, time.perf_counter() - start, failed)
+        return result
+
+    def upload():
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+            tmp_file.write(resume_bytes)
+            return tmp_file.name
+
+    resume_path = timed("upload", upload)
+    try:
+        parsed = timed("parse", parse_resume_sections, resume_path, initialize_analyzer()) or {}
+        formatted = timed("format", format_resume_sections_with_llm, parsed) or {}
+        timed("compare", compare_resume_with_jd, parsed, jd_text)
+        timed("ats", analyze_ats_keywords, formatted, jd_text)
+        timed("bullets", optimize_resume_bullets, formatted, jd_text)
+        timed("cover_letter", generate_cover_letter, formatted, jd_text)
+    finally:
+        if resume_path and os.path.exists(resume_path):
+            os.remove(resume_path)
+
+def build_report(recorder: StageRecorder, sessions: int, wall_seconds: float, memory: dict, mock_state) -> dict:
+    stages = {}
+    for stage in STAGES:
+        samples = recorder.latencies[stage]
+        stages[stage] = {
+            "count": len(samples),
+            "errors": recorder.errors[stage],
+            "throughput_per_s": round(len(samples) / wall_seconds, 3) if wall_seconds else 0,
+            "p50_ms": round(percentile(samples, 50) * 1000, 1),
+            "p95_ms": round(percentile(samples, 95) * 1000, 1),
+            "p99_ms": round(percentile(samples, 99) * 1000, 1),
+        }
+    return {
+        "sessions": sessions,
+        "wall_seconds": round(wall_seconds, 2),
+        "sessions_per_s": round(sessions / wall_seconds, 3) if wall_seconds else 0,
+        "stages": stages,
+        "memory": memory,
+        "mock_llm": {"requests": mock_state.requests, "injected_errors": mock_state.errors} if mock_state else None,
+    }
+
+def print_report(report: dict) -> None:
+    print(f"\nSessions: {report['sessions']} in {report['wall_seconds']}s ({report['sessions_per_s']} sessions/s)")
+    print(f"{'stage':<14}{'count':>7}{'errors':>8}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in report["stages"].items():
+        print(f"{stage:<14}{row['count']:>7}{row['errors']:>8}{row['throughput_per_s']:>9}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    memory = report["memory"]
+    print(f"\nPython heap growth: {memory['heap_growth_kb']} KB total, {memory['heap_growth_per_session_kb']} KB/session")
+    print(f"Peak RSS: {memory['peak_rss_mb']} MB")
+    if report["mock_llm"]:
+        print(f"Mock LLM requests: {report['mock_llm']['requests']} ({report['mock_llm']['injected_errors']} injected errors)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the resume tailoring pipeline")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=50, help="Total sessions to run")
+    parser.add_argument("--resume", help="Resume PDF to upload (a synthetic one is generated by default)")
+    parser.add_argument("--jd", help="Job description text file (a sample JD is used by default)")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Mean mock LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Std-dev of mock LLM latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock LLM calls that fail")
+    parser.add_argument("--base-url", help="Use an already running OpenAI-compatible server instead of the built-in mock")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    mock_state = None
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+    else:
+        from benchmarks.mock_llm_server import start_mock_server
+        server, mock_state = start_mock_server(0, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+
+    if args.resume:
+        with open(args.resume, "rb") as f:
+            resume_bytes = f.read()
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp_file:
+            write_sample_resume(tmp_file.name)
+            resume_bytes = open(tmp_file.name, "rb").read()
+
+    jd_text = open(args.jd, encoding="utf-8").read() if args.jd else SAMPLE_JD
+
+    # Warm imports and client construction so they are not billed to the first sessions
+    run_session(resume_bytes, jd_text, StageRecorder())
+
+    recorder = StageRecorder()
+    tracemalloc.start()
+    heap_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        for future in [executor.submit(run_session, resume_bytes, jd_text, recorder) for _ in range(args.sessions)]:
+            future.result()
+
+    wall_seconds = time.perf_counter() - start
+    heap_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    growth_kb = (heap_after - heap_before) / 1024
+    memory = {
+        "heap_growth_kb": round(growth_kb, 1),
+        "heap_growth_per_session_kb": round(growth_kb / max(1, args.sessions), 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+    report = build_report(recorder, args.sessions, wall_seconds, memory, mock_state)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Local OpenAI-compatible stand-in for load tests and offline benchmarks.
+
+Serves POST /v1/chat/completions with canned but schema-valid responses for
+every llm_module prompt, with configurable latency and error injection. Requests
+with "stream": true get server-sent event chunks spread over the latency.
+
+    python -m benchmarks.mock_llm_server --port 8765 --latency-ms 800 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPARISON_RESPONSE = {
+    "matched_skills": [
+        {"skill": "Python", "jd_term": "Python", "resume_term": "Python", "match_type": "exact", "confidence": 0.95, "reasoning": "Listed in both"},
+        {"skill": "SQL", "jd_term": "SQL", "resume_term": "PostgreSQL", "match_type": "semantic", "confidence": 0.8, "reasoning": "PostgreSQL is a SQL database"},
+        {"skill": "APIs", "jd_term": "REST APIs", "resume_term": "Flask services", "match_type": "transferable", "confidence": 0.65, "reasoning": "Built HTTP services"}
+    ],
+    "missing_critical": [
+        {"skill": "Kubernetes", "importance": "critical", "category": "technical", "alternatives": ["Docker"]},
+        {"skill": "Terraform", "importance": "important", "category": "technical", "alternatives": []}
+    ],
+    "resume_strengths": [
+        {"skill": "Machine Learning", "relevance": "somewhat_relevant", "value_add": "Can support data features"}
+    ],
+    "overall_assessment": {
+        "match_percentage": 68,
+        "fit_level": "good",
+        "key_strengths": ["Python", "SQL", "APIs"],
+        "main_gaps": ["Kubernetes", "Terraform"],
+        "recommendation": "conditional",
+        "reasoning": "Solid backend fundamentals with infrastructure gaps."
+    },
+    "domain_insights": {
+        "resume_domain": "software engineering",
+        "jd_domain": "backend engineering",
+        "cross_domain_applicability": "high",
+        "domain_specific_notes": "Mock analysis"
+    }
+}
+
+REQUIREMENTS_RESPONSE = {
+    "role": {"title": "Backend Engineer", "domain": "software engineering", "seniority": "mid"},
+    "requirements": [
+        {"requirement": "Python", "importance": "critical", "category": "technical", "aliases": ["Python 3"]},
+        {"requirement": "SQL", "importance": "critical", "category": "technical", "aliases": ["PostgreSQL"]},
+        {"requirement": "Kubernetes", "importance": "important", "category": "technical", "aliases": ["k8s"]},
+        {"requirement": "Terraform", "importance": "nice_to_have", "category": "technical", "aliases": []}
+    ]
+}
+
+DIGEST_RESPONSE = {
+    "headline": {"title": "Backend Developer", "seniority": "mid", "years_experience": "4", "domain": "software engineering"},
+    "roles": [
+        {"title": "Backend Developer", "organization": "Example Corp", "period": "2021 - present",
+         "highlights": ["Built Python REST APIs", "Reduced query latency by 30%"]}
+    ],
+    "skills": ["Python", "Flask", "PostgreSQL", "Docker"],
+    "metrics": ["Reduced query latency by 30%"],
+    "projects": [],
+    "education": ["B.Tech Computer Science"],
+    "certifications": []
+}
+
+COVER_LETTER_RESPONSE = (
+    "Dear Hiring Manager,\n\n"
+    "I am excited to apply for this role. My experience building Python services maps closely to your needs.\n\n"
+    "In my recent work I shipped production APIs and improved query latency by 30%.\n\n"
+    "I would welcome the chance to discuss how I can contribute.\n\n"
+    "Sincerely,\nCandidate"
+)
+
+STREAM_CHUNK_CHARS = 16
+STREAM_DURATION_FACTOR = 2.0
+
+class MockState:
+    """Shared knobs and counters for the running server"""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, error_rate: float, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def next_delay_and_failure(self) -> tuple:
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return delay, fail
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def bullets_response(user_prompt: str) -> dict:
+    bullets = re.findall(r'^• (.+)$', user_prompt, flags=re.MULTILINE)
+    optimized = [
+        {
+            "original": bullet,
+            "optimized": f"Delivered: {bullet}",
+            "jd_keywords_added": ["Python"],
+            "improvements": ["Stronger action verb"],
+            "impact_score": 7,
+            "section": "experience"
+        }
+        for bullet in bullets
+    ]
+    return {
+        "optimized_bullets": optimized,
+        "optimization_summary": {
+            "total_bullets_processed": len(optimized),
+            "avg_improvement_score": 7,
+            "key_themes_emphasized": ["impact"],
+            "jd_alignment_percentage": 70
+        }
+    }
+
+def build_completion(messages: list) -> str:
+    """Picks a canned response matching the llm_module that sent the prompt"""
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in messages if m.get("role") == "user"), "")
+
+    if "resume formatter" in system and "=== SECTION:" in user:
+        packed = re.findall(r'=== SECTION: (.+?) ===\n(.*?)(?=\n\n=== SECTION:|\n\nMake sure to:)', user, flags=re.DOTALL)
+        return json.dumps({title: f"- {body.strip()}" for title, body in packed})
+    if "resume formatter" in system:
+        match = re.search(r'Raw Content:\n(.*?)\n\nMake sure to:', user, flags=re.DOTALL)
+        raw = match.group(1) if match else user
+        return "\n".join(f"- {part.strip()}" for part in raw.split(". ") if part.strip())
+    if "job requirement analyst" in system:
+        return json.dumps(REQUIREMENTS_RESPONSE)
+    if "resume analyst" in system:
+        return json.dumps(DIGEST_RESPONSE)
+    if "talent acquisition" in system:
+        return json.dumps(COMPARISON_RESPONSE)
+    if "resume editor" in system:
+        return json.dumps(bullets_response(user))
+    if "cover letters" in system:
+        return COVER_LETTER_RESPONSE
+    return json.dumps({"echo": user[:200]})
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+
+            delay, fail = state.next_delay_and_failure()
+            time.sleep(delay)
+            if fail:
+                self._send_json(500, {"error": {"message": "Injected mock failure", "type": "server_error"}})
+                return
+
+            messages = request.get("messages", [])
+            content = build_completion(messages)
+            prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+            completion_tokens = estimate_tokens(content)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+            if request.get("stream"):
+                self._send_stream(request, content, usage, delay)
+                return
+
+            self._send_json(200, {
+                "id": f"chatcmpl-mock-{state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        def _send_stream(self, request: dict, content: str, usage: dict, delay: float) -> None:
+            """Streams the content in small deltas; the latency already slept counts as time to first token"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+
+            pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+            base = {"id": f"chatcmpl-mock-{state.requests}", "object": "chat.completion.chunk", "created": int(time.time()), "model": request.get("model", "gpt-4o")}
+            for index, piece in enumerate(pieces):
+                finish = "stop" if index == len(pieces) - 1 else None
+                chunk = dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": finish}])
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(delay * STREAM_DURATION_FACTOR / len(pieces))
+            if request.get("stream_options", {}).get("include_usage"):
+                self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=usage))}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+def start_mock_server(port: int = 0, latency_ms: float = 500, jitter_ms: float = 100, error_rate: float = 0.0, seed: int = None) -> tuple:
+    """Starts the mock server on a background thread; returns (server, state)"""
+    state = MockState(latency_ms, jitter_ms, error_rate, seed)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="mock-llm").start()
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server, _ = start_mock_server(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    print(f"Mock LLM listening on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
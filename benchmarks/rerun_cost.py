@@ -0,0 +1,199 @@
+"""Per-interaction CPU cost of the Streamlit UI: whole-script reruns vs fragment reruns.
+
+Drives app.py with Streamlit's AppTest on pages seeded with finished results and
+replays the widget interactions users repeat most (typing the company name,
+switching an export format). For each interaction it reports the CPU time of the
+page body, which every interaction reran before the pages became fragments, and of
+the fragment that now reruns on its own.
+
+AppTest always reruns the whole script, so both are timed the same way inside
+those runs, by wrapping st.fragment. Neither includes Streamlit's own per-rerun
+overhead or the script's top-level code, which the old whole-script rerun also
+paid, so the speedup is a lower bound. When the page itself is the fragment that
+reruns (typing the company name) the two columns are the same by construction.
+
+    python -m benchmarks.rerun_cost --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, List
+
+from benchmarks.load_test import SAMPLE_JD, SAMPLE_RESUME_LINES
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+RESUME_HASH = "bench-resume"
+JD_HASH = "bench-jd"
+
+def sample_formatted(bullets: int) -> Dict[str, str]:
+    """Formatted resume sections with the sample experience bullets repeated up to `bullets` lines"""
+    experience = [line for line in SAMPLE_RESUME_LINES if line.startswith("- ")]
+    lines = [f"{experience[i % len(experience)]} ({i + 1})" for i in range(bullets)]
+    return {
+        "Contact Information": "Jane Doe\njane.doe@example.com | 9876543210",
+        "Summary": "## Summary\n\nBackend developer with four years of experience building Python services.",
+        "Experience": "## Experience\n\n" + "\n".join(lines),
+        "Skills": "## Skills\n\nPython, Flask, PostgreSQL, Docker, Git, Linux",
+    }
+
+def sample_results(formatted: Dict[str, str]) -> Dict[str, dict]:
+    bullets = [line[2:] for line in formatted["Experience"].split("\n") if line.startswith("- ")]
+    improved = [
+        {
+            "original": bullet,
+            "optimized": f"{bullet} using Kubernetes and Terraform",
+            "jd_keywords_added": ["Kubernetes", "Terraform"],
+            "impact_score": 8,
+            "improvements": ["keywords"],
+        }
+        for bullet in bullets
+    ]
+    return {
+        "bullet_optimization": {
+            "improvement_analysis": improved,
+            "organized_by_section": {"experience": improved},
+            "optimization_summary": {
+                "total_bullets_processed": len(improved),
+                "avg_improvement_score": 8,
+                "jd_alignment_percentage": 80,
+                "key_themes_emphasized": ["infrastructure"],
+            },
+        },
+        "ats_analysis": {
+            "ats_score": {"ats_score": 72, "ats_category": "Good"},
+            "missing_keywords": [{"keyword": "Kubernetes", "importance": "high"}, {"keyword": "Terraform", "importance": "medium"}],
+            "priority_actions": ["Mention Kubernetes experience"],
+        },
+    }
+
+def seed_session(bullets: int) -> dict:
+    """Stores finished results and returns the session state of a user who already has them"""
+    from resume_parser.parsed_resume import ParsedResume
+    from utils.result_store import put_result, hash_payload
+    from utils.sessions import SessionArtifacts
+
+    formatted = sample_formatted(bullets)
+    results = sample_results(formatted)
+    for kind, payload in results.items():
+        put_result(kind, RESUME_HASH, payload, JD_HASH)
+
+    state = {
+        "session_id": "rerun-cost", "resume_hash": RESUME_HASH, "jd_hash": JD_HASH, "extracted_fields": {"name": "Jane Doe"},
+        "cover_letter_inputs": hash_payload(["Jane Doe", "", ""]),
+    }
+    artifacts = SessionArtifacts(state, codecs={"parsed": (ParsedResume.to_payload, ParsedResume.from_payload)})
+    artifacts.update({
+        "parsed": ParsedResume.from_sections(formatted),
+        "formatted": formatted,
+        "jd_text": SAMPLE_JD,
+        "cover_letter_variants": {"Professional (standard)": "Dear Hiring Manager,\n\n" + "I build reliable Python services.\n" * 20},
+    })
+    return state
+
+class FragmentTimer:
+    """Wraps st.fragment so every fragment body records its CPU time"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def install(self) -> None:
+        import streamlit as st
+
+        real_fragment = st.fragment
+        samples = self.samples
+
+        def timed_fragment(func=None, **kwargs):
+            def decorate(render):
+                @wraps(render)
+                def timed(*args, **kw):
+                    start = time.process_time()
+                    try:
+                        return render(*args, **kw)
+                    finally:
+                        samples[render.__name__].append(time.process_time() - start)
+                return real_fragment(timed, **kwargs)
+            return decorate(func) if func is not None else decorate
+
+        st.fragment = timed_fragment
+
+    def last(self, name: str) -> float:
+        return self.samples[name][-1] if self.samples[name] else 0.0
+
+def measure(at, interact: Callable[[object, int], object], page: str, fragment: str, timer: FragmentTimer, repeat: int) -> dict:
+    """Median CPU ms of the `page` body and of the `fragment` inside it for one interaction"""
+    page_body, body = [], []
+    for i in range(repeat):
+        interact(at, i).run()
+        page_body.append(timer.last(page))
+        body.append(timer.last(fragment))
+        if at.exception:
+            raise RuntimeError(f"app raised during {fragment}: {at.exception[0].message}")
+    before = statistics.median(page_body) * 1000
+    after = statistics.median(body) * 1000
+    return {
+        "fragment": fragment,
+        "page_rerun_ms": round(before, 2),
+        "fragment_rerun_ms": round(after, 2),
+        "speedup": round(before / after, 1) if after else None,
+    }
+
+def open_page(state: dict, page: str):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    for key, value in state.items():
+        at.session_state[key] = value
+    at.run()
+    at.sidebar.radio[0].set_value(page).run()
+    return at
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-interaction CPU time of the Streamlit UI")
+    parser.add_argument("--repeat", type=int, default=10, help="Interactions replayed per scenario")
+    parser.add_argument("--bullets", type=int, default=40, help="Experience bullets in the seeded resume")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rerun_cost_")
+    os.environ["RESULT_STORE_PATH"] = os.path.join(workdir, "results.db")
+    os.environ["ARTIFACT_DIR"] = os.path.join(workdir, "artifacts")
+    os.environ["METRICS_PORT"] = "0"
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+
+    timer = FragmentTimer()
+    timer.install()
+    state = seed_session(args.bullets)
+    formats = ["TXT", "PDF", "DOCX"]
+
+    cover_letter = open_page(state, "Generate Cover Letter")
+    ats_report = open_page(state, "ATS Report with Resume Suggestions")
+    # Format switches first: a new company name starts a new set of letters and drops the seeded one
+    report = {
+        "switch_cover_letter_format": measure(
+            cover_letter, lambda at, i: at.radio(key="cover_letter_format").set_value(formats[(i + 1) % len(formats)]),
+            "cover_letter_page", "document_exports", timer, args.repeat
+        ),
+        "type_company_name": measure(
+            cover_letter, lambda at, i: at.text_input[0].input(f"Acme {i}"), "cover_letter_page", "cover_letter_page", timer, args.repeat
+        ),
+        "switch_tailored_resume_format": measure(
+            ats_report, lambda at, i: at.radio(key="tailored_resume_format").set_value(formats[(i + 1) % len(formats)]),
+            "ats_report_page", "tailored_resume_export", timer, args.repeat
+        ),
+    }
+
+    print(f"{'interaction':<32}{'fragment':<26}{'page ms':>11}{'fragment ms':>13}{'speedup':>9}")
+    for interaction, row in report.items():
+        print(f"{interaction:<32}{row['fragment']:<26}{row['page_rerun_ms']:>11}{row['fragment_rerun_ms']:>13}{str(row['speedup']):>9}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
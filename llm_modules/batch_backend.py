@@ -0,0 +1,241 @@
+"""Backends that run a JSONL file of chat completion requests as one offline batch.
+
+Input lines follow the OpenAI batch format ({"custom_id", "method", "url", "body"}) and
+results come back as {"custom_id", "response": {"status_code", "body"}, "error"} lines,
+whichever backend ran them. "openai" submits the file to the provider's batch API;
+"local" runs it through the regular client in this process (for development, replay
+fixtures and the mock server) and keeps its progress on disk so it can pick up where
+it stopped.
+"""
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional
+from llm_modules.llm_client import get_client
+from llm_modules.transport import raise_fixture_miss
+from utils.metrics import record_llm_tokens
+from utils.result_store import hash_bytes
+
+logger = logging.getLogger(__name__)
+
+BATCH_BACKEND = os.getenv("BATCH_BACKEND", "openai").lower()
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+LOCAL_BATCH_DIR = os.getenv("LOCAL_BATCH_DIR", "batch_runs/local")
+LOCAL_BATCH_WORKERS = int(os.getenv("LOCAL_BATCH_WORKERS", "4"))
+
+# Provider batch states after which nothing more will change
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+class BatchBackend(ABC):
+    """Runs a batch input file and reports its status and results by batch id.
+
+    Submitting is split in two so callers can save the uploaded file id before the batch
+    is started, and after a crash ask find_batch whether it was started before paying again.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def upload(self, input_path: str) -> str:
+        """Uploads an input file and returns its file id"""
+
+    @abstractmethod
+    def start(self, file_id: str) -> str:
+        """Starts a batch over an uploaded file and returns the batch id"""
+
+    @abstractmethod
+    def find_batch(self, file_id: str) -> Optional[str]:
+        """Id of a batch already started over this uploaded file, or None"""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> dict:
+        """{"state": ..., "completed": n, "failed": n, "total": n}; state is one of TERMINAL_STATES once done"""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterator[dict]:
+        """Result lines of a finished batch, including per-request errors"""
+
+class OpenAIBatchBackend(BatchBackend):
+    """The provider's batch API: discounted, asynchronous, finished within BATCH_COMPLETION_WINDOW"""
+
+    name = "openai"
+
+    def __init__(self, client=None):
+        self.client = client or get_client("batch")
+
+    def upload(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def start(self, file_id: str) -> str:
+        batch = self.client.batches.create(
+            input_file_id=file_id, endpoint=BATCH_ENDPOINT, completion_window=BATCH_COMPLETION_WINDOW
+        )
+        return batch.id
+
+    def find_batch(self, file_id: str) -> Optional[str]:
+        # Batches are listed newest first; none created before the upload can use it
+        uploaded_at = self.client.files.retrieve(file_id).created_at
+        for batch in self.client.batches.list(limit=100):
+            if batch.input_file_id == file_id:
+                return batch.id
+            if batch.created_at < uploaded_at:
+                break
+        return None
+
+    def status(self, batch_id: str) -> dict:
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "state": batch.status,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+            "total": counts.total if counts else 0,
+        }
+
+    def results(self, batch_id: str) -> Iterator[dict]:
+        batch = self.client.batches.retrieve(batch_id)
+        # Expired and cancelled batches still return the requests they finished
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                # Batch calls bypass the client transport, so their usage is recorded here
+                body = (result.get("response") or {}).get("body") or {}
+                if body.get("usage"):
+                    record_llm_tokens("batch", body.get("model"), body["usage"])
+                yield result
+
+class LocalBatchBackend(BatchBackend):
+    """Runs batch files through the regular chat client on a thread pool.
+
+    Each batch keeps a copy of its input and appends results to output.jsonl as they
+    finish; a batch found unfinished after a restart resumes with the requests that
+    have no result yet.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str = LOCAL_BATCH_DIR, workers: int = LOCAL_BATCH_WORKERS, client=None):
+        self.directory = directory
+        self.workers = workers
+        self.client = client or get_client("batch")
+        self._lock = threading.Lock()
+        self._running: Dict[str, threading.Thread] = {}
+
+    def _path(self, batch_id: str, name: str) -> str:
+        return os.path.join(self.directory, batch_id, name)
+
+    def upload(self, input_path: str) -> str:
+        """Copies the input into its batch directory; the file id doubles as the batch id"""
+        with open(input_path, "rb") as f:
+            data = f.read()
+        batch_id = f"local-{hash_bytes(data)[:16]}"
+        os.makedirs(os.path.join(self.directory, batch_id), exist_ok=True)
+        if not os.path.exists(self._path(batch_id, "input.jsonl")):
+            with open(self._path(batch_id, "input.jsonl"), "wb") as f:
+                f.write(data)
+        return batch_id
+
+    def start(self, file_id: str) -> str:
+        self._ensure_running(file_id)
+        return file_id
+
+    def find_batch(self, file_id: str) -> Optional[str]:
+        # Starting a local batch again only resumes it, so there is nothing to look up
+        return None
+
+    def _read_lines(self, batch_id: str, name: str) -> list:
+        path = self._path(batch_id, name)
+        if not os.path.exists(path):
+            return []
+        lines = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    lines.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash; its request is run again
+                    continue
+        return lines
+
+    def _ensure_running(self, batch_id: str) -> None:
+        with self._lock:
+            thread = self._running.get(batch_id)
+            if thread is not None and thread.is_alive():
+                return
+            thread = threading.Thread(target=self._run, args=(batch_id,), daemon=True, name=f"batch-{batch_id}")
+            self._running[batch_id] = thread
+            thread.start()
+
+    def _run(self, batch_id: str) -> None:
+        done = {line["custom_id"] for line in self._read_lines(batch_id, "output.jsonl")}
+        pending = [line for line in self._read_lines(batch_id, "input.jsonl") if line["custom_id"] not in done]
+        write_lock = threading.Lock()
+
+        def run_one(request: dict) -> None:
+            result = self._execute(request)
+            with write_lock, open(self._path(batch_id, "output.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(run_one, pending))
+
+    def _execute(self, request: dict) -> dict:
+        try:
+            response = self.client.chat.completions.create(**request["body"])
+            return {
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": response.model_dump()},
+                "error": None,
+            }
+        except Exception as e:
+            raise_fixture_miss(e)
+            logger.warning(f"Local batch request {request['custom_id']} failed: {e}")
+            return {
+                "custom_id": request["custom_id"],
+                "response": None,
+                "error": {"code": type(e).__name__, "message": str(e)},
+            }
+
+    def status(self, batch_id: str) -> dict:
+        inputs = self._read_lines(batch_id, "input.jsonl")
+        if not inputs:
+            return {"state": "failed", "completed": 0, "failed": 0, "total": 0}
+        outputs = {line["custom_id"]: line for line in self._read_lines(batch_id, "output.jsonl")}
+        failed = sum(1 for line in outputs.values() if line.get("error"))
+        if len(outputs) < len(inputs):
+            self._ensure_running(batch_id)
+            state = "in_progress"
+        else:
+            state = "completed"
+        return {"state": state, "completed": len(outputs) - failed, "failed": failed, "total": len(inputs)}
+
+    def results(self, batch_id: str) -> Iterator[dict]:
+        yield from {line["custom_id"]: line for line in self._read_lines(batch_id, "output.jsonl")}.values()
+
+BATCH_BACKENDS = {"openai": OpenAIBatchBackend, "local": LocalBatchBackend}
+
+def get_batch_backend(name: Optional[str] = None) -> BatchBackend:
+    name = (name or BATCH_BACKEND).lower()
+    if name not in BATCH_BACKENDS:
+        raise ValueError(f"BATCH_BACKEND must be one of {', '.join(BATCH_BACKENDS)}, got {name!r}")
+    return BATCH_BACKENDS[name]()
+
+def batch_request_line(custom_id: str, body: dict) -> dict:
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+def result_content(result: dict) -> str:
+    """Message text of one result line; raises RuntimeError for failed requests"""
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        error = result.get("error") or response.get("body", {}).get("error") or {}
+        raise RuntimeError(error.get("message") or f"Batch request failed with status {response.get('status_code')}")
+    return response["body"]["choices"][0]["message"]["content"].strip()
@@ -1,12 +1,16 @@
 from resume_parser.parser import fix_spacing
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+from llm_modules.llm_client import get_client, get_async_client
+from llm_modules.transport import raise_fixture_miss
+from utils.dedup import near_duplicate_groups, normalize_words, shingles, containment
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import json
 import re
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client("bullet_rewriter")
+async_client = get_async_client("bullet_rewriter")
+
+MAX_PROMPT_BULLETS = 20
 
 def simple_fallback_sent_split(text: str) -> list:
     """ Fallback sentence splitter using heuristic chunking for long blocks of resume text"""
@@ -76,8 +80,8 @@ def extract_resume_content(text: str) -> list:
     
     return chunks[:8]
 
-def optimize_resume_bullets(parsed_resume: dict, job_description: str) -> dict:
-    """Rewrite and optimize resume bullet points based on a given job description"""
+def collect_bullets(parsed_resume: dict) -> list:
+    """(bullet, section) candidates worth rewriting, with fallbacks for unstructured resumes; may repeat content"""
     bullet_sections = ["Experience", "Projects", "Achievements", "Internships", "Volunteer", "Work Experience", "Professional Experience", "Technical Projects", "Summary", "Objective"]
 
     exclude_sections = ["Education", "Contact", "Personal Information", "References", "Languages", "Certifications", "Awards", "Honors", "Publications", "Patents", "Licenses"]
@@ -139,116 +143,189 @@ def optimize_resume_bullets(parsed_resume: dict, job_description: str) -> dict:
                 if len(combined_text) > 50:
                     all_bullets = [(combined_text, "general")]
 
+    return all_bullets
+
+def prepare_bullets(parsed_resume: dict) -> Tuple[list, Dict[str, List[str]], int]:
+    """Collapses near-duplicate candidates before they reach the prompt.
+
+    Returns (unique (bullet, section) pairs, the other texts each unique bullet stands for
+    keyed by the bullet, number of candidates collected).
+    """
+    candidates = collect_bullets(parsed_resume)
+    groups = near_duplicate_groups([bullet for bullet, _ in candidates])[:MAX_PROMPT_BULLETS]
+
+    unique = []
+    duplicates = {}
+    for group in groups:
+        bullet, section = candidates[group[0]]
+        unique.append((bullet, section))
+        others = [candidates[i][0] for i in group[1:] if candidates[i][0] != bullet]
+        if others:
+            duplicates[bullet] = list(dict.fromkeys(others))
+    return unique, duplicates, len(candidates)
+
+def match_sent_bullet(original: str, sent: List[str]) -> Optional[str]:
+    """The sent bullet a rewrite's 'original' refers to; models often echo it with small edits"""
+    words = normalize_words(original)
+    for bullet in sent:
+        if normalize_words(bullet) == words:
+            return bullet
+    original_shingles = shingles(original)
+    scored = [(containment(original_shingles, shingles(bullet)), bullet) for bullet in sent]
+    best = max(scored, default=(0.0, None))
+    return best[1] if best[0] >= 0.6 else None
+
+def attach_duplicates(optimized: dict, unique: list, duplicates: Dict[str, List[str]], candidates: int) -> dict:
+    """Maps every rewrite back to the duplicate occurrences it stands for"""
+    if "error" in optimized:
+        return optimized
+    sent = [bullet for bullet, _ in unique]
+    for bullet_data in optimized["improvement_analysis"]:
+        bullet = match_sent_bullet(bullet_data.get("original", ""), sent)
+        if bullet in duplicates:
+            bullet_data["duplicates"] = duplicates[bullet]
+    optimized["deduplication"] = {"candidates": candidates, "sent": len(unique)}
+    return optimized
+
+def build_bullet_messages(all_bullets: list, job_description: str) -> list:
+    """Builds the chat messages asking the model to rewrite the collected bullets"""
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a professional resume editor. Your job is to improve resume bullet points by making them clearer, more specific, and results-focused while keeping them completely authentic.\n\n"
+                "CORE PRINCIPLES:\n"
+                "1. Only improve what's already there - never add fake achievements or exaggerated claims\n"
+                "2. Focus on actions taken and concrete results achieved\n"
+                "3. Use specific, measurable language when possible\n"
+                "4. Write in active voice with strong action verbs\n"
+                "5. Keep the original scope and impact - don't oversell\n"
+                "6. Only improve clarity and structure - never add factual details that weren't in the original text\n\n"
+                "FORBIDDEN PHRASES - NEVER use these generic endings:\n"
+                "- \"demonstrating expertise in...\"\n"
+                "- \"showcasing skills in...\"\n"
+                "- \"leveraging knowledge of...\"\n"
+                "- \"highlighting proficiency in...\"\n"
+                "- \"exhibiting mastery of...\"\n"
+                "- \"displaying competency in...\"\n"
+                "- \"evidencing capabilities in...\"\n\n"
+                "FORBIDDEN PATTERNS:\n"
+                "- Don't end bullets with skill demonstrations\n"
+                "- Don't add generic business buzzwords\n"
+                "- Don't use corporate jargon unnecessarily\n"
+                "- Don't claim expertise unless explicitly stated in original\n"
+                "- Don't add, change, or assume any technical details, company names, tool names, or specific information not in the original\n\n"
+                "GOOD PATTERNS:\n"
+                "- State what you built/created/developed\n"
+                "- Mention specific technologies used\n"
+                "- Include quantifiable results when available\n"
+                "- Focus on business impact or technical outcomes\n"
+                "- Use natural, conversational professional language\n\n"
+                "EXAMPLE TRANSFORMATIONS:\n"
+                "BAD: \"Managed team members showcasing leadership skills\"\n"
+                "GOOD: \"Led 5-person team to complete project 2 weeks ahead of schedule\"\n\n"
+                "BAD: \"Handled customer service demonstrating communication expertise\"\n"
+                "GOOD: \"Resolved 50+ customer inquiries daily, maintaining 95% satisfaction rate\"\n\n"
+                "BAD: \"Organized events leveraging project management knowledge\"\n"
+                "GOOD: \"Coordinated 3 annual conferences for 200+ attendees each\"\n\n"
+                "BAD: \"Analyzed data showcasing analytical capabilities\"\n"
+                "GOOD: \"Analyzed sales trends identifying $50K cost-saving opportunity\"\n\n"
+                "BAD: \"Created content highlighting creative abilities\"\n"
+                "GOOD: \"Produced 20+ blog posts generating 15% increase in website traffic\"\n\n"
+                "Return authentic, professional bullet points that sound like a real person wrote them."
+            )
+        },
+        {
+            "role": "user",
+            "content": (
+                f"JOB DESCRIPTION:\n{job_description}\n\n"
+                f"RESUME BULLETS TO IMPROVE:\n" +
+                "\n".join([f"• {bullet}" for bullet, _ in all_bullets]) +
+                "\n\nRewrite these bullets to be more impactful while keeping them authentic. Focus on clarity, specificity, and results. Only incorporate job description keywords if they fit naturally.\n\n"
+                "Return JSON format:\n"
+                "{\n"
+                "  \"optimized_bullets\": [\n"
+                "    {\n"
+                "      \"original\": \"original text\",\n"
+                "      \"optimized\": \"improved text\",\n"
+                "      \"jd_keywords_added\": [\"keyword1\", \"keyword2\"],\n"
+                "      \"improvements\": [\"specific improvement made\"],\n"
+                "      \"impact_score\": 1-10,\n"
+                "      \"section\": \"experience/projects/etc\"\n"
+                "    }\n"
+                "  ],\n"
+                "  \"optimization_summary\": {\n"
+                "    \"total_bullets_processed\": 4,\n"
+                "    \"avg_improvement_score\": 7.5,\n"
+                "    \"key_themes_emphasized\": [\"specific themes\"],\n"
+                "    \"jd_alignment_percentage\": 85\n"
+                "  }\n"
+                "}"
+            )
+        }
+    ]
+
+def parse_bullet_response(result: str) -> dict:
+    """Parses the rewriter's JSON reply and groups the bullets by section"""
+    if result.startswith('```json'):
+        result = result.replace('```json', '').replace('```', '').strip()
+
+    optimized_data = json.loads(result)
+
+    organized_results = {}
+    for bullet_data in optimized_data.get("optimized_bullets", []):
+        section = bullet_data.get("section", "general")
+        if section not in organized_results:
+            organized_results[section] = []
+        organized_results[section].append(bullet_data)
+
+    return {
+        "organized_by_section": organized_results,
+        "optimization_summary": optimized_data.get("optimization_summary", {}),
+        "all_optimized_bullets": [b["optimized"] for b in optimized_data.get("optimized_bullets", [])],
+        "improvement_analysis": optimized_data.get("optimized_bullets", [])
+    }
+
+def bullet_request(all_bullets: list, job_description: str) -> dict:
+    """Chat completion arguments for one rewrite, shared by the sync and async clients"""
+    return {"model": "gpt-4o", "messages": build_bullet_messages(all_bullets, job_description), "temperature": 0.4, "max_tokens": 2500}
+
+def optimize_resume_bullets(parsed_resume: dict, job_description: str) -> dict:
+    """Rewrite and optimize resume bullet points based on a given job description"""
+    all_bullets, duplicates, candidates = prepare_bullets(parsed_resume)
     if not all_bullets:
         return {"error": "No content found in resume for optimization"}
 
-    all_bullets = all_bullets[:20]
+    result = ""
+    try:
+        response = client.chat.completions.create(**bullet_request(all_bullets, job_description))
+        result = response.choices[0].message.content.strip()
+        return attach_duplicates(parse_bullet_response(result), all_bullets, duplicates, candidates)
+    except json.JSONDecodeError as e:
+        return {"error": f"JSON parsing failed: {str(e)}", "raw_response": result}
+    except Exception as e:
+        raise_fixture_miss(e)
+        return {"error": f"Optimization failed: {str(e)}"}
+
+async def aoptimize_resume_bullets(parsed_resume: dict, job_description: str, timeout: Optional[float] = None) -> dict:
+    """Async optimize_resume_bullets; raises asyncio.TimeoutError when timeout seconds pass first"""
+    all_bullets, duplicates, candidates = prepare_bullets(parsed_resume)
+    if not all_bullets:
+        return {"error": "No content found in resume for optimization"}
 
+    result = ""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a professional resume editor. Your job is to improve resume bullet points by making them clearer, more specific, and results-focused while keeping them completely authentic.\n\n"
-                        "CORE PRINCIPLES:\n"
-                        "1. Only improve what's already there - never add fake achievements or exaggerated claims\n"
-                        "2. Focus on actions taken and concrete results achieved\n"
-                        "3. Use specific, measurable language when possible\n"
-                        "4. Write in active voice with strong action verbs\n"
-                        "5. Keep the original scope and impact - don't oversell\n"
-                        "6. Only improve clarity and structure - never add factual details that weren't in the original text\n\n"
-                        "FORBIDDEN PHRASES - NEVER use these generic endings:\n"
-                        "- \"demonstrating expertise in...\"\n"
-                        "- \"showcasing skills in...\"\n"
-                        "- \"leveraging knowledge of...\"\n"
-                        "- \"highlighting proficiency in...\"\n"
-                        "- \"exhibiting mastery of...\"\n"
-                        "- \"displaying competency in...\"\n"
-                        "- \"evidencing capabilities in...\"\n\n"
-                        "FORBIDDEN PATTERNS:\n"
-                        "- Don't end bullets with skill demonstrations\n"
-                        "- Don't add generic business buzzwords\n"
-                        "- Don't use corporate jargon unnecessarily\n"
-                        "- Don't claim expertise unless explicitly stated in original\n"
-                        "- Don't add, change, or assume any technical details, company names, tool names, or specific information not in the original\n\n"
-                        "GOOD PATTERNS:\n"
-                        "- State what you built/created/developed\n"
-                        "- Mention specific technologies used\n"
-                        "- Include quantifiable results when available\n"
-                        "- Focus on business impact or technical outcomes\n"
-                        "- Use natural, conversational professional language\n\n"
-                        "EXAMPLE TRANSFORMATIONS:\n"
-                        "BAD: \"Managed team members showcasing leadership skills\"\n"
-                        "GOOD: \"Led 5-person team to complete project 2 weeks ahead of schedule\"\n\n"
-                        "BAD: \"Handled customer service demonstrating communication expertise\"\n"
-                        "GOOD: \"Resolved 50+ customer inquiries daily, maintaining 95% satisfaction rate\"\n\n"
-                        "BAD: \"Organized events leveraging project management knowledge\"\n"
-                        "GOOD: \"Coordinated 3 annual conferences for 200+ attendees each\"\n\n"
-                        "BAD: \"Analyzed data showcasing analytical capabilities\"\n"
-                        "GOOD: \"Analyzed sales trends identifying $50K cost-saving opportunity\"\n\n"
-                        "BAD: \"Created content highlighting creative abilities\"\n"
-                        "GOOD: \"Produced 20+ blog posts generating 15% increase in website traffic\"\n\n"
-                        "Return authentic, professional bullet points that sound like a real person wrote them."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"JOB DESCRIPTION:\n{job_description}\n\n"
-                        f"RESUME BULLETS TO IMPROVE:\n" +
-                        "\n".join([f"• {bullet}" for bullet, _ in all_bullets]) +
-                        "\n\nRewrite these bullets to be more impactful while keeping them authentic. Focus on clarity, specificity, and results. Only incorporate job description keywords if they fit naturally.\n\n"
-                        "Return JSON format:\n"
-                        "{\n"
-                        "  \"optimized_bullets\": [\n"
-                        "    {\n"
-                        "      \"original\": \"original text\",\n"
-                        "      \"optimized\": \"improved text\",\n"
-                        "      \"jd_keywords_added\": [\"keyword1\", \"keyword2\"],\n"
-                        "      \"improvements\": [\"specific improvement made\"],\n"
-                        "      \"impact_score\": 1-10,\n"
-                        "      \"section\": \"experience/projects/etc\"\n"
-                        "    }\n"
-                        "  ],\n"
-                        "  \"optimization_summary\": {\n"
-                        "    \"total_bullets_processed\": 4,\n"
-                        "    \"avg_improvement_score\": 7.5,\n"
-                        "    \"key_themes_emphasized\": [\"specific themes\"],\n"
-                        "    \"jd_alignment_percentage\": 85\n"
-                        "  }\n"
-                        "}"
-                    )
-                }
-            ],
-            temperature=0.4,
-            max_tokens=2500
+        response = await asyncio.wait_for(
+            async_client.chat.completions.create(**bullet_request(all_bullets, job_description)), timeout
         )
-
         result = response.choices[0].message.content.strip()
-        if result.startswith('```json'):
-            result = result.replace('```json', '').replace('```', '').strip()
-
-        optimized_data = json.loads(result)
-
-        organized_results = {}
-        for bullet_data in optimized_data.get("optimized_bullets", []):
-            section = bullet_data.get("section", "general")
-            if section not in organized_results:
-                organized_results[section] = []
-            organized_results[section].append(bullet_data)
-
-        return {
-            "organized_by_section": organized_results,
-            "optimization_summary": optimized_data.get("optimization_summary", {}),
-            "all_optimized_bullets": [b["optimized"] for b in optimized_data.get("optimized_bullets", [])],
-            "improvement_analysis": optimized_data.get("optimized_bullets", [])
-        }
-
+        return attach_duplicates(parse_bullet_response(result), all_bullets, duplicates, candidates)
+    except asyncio.TimeoutError:
+        raise
     except json.JSONDecodeError as e:
         return {"error": f"JSON parsing failed: {str(e)}", "raw_response": result}
     except Exception as e:
+        raise_fixture_miss(e)
         return {"error": f"Optimization failed: {str(e)}"}
 
 def get_top_optimized_bullets(optimization_results: dict, top_n: int = 5) -> list:
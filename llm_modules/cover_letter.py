@@ -1,66 +1,158 @@
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def generate_cover_letter(formatted_resume: dict, job_description: str, candidate_name: str = "Candidate", company_name: str = "the company", role_title: str = "this position", tone: str = "professional") -> str:
-    """"Generate a personalized cover letter using resume content and job description"""
-    resume_text = "\n\n".join(f"{section}:\n{content}" for section, content in formatted_resume.items())
-    
-    tone_instructions = {
-        "professional": "formal, respectful, and business-appropriate",
-        "friendly": "warm, approachable, while maintaining professionalism",
-        "confident": "assertive, self-assured, and results-focused",
-        "enthusiastic": "energetic, passionate, and excited about the opportunity",
-        "conversational": "natural, relaxed, but still professional"
-    }
-    
-    tone_style = tone_instructions.get(tone.lower(), "professional and engaging")
-    
+from llm_modules.llm_client import get_client, get_async_client
+from llm_modules.transport import raise_fixture_miss
+from llm_modules.resume_digest import USE_RESUME_DIGEST, get_resume_digest, aget_resume_digest, resume_prompt_text
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+
+client = get_client("cover_letter")
+async_client = get_async_client("cover_letter")
+
+TONE_INSTRUCTIONS = {
+    "professional": "formal, respectful, and business-appropriate",
+    "friendly": "warm, approachable, while maintaining professionalism",
+    "confident": "assertive, self-assured, and results-focused",
+    "enthusiastic": "energetic, passionate, and excited about the opportunity",
+    "conversational": "natural, relaxed, but still professional"
+}
+
+LENGTH_INSTRUCTIONS = {
+    "short": "Are brief and punchy (2-3 short paragraphs, under 250 words)",
+    "standard": "Are concise but impactful (3-4 paragraphs max)",
+    "detailed": "Are thorough but focused (4-5 paragraphs, under 500 words)"
+}
+
+MAX_VARIANT_WORKERS = 5
+
+def build_resume_context(formatted_resume: dict, digest: Optional[dict] = None) -> str:
+    """Renders the resume, or its digest when given, once so it can be shared by every cover letter variant"""
+    return resume_prompt_text(formatted_resume, digest)[0]
+
+def resume_context(formatted_resume: dict, use_digest: bool, digest: Optional[dict], parsed_resume: Optional[dict]) -> str:
+    # The digest is keyed by the parsed resume, which the comparison digests too
+    if use_digest and digest is None and parsed_resume:
+        digest = get_resume_digest(parsed_resume)
+    return build_resume_context(formatted_resume, digest if use_digest else None)
+
+async def aresume_context(formatted_resume: dict, use_digest: bool, digest: Optional[dict], parsed_resume: Optional[dict]) -> str:
+    if use_digest and digest is None and parsed_resume:
+        digest = await aget_resume_digest(parsed_resume)
+    return build_resume_context(formatted_resume, digest if use_digest else None)
+
+def variant_key(tone: str, length: str = "standard") -> str:
+    """Identifies a tone/length combination"""
+    return f"{tone.lower()}:{length.lower()}"
+
+def build_cover_letter_messages(resume_text: str, job_description: str, candidate_name: str, company_name: str, role_title: str, tone: str, length: str = "standard") -> list:
+    """Builds the chat messages for one cover letter variant"""
+    tone_style = TONE_INSTRUCTIONS.get(tone.lower(), "professional and engaging")
+    length_style = LENGTH_INSTRUCTIONS.get(length.lower(), LENGTH_INSTRUCTIONS["standard"])
+
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are an expert career coach who writes exceptional cover letters that get interviews. "
+                "Create compelling, personalized cover letters that:\n"
+                "- Open with a strong hook that shows genuine interest and knowledge about the company\n"
+                "- Tell a story that connects the candidate's experience to the role's requirements\n"
+                "- Use specific examples and quantifiable achievements\n"
+                "- Show enthusiasm and cultural fit\n"
+                "- End with a confident call-to-action\n"
+                "- Sound authentic and human, not generic or robotic\n"
+                f"- {length_style}\n"
+                f"- Maintain a {tone_style} tone throughout"
+            )
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Write a standout cover letter for {candidate_name} applying for the {role_title} position at {company_name}.\n\n"
+                f"JOB DESCRIPTION:\n{job_description}\n\n"
+                f"CANDIDATE'S RESUME:\n{resume_text}\n\n"
+                "INSTRUCTIONS:\n"
+                "1. Do NOT fabricate or assume skills, tools, or experience based on the job description.\n"
+                "2. ONLY reference technologies, tools, and experience that are explicitly mentioned in the candidate’s resume.\n"
+                "3. In the opening, show genuine interest in the company based on the JD tone, without making assumptions.\n"
+                "4. Identify the top 3 most relevant qualifications from the resume.\n"
+                "5. Create a narrative that connects past achievements to future impact.\n"
+                "6. Use specific metrics, numbers, or results where available.\n"
+                "7. Show personality while maintaining professionalism.\n"
+                "8. End with a confident call to action.\n"
+                "9. Address it to 'Hiring Manager' and skip contact details/date.\n"
+                f"10. Write in a {tone_style} tone that matches the {role_title} role."
+            )
+        }
+    ]
+
+def cover_letter_request(messages: list) -> dict:
+    """Chat completion arguments for one cover letter, shared by the sync and async clients"""
+    return {"model": "gpt-4o", "messages": messages, "temperature": 0.7, "max_tokens": 1000}
+
+def _request_cover_letter(messages: list) -> str:
+    """Sends one cover letter request, returning an error marker instead of raising"""
+    try:
+        response = client.chat.completions.create(**cover_letter_request(messages))
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        raise_fixture_miss(e)
+        return f"[Error generating cover letter: {str(e)}]"
+
+async def _arequest_cover_letter(messages: list) -> str:
+    """Async _request_cover_letter; cancellation propagates to the caller"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert career coach who writes exceptional cover letters that get interviews. "
-                        "Create compelling, personalized cover letters that:\n"
-                        "- Open with a strong hook that shows genuine interest and knowledge about the company\n"
-                        "- Tell a story that connects the candidate's experience to the role's requirements\n"
-                        "- Use specific examples and quantifiable achievements\n"
-                        "- Show enthusiasm and cultural fit\n"
-                        "- End with a confident call-to-action\n"
-                        "- Sound authentic and human, not generic or robotic\n"
-                        "- Are concise but impactful (3-4 paragraphs max)\n"
-                        f"- Maintain a {tone_style} tone throughout"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Write a standout cover letter for {candidate_name} applying for the {role_title} position at {company_name}.\n\n"
-                        f"JOB DESCRIPTION:\n{job_description}\n\n"
-                        f"CANDIDATE'S RESUME:\n{resume_text}\n\n"
-                        "INSTRUCTIONS:\n"
-                        "1. Do NOT fabricate or assume skills, tools, or experience based on the job description.\n"
-                        "2. ONLY reference technologies, tools, and experience that are explicitly mentioned in the candidate’s resume.\n"
-                        "3. In the opening, show genuine interest in the company based on the JD tone, without making assumptions.\n"
-                        "4. Identify the top 3 most relevant qualifications from the resume.\n"
-                        "5. Create a narrative that connects past achievements to future impact.\n"
-                        "6. Use specific metrics, numbers, or results where available.\n"
-                        "7. Show personality while maintaining professionalism.\n"
-                        "8. End with a confident call to action.\n"
-                        "9. Address it to 'Hiring Manager' and skip contact details/date.\n"
-                        f"10. Write in a {tone_style} tone that matches the {role_title} role."
-                    )
-                }
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
+        response = await async_client.chat.completions.create(**cover_letter_request(messages))
         return response.choices[0].message.content.strip()
     except Exception as e:
-        return f"[Error generating cover letter: {str(e)}]"
\ No newline at end of file
+        raise_fixture_miss(e)
+        return f"[Error generating cover letter: {str(e)}]"
+
+def generate_cover_letter(formatted_resume: dict, job_description: str, candidate_name: str = "Candidate", company_name: str = "the company", role_title: str = "this position", tone: str = "professional", length: str = "standard", use_digest: bool = USE_RESUME_DIGEST, digest: Optional[dict] = None, parsed_resume: Optional[dict] = None) -> str:
+    """"Generate a personalized cover letter using resume content and job description.
+
+    With use_digest the resume is sent as its cached digest: pass digest when the caller already
+    has it, or parsed_resume to look it up. Without either the formatted resume is sent as is.
+    """
+    resume_text = resume_context(formatted_resume, use_digest, digest, parsed_resume)
+    messages = build_cover_letter_messages(resume_text, job_description, candidate_name, company_name, role_title, tone, length)
+    return _request_cover_letter(messages)
+
+def generate_cover_letter_variants(formatted_resume: dict, job_description: str, candidate_name: str = "Candidate", company_name: str = "the company", role_title: str = "this position", variants: List[Tuple[str, str]] = None, use_digest: bool = USE_RESUME_DIGEST, digest: Optional[dict] = None, parsed_resume: Optional[dict] = None) -> Dict[str, str]:
+    """Generates several tone/length variants concurrently from one shared resume/JD context"""
+    if not variants:
+        variants = [("professional", "standard")]
+
+    resume_text = resume_context(formatted_resume, use_digest, digest, parsed_resume)
+    requests = {
+        variant_key(tone, length): build_cover_letter_messages(resume_text, job_description, candidate_name, company_name, role_title, tone, length)
+        for tone, length in variants
+    }
+
+    with ThreadPoolExecutor(max_workers=min(MAX_VARIANT_WORKERS, len(requests))) as executor:
+        futures = {key: executor.submit(_request_cover_letter, messages) for key, messages in requests.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+async def agenerate_cover_letter(formatted_resume: dict, job_description: str, candidate_name: str = "Candidate", company_name: str = "the company", role_title: str = "this position", tone: str = "professional", length: str = "standard", timeout: Optional[float] = None, use_digest: bool = USE_RESUME_DIGEST, digest: Optional[dict] = None, parsed_resume: Optional[dict] = None) -> str:
+    """Async generate_cover_letter; raises asyncio.TimeoutError when timeout seconds pass first"""
+    async def run() -> str:
+        resume_text = await aresume_context(formatted_resume, use_digest, digest, parsed_resume)
+        messages = build_cover_letter_messages(resume_text, job_description, candidate_name, company_name, role_title, tone, length)
+        return await _arequest_cover_letter(messages)
+
+    return await asyncio.wait_for(run(), timeout)
+
+async def agenerate_cover_letter_variants(formatted_resume: dict, job_description: str, candidate_name: str = "Candidate", company_name: str = "the company", role_title: str = "this position", variants: List[Tuple[str, str]] = None, timeout: Optional[float] = None, use_digest: bool = USE_RESUME_DIGEST, digest: Optional[dict] = None, parsed_resume: Optional[dict] = None) -> Dict[str, str]:
+    """Async generate_cover_letter_variants; all variants run concurrently on the event loop"""
+    if not variants:
+        variants = [("professional", "standard")]
+
+    async def run() -> Dict[str, str]:
+        resume_text = await aresume_context(formatted_resume, use_digest, digest, parsed_resume)
+        requests = {
+            variant_key(tone, length): build_cover_letter_messages(resume_text, job_description, candidate_name, company_name, role_title, tone, length)
+            for tone, length in variants
+        }
+        letters = await asyncio.gather(*(_arequest_cover_letter(messages) for messages in requests.values()))
+        return dict(zip(requests, letters))
+
+    return await asyncio.wait_for(run(), timeout)
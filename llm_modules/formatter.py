@@ -1,12 +1,183 @@
-from openai import OpenAI
-from dotenv import load_dotenv
+from llm_modules.llm_client import get_client, get_async_client
+from llm_modules.transport import raise_fixture_miss
+from llm_modules.model_router import route_section, format_section_locally, record_routing_decision
+from utils.token_estimator import estimate_tokens, estimate_messages_tokens
+from typing import Optional
+import asyncio
+import json
 import os
+import time
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client("formatter")
+async_client = get_async_client("formatter")
 
-def format_resume_sections_with_llm(sections: dict) -> dict:
-    """Formats unstructured resume sections using GPT-4o while preserving order"""
+FORMAT_PACKING = os.getenv("FORMAT_PACKING", "0") == "1"
+FORMAT_PACK_TOKEN_BUDGET = int(os.getenv("FORMAT_PACK_TOKEN_BUDGET", "1500"))
+FORMAT_PACK_MAX_OUTPUT_TOKENS = 4000
+
+FORMATTER_SYSTEM_PROMPT = (
+    "You are an expert resume formatter. Your job is to take messy or unstructured resume content "
+    "and convert it into clean, well-formatted, professional-looking text. "
+    "Use proper spacing, punctuation, and consistent styling. "
+    "Convert lists of skills or achievements into bullet points if needed."
+)
+
+FORMATTING_RULES = (
+    "Make sure to:\n"
+    "- Add missing spaces between words or sentences.\n"
+    "- Format any inline skills, tools, or items into readable bullets or inline lists where appropriate.\n"
+    "- Keep section-specific formatting conventions (e.g., jobs in Experience should show role, org, date).\n"
+    "- Do NOT hallucinate or add any new content — only reformat what's provided.\n"
+    "- Use markdown-style bullet points if the content is list-like.\n"
+    "- Expand or display full URLs, don't truncate them.\n"
+    "- Do not end lines or bullet points with ellipses (...), unless it's intentional or a continuation.\n"
+    "- Preserve structured items such as degrees, institutions, job titles, and durations clearly.\n"
+    "- If a section like 'CGPA' or 'Scores' looks like it belongs to 'Education', merge or nest it under Education.\n"
+    "- If a section is titled 'Technologies', 'Tools', or 'Software', reclassify and format it under 'Skills'. Do not create a new section.\n"
+)
+
+def build_format_messages(section: str, content: str) -> list:
+    """Builds the chat messages asking the model to format one resume section"""
+    return [
+        {"role": "system", "content": FORMATTER_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"Please clean up and professionally format the following resume section.\n\n"
+                f"Section Title: {section}\n\n"
+                f"Raw Content:\n{content}\n\n"
+                + FORMATTING_RULES
+            )
+        }
+    ]
+
+def build_packed_format_messages(batch: list) -> list:
+    """Builds one request that formats several sections and returns them as a JSON object"""
+    sections_text = "\n\n".join(
+        f"=== SECTION: {section} ===\n{content}" for section, content in batch
+    )
+    return [
+        {"role": "system", "content": FORMATTER_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                "Please clean up and professionally format each of the following resume sections independently.\n\n"
+                f"{sections_text}\n\n"
+                + FORMATTING_RULES +
+                "\nReturn a JSON object whose keys are the section titles exactly as given after 'SECTION:' "
+                "and whose values are the formatted markdown text for that section. Do not merge sections in the JSON; "
+                "return every title once."
+            )
+        }
+    ]
+
+def pack_sections(sections: list, token_budget: int) -> list:
+    """Greedily groups (section, content) pairs into batches whose content fits the token budget"""
+    batches = []
+    current = []
+    current_tokens = 0
+    for section, content in sections:
+        tokens = estimate_tokens(content) + estimate_tokens(section) + 8
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((section, content))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def single_format_request(section: str, content: str, model: str) -> dict:
+    """Chat completion arguments for formatting one section"""
+    return {"model": model, "messages": build_format_messages(section, content), "temperature": 0.5, "max_tokens": 1000}
+
+def packed_format_request(batch: list, model: str) -> dict:
+    """Chat completion arguments for formatting a batch of sections in one JSON reply"""
+    output_budget = sum(estimate_tokens(content) for _, content in batch) * 2 + 100 * len(batch)
+    return {
+        "model": model,
+        "messages": build_packed_format_messages(batch),
+        "temperature": 0.5,
+        "max_tokens": min(FORMAT_PACK_MAX_OUTPUT_TOKENS, output_budget),
+        "response_format": {"type": "json_object"}
+    }
+
+def parse_packed_response(result: str, batch: list) -> dict:
+    """Sections of the batch the packed reply formatted; missing or empty ones are left out"""
+    result = result.strip()
+    if result.startswith('```json'):
+        result = result.replace('```json', '').replace('```', '').strip()
+    packed = json.loads(result)
+    if not isinstance(packed, dict):
+        return {}
+    return {
+        section: packed[section].strip() for section, _ in batch
+        if isinstance(packed.get(section), str) and packed[section].strip()
+    }
+
+def format_single_section(section: str, content: str, model: str = "gpt-4o") -> str:
+    """Formats one section with its own LLM call"""
+    try:
+        response = client.chat.completions.create(**single_format_request(section, content, model))
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        raise_fixture_miss(e)
+        return f"[Error formatting section: {e}]"
+
+def format_packed_sections(batch: list, model: str = "gpt-4o") -> dict:
+    """Formats a batch of sections in one call, falling back to per-section calls for any that fail"""
+    if len(batch) == 1:
+        section, content = batch[0]
+        return {section: format_single_section(section, content, model)}
+
+    try:
+        response = client.chat.completions.create(**packed_format_request(batch, model))
+        formatted = parse_packed_response(response.choices[0].message.content, batch)
+    except Exception as e:
+        raise_fixture_miss(e)
+        formatted = {}
+
+    for section, content in batch:
+        if section not in formatted:
+            formatted[section] = format_single_section(section, content, model)
+    return formatted
+
+async def aformat_single_section(section: str, content: str, model: str = "gpt-4o") -> str:
+    """Async format_single_section"""
+    try:
+        response = await async_client.chat.completions.create(**single_format_request(section, content, model))
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        raise_fixture_miss(e)
+        return f"[Error formatting section: {e}]"
+
+async def aformat_packed_sections(batch: list, model: str = "gpt-4o") -> dict:
+    """Async format_packed_sections; per-section fallbacks run concurrently"""
+    if len(batch) == 1:
+        section, content = batch[0]
+        return {section: await aformat_single_section(section, content, model)}
+
+    try:
+        response = await async_client.chat.completions.create(**packed_format_request(batch, model))
+        formatted = parse_packed_response(response.choices[0].message.content, batch)
+    except Exception as e:
+        raise_fixture_miss(e)
+        formatted = {}
+
+    missing = [(section, content) for section, content in batch if section not in formatted]
+    retried = await asyncio.gather(*(aformat_single_section(section, content, model) for section, content in missing))
+    formatted.update({section: text for (section, _), text in zip(missing, retried)})
+    return formatted
+
+def formatting_succeeded(formatted: dict) -> bool:
+    """Formatted resumes with failed sections are not persisted"""
+    return not any(text.startswith("[Error formatting section") for text in formatted.values())
+
+def plan_formatting(sections: dict, routing: bool, packing: bool, token_budget: int, local_only: bool) -> tuple:
+    """Orders the sections, formats the local ones and batches the rest per model.
+
+    Returns (ordered_keys, formatted_sections, decisions, batches) where batches is a list of (model, batch).
+    """
     formatted_sections = {}
     ordered_keys = list(sections.keys())
 
@@ -14,48 +185,72 @@ def format_resume_sections_with_llm(sections: dict) -> dict:
         ordered_keys.remove("Contact Information")
         ordered_keys.insert(0, "Contact Information")
 
+    pending_by_model = {}
+    decisions = {}
     for section in ordered_keys:
         content = sections[section]
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an expert resume formatter. Your job is to take messy or unstructured resume content "
-                            "and convert it into clean, well-formatted, professional-looking text. "
-                            "Use proper spacing, punctuation, and consistent styling. "
-                            "Convert lists of skills or achievements into bullet points if needed."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": (
-                            f"Please clean up and professionally format the following resume section.\n\n"
-                            f"Section Title: {section}\n\n"
-                            f"Raw Content:\n{content}\n\n"
-                            "Make sure to:\n"
-                            "- Add missing spaces between words or sentences.\n"
-                            "- Format any inline skills, tools, or items into readable bullets or inline lists where appropriate.\n"
-                            "- Keep section-specific formatting conventions (e.g., jobs in Experience should show role, org, date).\n"
-                            "- Do NOT hallucinate or add any new content — only reformat what's provided.\n"
-                            "- Use markdown-style bullet points if the content is list-like.\n"
-                            "- Expand or display full URLs, don't truncate them.\n"
-                            "- Do not end lines or bullet points with ellipses (...), unless it's intentional or a continuation.\n"
-                            "- Preserve structured items such as degrees, institutions, job titles, and durations clearly.\n"
-                            "- If a section like 'CGPA' or 'Scores' looks like it belongs to 'Education', merge or nest it under Education.\n"
-                            "- If a section is titled 'Technologies', 'Tools', or 'Software', reclassify and format it under 'Skills'. Do not create a new section.\n"
-                        )
-                    }
-                ],
-                temperature=0.5,
-                max_tokens=1000
+        if routing or local_only:
+            decision = route_section(section, content, local_only)
+        else:
+            decision = {"route": "default", "model": "gpt-4o", "reason": "routing disabled"}
+        decisions[section] = decision
+
+        if decision["route"] == "local":
+            start = time.perf_counter()
+            formatted_sections[section] = format_section_locally(section, content)
+            record_routing_decision(
+                section, decision, time.perf_counter() - start,
+                estimate_messages_tokens(build_format_messages(section, content))
             )
-            formatted_text = response.choices[0].message.content.strip()
-            formatted_sections[section] = formatted_text
+            continue
+
+        pending_by_model.setdefault(decision["model"], []).append((section, content))
+
+    batches = [
+        (model, batch)
+        for model, pending in pending_by_model.items()
+        for batch in (pack_sections(pending, token_budget) if packing else [[item] for item in pending])
+    ]
+    return ordered_keys, formatted_sections, decisions, batches
+
+def record_batch_routing(batch: list, decisions: dict, elapsed: float) -> None:
+    for section, content in batch:
+        record_routing_decision(
+            section, decisions[section], elapsed / len(batch),
+            estimate_messages_tokens(build_format_messages(section, content))
+        )
+
+def format_resume_sections_with_llm(sections: dict, routing: bool = True, packing: bool = FORMAT_PACKING, token_budget: int = FORMAT_PACK_TOKEN_BUDGET, local_only: bool = False) -> dict:
+    """Formats unstructured resume sections using GPT-4o while preserving order.
+
+    local_only formats every section deterministically without any LLM call.
+    """
+    ordered_keys, formatted_sections, decisions, batches = plan_formatting(sections, routing, packing, token_budget, local_only)
+
+    for model, batch in batches:
+        start = time.perf_counter()
+        formatted_sections.update(format_packed_sections(batch, model))
+        if routing:
+            record_batch_routing(batch, decisions, time.perf_counter() - start)
+
+    return {section: formatted_sections[section] for section in ordered_keys}
+
+async def aformat_resume_sections_with_llm(sections: dict, routing: bool = True, packing: bool = FORMAT_PACKING, token_budget: int = FORMAT_PACK_TOKEN_BUDGET, local_only: bool = False, timeout: Optional[float] = None) -> dict:
+    """Async format_resume_sections_with_llm; every batch is in flight at once.
+
+    Raises asyncio.TimeoutError when timeout seconds pass first; cancelling the task cancels every call.
+    """
+    ordered_keys, formatted_sections, decisions, batches = plan_formatting(sections, routing, packing, token_budget, local_only)
+
+    async def run_batch(model: str, batch: list) -> dict:
+        start = time.perf_counter()
+        formatted = await aformat_packed_sections(batch, model)
+        if routing:
+            record_batch_routing(batch, decisions, time.perf_counter() - start)
+        return formatted
 
-        except Exception as e:
-            formatted_sections[section] = f"[Error formatting section: {e}]"
+    results = await asyncio.wait_for(asyncio.gather(*(run_batch(model, batch) for model, batch in batches)), timeout)
+    for formatted in results:
+        formatted_sections.update(formatted)
 
-    return formatted_sections
\ No newline at end of file
+    return {section: formatted_sections[section] for section in ordered_keys}
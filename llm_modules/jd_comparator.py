@@ -1,147 +1,476 @@
-from openai import OpenAI
-from dotenv import load_dotenv
+from llm_modules.llm_client import get_client, get_async_client
+from llm_modules.transport import raise_fixture_miss
+from resume_parser.parsed_resume import render_resume_text
+from llm_modules.jd_requirements import get_jd_requirements, aget_jd_requirements, render_requirements
+from llm_modules.resume_digest import USE_RESUME_DIGEST, get_resume_digest, aget_resume_digest, resume_prompt_text
+from utils.jd_preprocessor import strip_boilerplate, split_jd_chunks
+from utils.token_estimator import estimate_tokens
+from utils.incremental_json import IncrementalJSONItems
+from utils.metrics import record_llm_tokens
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+import asyncio
 import os
 import json
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client("jd_comparator")
+async_client = get_async_client("jd_comparator")
 
-def compare_resume_with_jd(parsed_resume: dict, job_description: str) -> dict:
-    """Performs semantic comparison between a parsed resume and a job description"""
+COMPARISON_TOKEN_LIMIT = int(os.getenv("COMPARISON_TOKEN_LIMIT", "6000"))
+JD_CHUNK_TOKENS = int(os.getenv("JD_CHUNK_TOKENS", "1200"))
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "4000"))
+MAX_MAP_WORKERS = 4
+LOW_VALUE_SECTIONS = ["References", "Interests", "Hobbies", "Activities"]
+USE_JD_REQUIREMENTS = os.getenv("USE_JD_REQUIREMENTS", "1") == "1"
+REQUIREMENTS_LABEL = "JOB REQUIREMENTS (extracted from the job description as [importance, category] requirement)"
+STREAMED_KEYS = ("matched_skills", "missing_critical")
 
-    load_dotenv()
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    
-    resume_text = "\n\n".join(f"{section}:\n{content}" for section, content in parsed_resume.items())
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an elite talent acquisition specialist with deep expertise across all industries "
-                        "(tech, finance, healthcare, marketing, operations, design, manufacturing, consulting, etc.). "
-                        "Your role is to perform sophisticated resume-JD matching that goes beyond keyword matching.\n\n"
-                        
-                        "CORE PRINCIPLES:\n"
-                        "1. SEMANTIC INTELLIGENCE: Recognize when different terms mean the same thing (e.g., 'JavaScript' vs 'JS', 'Project Management' vs 'Program Coordination')\n"
-                        "2. CROSS-DOMAIN RELEVANCE: Identify when skills from one domain apply to another (e.g., statistical analysis for marketing analytics, SQL for business intelligence)\n"
-                        "3. CONTEXTUAL UNDERSTANDING: Consider the level, depth, and application context of skills\n"
-                        "4. TRANSFERABLE SKILLS: Recognize universally valuable skills (leadership, problem-solving, communication)\n"
-                        "5. DOMAIN EXPERTISE: Understand industry-specific tools, methodologies, and career progressions\n\n"
-                        
-                        "ADVANCED MATCHING LOGIC:\n"
-                        "- If JD mentions 'data analysis' and resume has 'statistical modeling' → MATCH\n"
-                        "- If JD requires 'cloud experience' and resume shows 'AWS/Azure/GCP' → MATCH\n"
-                        "- If JD needs 'customer service' and resume has 'client relationship management' → MATCH\n"
-                        "- If JD wants 'automation' and resume shows 'Python scripting for workflows' → MATCH\n"
-                        "- Consider certifications relevant to the domain even if not explicitly mentioned\n"
-                        "- Recognize when experience level aligns with role requirements\n\n"
-                        
-                        "EVALUATION FRAMEWORK:\n"
-                        "- Technical skills: Exact matches, similar technologies, transferable concepts\n"
-                        "- Soft skills: Leadership, communication, teamwork, problem-solving\n"
-                        "- Industry knowledge: Domain-specific understanding, regulations, processes\n"
-                        "- Tools & platforms: Direct matches, equivalent alternatives, related ecosystems\n"
-                        "- Certifications: Relevant credentials, even if not explicitly required\n"
-                        "- Experience depth: Junior/mid/senior level alignment"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"JOB DESCRIPTION:\n{job_description}\n\n"
-                        f"RESUME CONTENT:\n{resume_text}\n\n"
-                        
-                        "Perform a comprehensive analysis and return a JSON with these exact keys:\n\n"
-                        
-                        "{\n"
-                        "  \"matched_skills\": [\n"
-                        "    {\n"
-                        "      \"skill\": \"skill name\",\n"
-                        "      \"jd_term\": \"how it appears in JD\",\n"
-                        "      \"resume_term\": \"how it appears in resume\",\n"
-                        "      \"match_type\": \"exact|semantic|transferable|domain_relevant\",\n"
-                        "      \"confidence\": 0.0-1.0,\n"
-                        "      \"reasoning\": \"why this is a match\"\n"
-                        "    }\n"
-                        "  ],\n"
-                        "  \"missing_critical\": [\n"
-                        "    {\n"
-                        "      \"skill\": \"missing skill\",\n"
-                        "      \"importance\": \"critical|important|nice_to_have\",\n"
-                        "      \"category\": \"technical|soft_skill|certification|experience\",\n"
-                        "      \"alternatives\": [\"potential alternatives candidate might have\"]\n"
-                        "    }\n"
-                        "  ],\n"
-                        "  \"resume_strengths\": [\n"
-                        "    {\n"
-                        "      \"skill\": \"additional skill\",\n"
-                        "      \"relevance\": \"highly_relevant|somewhat_relevant|transferable\",\n"
-                        "      \"value_add\": \"how this benefits the role\"\n"
-                        "    }\n"
-                        "  ],\n"
-                        "  \"overall_assessment\": {\n"
-                        "    \"match_percentage\": 0-100,\n"
-                        "    \"fit_level\": \"excellent|good|moderate|poor\",\n"
-                        "    \"key_strengths\": [\"top 3 alignment points\"],\n"
-                        "    \"main_gaps\": [\"top 3 missing elements\"],\n"
-                        "    \"recommendation\": \"proceed|conditional|pass\",\n"
-                        "    \"reasoning\": \"detailed explanation of the assessment\"\n"
-                        "  },\n"
-                        "  \"domain_insights\": {\n"
-                        "    \"resume_domain\": \"identified domain\",\n"
-                        "    \"jd_domain\": \"job domain\",\n"
-                        "    \"cross_domain_applicability\": \"high|medium|low\",\n"
-                        "    \"domain_specific_notes\": \"relevant observations\"\n"
-                        "  }\n"
-                        "}\n\n"
-                        
-                        "CRITICAL INSTRUCTIONS:\n"
-                        "- Be generous with semantic matching but rigorous with accuracy\n"
-                        "- Consider the seniority level and adjust expectations accordingly\n"
-                        "- Identify domain-relevant certifications even if not explicitly mentioned in JD\n"
-                        "- Recognize when someone has deeper expertise in related areas\n"
-                        "- Account for industry transitions and transferable skills\n"
-                        "- Provide actionable insights in your reasoning\n"
-                        "- Ensure the JSON is valid and complete"
-                    )
-                }
-            ],
-            temperature=0.2,
-            max_tokens=2000
-        )
-        
-        json_response = response.choices[0].message.content.strip()
-        
-        if json_response.startswith('```json'):
-            json_response = json_response.replace('```json', '').replace('```', '').strip()
-        
-        result = json.loads(json_response)
-        
-        result['analysis_metadata'] = {
-            'model_used': 'gpt-4o',
-            'analysis_type': 'comprehensive_semantic_matching',
-            'timestamp': str(os.getenv('TIMESTAMP', 'unknown')),
-            'resume_sections_analyzed': list(parsed_resume.keys())
+def fit_resume_to_budget(parsed_resume: dict, token_budget: int) -> dict:
+    """Drops low-value sections and trims the longest ones until the resume fits the token budget"""
+    if estimate_tokens(render_resume_text(parsed_resume)) <= token_budget:
+        return parsed_resume
+
+    fitted = dict(parsed_resume)
+    for section in list(fitted):
+        if any(low.lower() == section.lower() for low in LOW_VALUE_SECTIONS):
+            del fitted[section]
+
+    while estimate_tokens(render_resume_text(fitted)) > token_budget:
+        longest = max(fitted, key=lambda name: len(fitted[name]))
+        words = fitted[longest].split()
+        if len(words) <= 40:
+            break
+        fitted[longest] = " ".join(words[: int(len(words) * 0.8)])
+    return fitted
+
+def build_comparison_messages(resume_text: str, job_description: str, jd_label: str = "JOB DESCRIPTION") -> list:
+    """Builds the chat messages for one resume vs JD comparison"""
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are an elite talent acquisition specialist with deep expertise across all industries "
+                "(tech, finance, healthcare, marketing, operations, design, manufacturing, consulting, etc.). "
+                "Your role is to perform sophisticated resume-JD matching that goes beyond keyword matching.\n\n"
+                
+                "CORE PRINCIPLES:\n"
+                "1. SEMANTIC INTELLIGENCE: Recognize when different terms mean the same thing (e.g., 'JavaScript' vs 'JS', 'Project Management' vs 'Program Coordination')\n"
+                "2. CROSS-DOMAIN RELEVANCE: Identify when skills from one domain apply to another (e.g., statistical analysis for marketing analytics, SQL for business intelligence)\n"
+                "3. CONTEXTUAL UNDERSTANDING: Consider the level, depth, and application context of skills\n"
+                "4. TRANSFERABLE SKILLS: Recognize universally valuable skills (leadership, problem-solving, communication)\n"
+                "5. DOMAIN EXPERTISE: Understand industry-specific tools, methodologies, and career progressions\n\n"
+                
+                "ADVANCED MATCHING LOGIC:\n"
+                "- If JD mentions 'data analysis' and resume has 'statistical modeling' → MATCH\n"
+                "- If JD requires 'cloud experience' and resume shows 'AWS/Azure/GCP' → MATCH\n"
+                "- If JD needs 'customer service' and resume has 'client relationship management' → MATCH\n"
+                "- If JD wants 'automation' and resume shows 'Python scripting for workflows' → MATCH\n"
+                "- Consider certifications relevant to the domain even if not explicitly mentioned\n"
+                "- Recognize when experience level aligns with role requirements\n\n"
+                
+                "EVALUATION FRAMEWORK:\n"
+                "- Technical skills: Exact matches, similar technologies, transferable concepts\n"
+                "- Soft skills: Leadership, communication, teamwork, problem-solving\n"
+                "- Industry knowledge: Domain-specific understanding, regulations, processes\n"
+                "- Tools & platforms: Direct matches, equivalent alternatives, related ecosystems\n"
+                "- Certifications: Relevant credentials, even if not explicitly required\n"
+                "- Experience depth: Junior/mid/senior level alignment"
+            )
+        },
+        {
+            "role": "user",
+            "content": (
+                f"{jd_label}:\n{job_description}\n\n"
+                f"RESUME CONTENT:\n{resume_text}\n\n"
+                
+                "Perform a comprehensive analysis and return a JSON with these exact keys:\n\n"
+                
+                "{\n"
+                "  \"matched_skills\": [\n"
+                "    {\n"
+                "      \"skill\": \"skill name\",\n"
+                "      \"jd_term\": \"how it appears in JD\",\n"
+                "      \"resume_term\": \"how it appears in resume\",\n"
+                "      \"match_type\": \"exact|semantic|transferable|domain_relevant\",\n"
+                "      \"confidence\": 0.0-1.0,\n"
+                "      \"reasoning\": \"why this is a match\"\n"
+                "    }\n"
+                "  ],\n"
+                "  \"missing_critical\": [\n"
+                "    {\n"
+                "      \"skill\": \"missing skill\",\n"
+                "      \"importance\": \"critical|important|nice_to_have\",\n"
+                "      \"category\": \"technical|soft_skill|certification|experience\",\n"
+                "      \"alternatives\": [\"potential alternatives candidate might have\"]\n"
+                "    }\n"
+                "  ],\n"
+                "  \"resume_strengths\": [\n"
+                "    {\n"
+                "      \"skill\": \"additional skill\",\n"
+                "      \"relevance\": \"highly_relevant|somewhat_relevant|transferable\",\n"
+                "      \"value_add\": \"how this benefits the role\"\n"
+                "    }\n"
+                "  ],\n"
+                "  \"overall_assessment\": {\n"
+                "    \"match_percentage\": 0-100,\n"
+                "    \"fit_level\": \"excellent|good|moderate|poor\",\n"
+                "    \"key_strengths\": [\"top 3 alignment points\"],\n"
+                "    \"main_gaps\": [\"top 3 missing elements\"],\n"
+                "    \"recommendation\": \"proceed|conditional|pass\",\n"
+                "    \"reasoning\": \"detailed explanation of the assessment\"\n"
+                "  },\n"
+                "  \"domain_insights\": {\n"
+                "    \"resume_domain\": \"identified domain\",\n"
+                "    \"jd_domain\": \"job domain\",\n"
+                "    \"cross_domain_applicability\": \"high|medium|low\",\n"
+                "    \"domain_specific_notes\": \"relevant observations\"\n"
+                "  }\n"
+                "}\n\n"
+                
+                "CRITICAL INSTRUCTIONS:\n"
+                "- Be generous with semantic matching but rigorous with accuracy\n"
+                "- Consider the seniority level and adjust expectations accordingly\n"
+                "- Identify domain-relevant certifications even if not explicitly mentioned in JD\n"
+                "- Recognize when someone has deeper expertise in related areas\n"
+                "- Account for industry transitions and transferable skills\n"
+                "- Provide actionable insights in your reasoning\n"
+                "- Ensure the JSON is valid and complete"
+            )
         }
-        
-        return result
-        
-    except json.JSONDecodeError as e:
+    ]
+
+def parse_comparison_response(json_response: str) -> dict:
+    """Parses the comparator's JSON reply, stripping markdown fences"""
+    json_response = json_response.strip()
+    if json_response.startswith('```json'):
+        json_response = json_response.replace('```json', '').replace('```', '').strip()
+    return json.loads(json_response)
+
+def comparison_request(resume_text: str, job_description: str, jd_label: str = "JOB DESCRIPTION") -> dict:
+    """Chat completion arguments for one comparison, shared by the sync and async clients"""
+    return {
+        "model": "gpt-4o",
+        "messages": build_comparison_messages(resume_text, job_description, jd_label),
+        "temperature": 0.2,
+        "max_tokens": 2000
+    }
+
+def comparison_error(e: Exception, json_response: str) -> dict:
+    if isinstance(e, json.JSONDecodeError):
         return {
             "error": "JSON parsing failed",
             "raw_response": json_response,
             "json_error": str(e)
         }
+    return {
+        "error": "Analysis failed",
+        "error_type": type(e).__name__,
+        "error_message": str(e)
+    }
+
+def request_comparison(resume_text: str, job_description: str, jd_label: str = "JOB DESCRIPTION") -> dict:
+    """Runs one comparison call, returning the comparator's error dict on failure"""
+    json_response = ""
+    try:
+        response = client.chat.completions.create(**comparison_request(resume_text, job_description, jd_label))
+        json_response = response.choices[0].message.content.strip()
+        return parse_comparison_response(json_response)
     except Exception as e:
-        return {
-            "error": "Analysis failed",
-            "error_type": type(e).__name__,
-            "error_message": str(e)
-        }
+        raise_fixture_miss(e)
+        return comparison_error(e, json_response)
+
+def stream_comparison(resume_text: str, job_description: str, jd_label: str, on_item: Callable[[str, Any], None]) -> dict:
+    """request_comparison over a streamed response, calling on_item(key, item) for each
+    matched_skills / missing_critical entry as soon as it is complete"""
+    parser = IncrementalJSONItems(STREAMED_KEYS)
+    parts = []
+    request = comparison_request(resume_text, job_description, jd_label)
+    try:
+        stream = client.chat.completions.create(**request, stream=True, stream_options={"include_usage": True})
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                record_llm_tokens("jd_comparator", request["model"], chunk.usage.model_dump())
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            parts.append(chunk.choices[0].delta.content)
+            for key, item in parser.feed(parts[-1]):
+                on_item(key, item)
+        return parse_comparison_response("".join(parts))
+    except Exception as e:
+        raise_fixture_miss(e)
+        return comparison_error(e, "".join(parts).strip())
+
+async def arequest_comparison(resume_text: str, job_description: str, jd_label: str = "JOB DESCRIPTION") -> dict:
+    """Async request_comparison"""
+    json_response = ""
+    try:
+        response = await async_client.chat.completions.create(**comparison_request(resume_text, job_description, jd_label))
+        json_response = response.choices[0].message.content.strip()
+        return parse_comparison_response(json_response)
+    except Exception as e:
+        raise_fixture_miss(e)
+        return comparison_error(e, json_response)
+
+async def _resolved(value: Any = None) -> Any:
+    return value
+
+def fit_level_for(match_percentage: float) -> str:
+    if match_percentage >= 80:
+        return "excellent"
+    if match_percentage >= 60:
+        return "good"
+    if match_percentage >= 40:
+        return "moderate"
+    return "poor"
+
+def recommendation_for(match_percentage: float) -> str:
+    if match_percentage >= 70:
+        return "proceed"
+    if match_percentage >= 45:
+        return "conditional"
+    return "pass"
+
+def merge_comparisons(results: list, weights: list) -> dict:
+    """Reduces per-chunk comparisons into the single comparison schema"""
+    importance_rank = {"critical": 0, "important": 1, "nice_to_have": 2}
+
+    matched = {}
+    for result in results:
+        for match in result.get("matched_skills", []):
+            key = match.get("skill", "").strip().lower()
+            if key and (key not in matched or match.get("confidence", 0) > matched[key].get("confidence", 0)):
+                matched[key] = match
+
+    missing = {}
+    for result in results:
+        for gap in result.get("missing_critical", []):
+            key = gap.get("skill", "").strip().lower()
+            if not key or key in matched:
+                continue
+            if key not in missing or importance_rank.get(gap.get("importance"), 3) < importance_rank.get(missing[key].get("importance"), 3):
+                missing[key] = gap
+
+    strengths = {}
+    for result in results:
+        for strength in result.get("resume_strengths", []):
+            key = strength.get("skill", "").strip().lower()
+            if key and key not in matched and key not in strengths:
+                strengths[key] = strength
+
+    total_weight = sum(weights) or 1
+    match_percentage = round(sum(
+        result.get("overall_assessment", {}).get("match_percentage", 0) * weight
+        for result, weight in zip(results, weights)
+    ) / total_weight)
+
+    ranked_matches = sorted(matched.values(), key=lambda m: m.get("confidence", 0), reverse=True)
+    ranked_gaps = sorted(missing.values(), key=lambda g: importance_rank.get(g.get("importance"), 3))
+
+    domains = [result.get("domain_insights", {}) for result in results if result.get("domain_insights")]
+    domain_insights = dict(domains[0]) if domains else {
+        "resume_domain": "unknown", "jd_domain": "unknown",
+        "cross_domain_applicability": "medium", "domain_specific_notes": ""
+    }
+    notes = [d.get("domain_specific_notes", "") for d in domains if d.get("domain_specific_notes")]
+    if notes:
+        domain_insights["domain_specific_notes"] = " ".join(dict.fromkeys(notes))
+
+    reasonings = [
+        result.get("overall_assessment", {}).get("reasoning", "") for result in results
+        if result.get("overall_assessment", {}).get("reasoning")
+    ]
+
+    return {
+        "matched_skills": ranked_matches,
+        "missing_critical": ranked_gaps,
+        "resume_strengths": list(strengths.values()),
+        "overall_assessment": {
+            "match_percentage": match_percentage,
+            "fit_level": fit_level_for(match_percentage),
+            "key_strengths": [m["skill"] for m in ranked_matches[:3]],
+            "main_gaps": [g["skill"] for g in ranked_gaps[:3]],
+            "recommendation": recommendation_for(match_percentage),
+            "reasoning": " ".join(dict.fromkeys(reasonings))
+        },
+        "domain_insights": domain_insights
+    }
+
+def reduce_chunk_comparisons(results: list, chunks: list) -> dict:
+    succeeded = [(result, estimate_tokens(chunk)) for result, chunk in zip(results, chunks) if "error" not in result]
+    if not succeeded:
+        return results[0]
+
+    merged = merge_comparisons([r for r, _ in succeeded], [w for _, w in succeeded])
+    merged["_chunks"] = {"total": len(chunks), "failed": len(chunks) - len(succeeded)}
+    return merged
+
+def map_reduce_comparison(resume_text: str, job_description: str, jd_label: str = "JOB DESCRIPTION") -> dict:
+    """Matches each JD requirement chunk against the resume in parallel and merges the results"""
+    chunks = split_jd_chunks(job_description, JD_CHUNK_TOKENS)
+    with ThreadPoolExecutor(max_workers=min(MAX_MAP_WORKERS, len(chunks))) as executor:
+        results = list(executor.map(lambda chunk: request_comparison(resume_text, chunk, jd_label), chunks))
+    return reduce_chunk_comparisons(results, chunks)
+
+async def amap_reduce_comparison(resume_text: str, job_description: str, jd_label: str = "JOB DESCRIPTION") -> dict:
+    """Async map_reduce_comparison; at most MAX_MAP_WORKERS chunk calls are in flight per comparison"""
+    chunks = split_jd_chunks(job_description, JD_CHUNK_TOKENS)
+    semaphore = asyncio.Semaphore(MAX_MAP_WORKERS)
+
+    async def compare_chunk(chunk: str) -> dict:
+        async with semaphore:
+            return await arequest_comparison(resume_text, chunk, jd_label)
+
+    results = await asyncio.gather(*(compare_chunk(chunk) for chunk in chunks))
+    return reduce_chunk_comparisons(results, chunks)
+
+def prepare_comparison(parsed_resume: dict, job_description: str, digest: Optional[dict] = None) -> tuple:
+    """(jd_text, resume_text, resume_input) fed to the comparison.
+
+    resume_text is the rendered digest when one is given and smaller than the resume text.
+    """
+    jd_text = strip_boilerplate(job_description) or job_description
+    resume_text, resume_input = resume_prompt_text(parsed_resume, digest)
+    return jd_text, resume_text, resume_input
+
+def map_reduce_resume(parsed_resume: dict, resume_text: str, resume_input: str) -> tuple:
+    """(resume_sections, resume_text, trimmed) sent with every chunk of a map-reduce comparison.
+
+    Each chunk call repeats the resume, so a full-text resume over RESUME_TOKEN_BUDGET is cut
+    down with fit_resume_to_budget; a digest is sent as is. Single-call comparisons never trim.
+    """
+    if resume_input != "full_text":
+        return parsed_resume, resume_text, False
+    fitted = fit_resume_to_budget(parsed_resume, RESUME_TOKEN_BUDGET)
+    if fitted is parsed_resume:
+        return parsed_resume, resume_text, False
+    return fitted, render_resume_text(fitted), True
+
+def comparison_input(jd_text: str, requirements: Optional[dict]) -> tuple:
+    """(jd_input, jd_label, requirements) - the requirement list when extraction succeeded, else the JD text"""
+    if requirements and "error" not in requirements and requirements.get("requirements"):
+        return render_requirements(requirements), REQUIREMENTS_LABEL, requirements
+    return jd_text, "JOB DESCRIPTION", None
+
+def needs_map_reduce(map_reduce: bool, jd_input: str, resume_text: str) -> bool:
+    return map_reduce and estimate_tokens(jd_input) + estimate_tokens(resume_text) > COMPARISON_TOKEN_LIMIT
+
+def finish_comparison(result: dict, job_description: str, jd_text: str, jd_input: str, resume_sections: dict, requirements: Optional[dict], use_map_reduce: bool, resume_text: str = "", resume_input: str = "full_text", resume_trimmed: bool = False) -> dict:
+    """Attaches analysis_metadata to a successful comparison"""
+    if "error" in result:
+        return result
+
+    chunk_info = result.pop("_chunks", None)
+    result['analysis_metadata'] = {
+        'model_used': 'gpt-4o',
+        'analysis_type': 'map_reduce_semantic_matching' if use_map_reduce else 'comprehensive_semantic_matching',
+        'timestamp': str(os.getenv('TIMESTAMP', 'unknown')),
+        'resume_sections_analyzed': list(resume_sections.keys()),
+        'jd_input': 'requirements' if requirements else 'full_text',
+        'jd_tokens_estimated': estimate_tokens(jd_input),
+        'resume_input': resume_input,
+        'resume_tokens_estimated': estimate_tokens(resume_text),
+        'resume_trimmed': resume_trimmed,
+        'boilerplate_tokens_removed': max(0, estimate_tokens(job_description) - estimate_tokens(jd_text))
+    }
+    if chunk_info:
+        result['analysis_metadata']['jd_chunks'] = chunk_info
+    if requirements:
+        result['analysis_metadata']['requirements_count'] = len(requirements["requirements"])
+
+    return result
+
+def plan_comparison(parsed_resume: dict, job_description: str, requirements: Optional[dict] = None, digest: Optional[dict] = None, map_reduce: bool = True) -> dict:
+    """The chat requests compare_resume_with_jd would send, for callers that send them some other way (bulk batches).
+
+    requirements and digest are the stored JD requirements and resume digest, or None for the full texts.
+    """
+    jd_text, resume_text, resume_input = prepare_comparison(parsed_resume, job_description, digest)
+    jd_input, jd_label, requirements = comparison_input(jd_text, requirements)
+    resume_sections, resume_trimmed = parsed_resume, False
+    use_map_reduce = needs_map_reduce(map_reduce, jd_input, resume_text)
+    if use_map_reduce:
+        resume_sections, resume_text, resume_trimmed = map_reduce_resume(parsed_resume, resume_text, resume_input)
+    chunks = split_jd_chunks(jd_input, JD_CHUNK_TOKENS) if use_map_reduce else [jd_input]
+    return {
+        "job_description": job_description,
+        "jd_text": jd_text,
+        "jd_input": jd_input,
+        "resume_sections": resume_sections,
+        "resume_text": resume_text,
+        "resume_input": resume_input,
+        "resume_trimmed": resume_trimmed,
+        "requirements": requirements,
+        "use_map_reduce": use_map_reduce,
+        "chunks": chunks,
+        "requests": [comparison_request(resume_text, chunk, jd_label) for chunk in chunks],
+    }
+
+def finish_planned_comparison(plan: dict, results: list) -> dict:
+    """Combines the parsed replies to a plan's requests (in order) into the compare_resume_with_jd result"""
+    result = reduce_chunk_comparisons(results, plan["chunks"]) if plan["use_map_reduce"] else results[0]
+    return finish_comparison(
+        result, plan["job_description"], plan["jd_text"], plan["jd_input"], plan["resume_sections"],
+        plan["requirements"], plan["use_map_reduce"], plan["resume_text"], plan["resume_input"],
+        plan.get("resume_trimmed", False)
+    )
+
+def compare_resume_with_jd(parsed_resume: dict, job_description: str, map_reduce: bool = True, use_requirements: bool = USE_JD_REQUIREMENTS, on_item: Optional[Callable[[str, Any], None]] = None, use_digest: bool = USE_RESUME_DIGEST, digest: Optional[dict] = None) -> dict:
+    """Performs semantic comparison between a parsed resume and a job description.
+
+    With use_requirements the JD is reduced once (and cached per normalized JD) to a compact
+    requirement list, and only that list is sent with the resume. With use_digest the resume is
+    likewise sent as its cached digest (pass digest when the caller already has it). With on_item
+    the single-call comparison is streamed and each matched skill or gap is passed on as soon as
+    it arrives; map-reduce comparisons only report their merged result.
+    """
+    if use_digest and digest is None:
+        digest = get_resume_digest(parsed_resume)
+    jd_text, resume_text, resume_input = prepare_comparison(
+        parsed_resume, job_description, digest if use_digest else None
+    )
+    jd_input, jd_label, requirements = comparison_input(
+        jd_text, get_jd_requirements(job_description) if use_requirements else None
+    )
+
+    resume_sections, resume_trimmed = parsed_resume, False
+    use_map_reduce = needs_map_reduce(map_reduce, jd_input, resume_text)
+    if use_map_reduce:
+        resume_sections, resume_text, resume_trimmed = map_reduce_resume(parsed_resume, resume_text, resume_input)
+        result = map_reduce_comparison(resume_text, jd_input, jd_label)
+    elif on_item is not None:
+        result = stream_comparison(resume_text, jd_input, jd_label, on_item)
+    else:
+        result = request_comparison(resume_text, jd_input, jd_label)
+
+    return finish_comparison(
+        result, job_description, jd_text, jd_input, resume_sections, requirements, use_map_reduce, resume_text, resume_input, resume_trimmed
+    )
+
+async def acompare_resume_with_jd(parsed_resume: dict, job_description: str, map_reduce: bool = True, use_requirements: bool = USE_JD_REQUIREMENTS, timeout: Optional[float] = None, use_digest: bool = USE_RESUME_DIGEST, digest: Optional[dict] = None) -> dict:
+    """Async compare_resume_with_jd; raises asyncio.TimeoutError when timeout seconds pass first"""
+    async def run() -> dict:
+        requirements, resume_digest = await asyncio.gather(
+            aget_jd_requirements(job_description) if use_requirements else _resolved(),
+            aget_resume_digest(parsed_resume) if use_digest and digest is None else _resolved(digest),
+        )
+        jd_text, resume_text, resume_input = prepare_comparison(
+            parsed_resume, job_description, resume_digest if use_digest else None
+        )
+        jd_input, jd_label, requirements = comparison_input(jd_text, requirements)
+
+        resume_sections, resume_trimmed = parsed_resume, False
+        use_map_reduce = needs_map_reduce(map_reduce, jd_input, resume_text)
+        if use_map_reduce:
+            resume_sections, resume_text, resume_trimmed = map_reduce_resume(parsed_resume, resume_text, resume_input)
+            result = await amap_reduce_comparison(resume_text, jd_input, jd_label)
+        else:
+            result = await arequest_comparison(resume_text, jd_input, jd_label)
+
+        return finish_comparison(
+            result, job_description, jd_text, jd_input, resume_sections, requirements, use_map_reduce, resume_text, resume_input, resume_trimmed
+        )
+
+    return await asyncio.wait_for(run(), timeout)
 
 def get_domain_specific_insights(resume_analysis: dict) -> dict:
     """Extract domain-specific insights and recommendations from the analysis"""
@@ -0,0 +1,211 @@
+from llm_modules.llm_client import get_client, get_async_client
+from llm_modules.transport import raise_fixture_miss
+from utils.jd_preprocessor import strip_boilerplate, split_jd_chunks
+from utils.result_store import get_or_compute, get_result, put_result, is_cacheable, hash_text
+from utils.token_estimator import estimate_tokens
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import asyncio
+import json
+import os
+import threading
+
+client = get_client("jd_requirements")
+async_client = get_async_client("jd_requirements")
+
+REQUIREMENTS_MODEL = os.getenv("JD_REQUIREMENTS_MODEL", "gpt-4o")
+REQUIREMENTS_CHUNK_TOKENS = int(os.getenv("JD_REQUIREMENTS_CHUNK_TOKENS", "3000"))
+MAX_EXTRACTION_WORKERS = 4
+
+IMPORTANCE_LEVELS = ["critical", "important", "nice_to_have"]
+CATEGORIES = ["technical", "soft_skill", "certification", "experience", "education", "domain"]
+
+_inflight_lock = threading.Lock()
+_inflight: Dict[str, threading.Lock] = {}
+_async_inflight: Dict[str, "asyncio.Task"] = {}
+
+def normalize_jd(job_description: str) -> str:
+    """Boilerplate-free, case- and whitespace-insensitive form used to key the requirement cache"""
+    return " ".join((strip_boilerplate(job_description) or job_description).lower().split())
+
+def jd_requirements_hash(job_description: str) -> str:
+    return hash_text(normalize_jd(job_description))
+
+def build_requirement_messages(job_description: str) -> list:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a job requirement analyst. You read job descriptions from any industry and "
+                "extract every distinct requirement a candidate is screened against: skills, tools, "
+                "certifications, education, years and kind of experience, domain knowledge and soft skills. "
+                "Merge duplicates, keep each requirement short (a few words) and list common synonyms as aliases."
+            )
+        },
+        {
+            "role": "user",
+            "content": (
+                f"JOB DESCRIPTION:\n{job_description}\n\n"
+                "Return JSON with these exact keys:\n"
+                "{\n"
+                "  \"role\": {\"title\": \"job title\", \"domain\": \"industry or function\", \"seniority\": \"junior|mid|senior|lead|unknown\"},\n"
+                "  \"requirements\": [\n"
+                "    {\n"
+                "      \"requirement\": \"short requirement\",\n"
+                f"      \"importance\": \"{'|'.join(IMPORTANCE_LEVELS)}\",\n"
+                f"      \"category\": \"{'|'.join(CATEGORIES)}\",\n"
+                "      \"aliases\": [\"equivalent terms\"]\n"
+                "    }\n"
+                "  ]\n"
+                "}\n\n"
+                "Mark requirements stated as required/must-have as critical, preferred ones as important and "
+                "bonus/nice-to-have ones as nice_to_have. Return only the JSON."
+            )
+        }
+    ]
+
+def requirements_request(job_description: str) -> dict:
+    """Chat completion arguments for one extraction, shared by the sync and async clients"""
+    return {
+        "model": REQUIREMENTS_MODEL,
+        "messages": build_requirement_messages(job_description),
+        "temperature": 0.0,
+        "max_tokens": 2000,
+        "response_format": {"type": "json_object"}
+    }
+
+def parse_requirements_response(json_response: str) -> dict:
+    result = json.loads(json_response)
+    if not isinstance(result.get("requirements"), list):
+        return {"error": "Requirement extraction returned no requirement list", "raw_response": json_response}
+    return result
+
+def request_requirements(job_description: str) -> dict:
+    json_response = ""
+    try:
+        response = client.chat.completions.create(**requirements_request(job_description))
+        json_response = response.choices[0].message.content.strip()
+        return parse_requirements_response(json_response)
+    except json.JSONDecodeError as e:
+        return {"error": "JSON parsing failed", "raw_response": json_response, "json_error": str(e)}
+    except Exception as e:
+        raise_fixture_miss(e)
+        return {"error": "Requirement extraction failed", "error_type": type(e).__name__, "error_message": str(e)}
+
+async def arequest_requirements(job_description: str) -> dict:
+    json_response = ""
+    try:
+        response = await async_client.chat.completions.create(**requirements_request(job_description))
+        json_response = response.choices[0].message.content.strip()
+        return parse_requirements_response(json_response)
+    except json.JSONDecodeError as e:
+        return {"error": "JSON parsing failed", "raw_response": json_response, "json_error": str(e)}
+    except Exception as e:
+        raise_fixture_miss(e)
+        return {"error": "Requirement extraction failed", "error_type": type(e).__name__, "error_message": str(e)}
+
+def importance_rank(item: dict) -> int:
+    importance = item.get("importance", "important")
+    return IMPORTANCE_LEVELS.index(importance) if importance in IMPORTANCE_LEVELS else 1
+
+def merge_requirements(results: List[dict]) -> dict:
+    """Combines per-chunk extractions, keeping the highest importance for repeated requirements"""
+    merged = {}
+    for result in results:
+        for item in result.get("requirements", []):
+            key = item.get("requirement", "").strip().lower()
+            if not key:
+                continue
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(item, aliases=list(item.get("aliases", [])))
+                continue
+            if importance_rank(item) < importance_rank(existing):
+                existing["importance"] = item["importance"]
+            existing["aliases"] = list(dict.fromkeys(existing["aliases"] + item.get("aliases", [])))
+
+    role = next((r["role"] for r in results if r.get("role")), {"title": "", "domain": "", "seniority": "unknown"})
+    return {"role": role, "requirements": list(merged.values())}
+
+def merge_chunk_results(results: List[dict]) -> dict:
+    succeeded = [result for result in results if "error" not in result]
+    if not succeeded:
+        return results[0]
+    return merge_requirements(succeeded)
+
+def requirement_chunks(job_description: str) -> List[str]:
+    """The boilerplate-free JD, split into extraction calls when it is very long"""
+    jd_text = strip_boilerplate(job_description) or job_description
+    if estimate_tokens(jd_text) <= REQUIREMENTS_CHUNK_TOKENS:
+        return [jd_text]
+    return split_jd_chunks(jd_text, REQUIREMENTS_CHUNK_TOKENS)
+
+def extract_jd_requirements(job_description: str) -> dict:
+    """Extracts the requirement list from a JD, splitting very long postings into parallel calls"""
+    chunks = requirement_chunks(job_description)
+    if len(chunks) == 1:
+        return request_requirements(chunks[0])
+
+    with ThreadPoolExecutor(max_workers=min(MAX_EXTRACTION_WORKERS, len(chunks))) as executor:
+        results = list(executor.map(request_requirements, chunks))
+    return merge_chunk_results(results)
+
+async def aextract_jd_requirements(job_description: str) -> dict:
+    """Async extract_jd_requirements; chunks of long postings are requested concurrently"""
+    chunks = requirement_chunks(job_description)
+    if len(chunks) == 1:
+        return await arequest_requirements(chunks[0])
+
+    return merge_chunk_results(await asyncio.gather(*(arequest_requirements(chunk) for chunk in chunks)))
+
+def get_jd_requirements(job_description: str) -> dict:
+    """Requirement list for a JD, computed once per normalized JD and shared across users"""
+    jd_hash = jd_requirements_hash(job_description)
+    with _inflight_lock:
+        key_lock = _inflight.setdefault(jd_hash, threading.Lock())
+
+    # Concurrent requests for the same popular posting wait for one extraction instead of each paying for it
+    with key_lock:
+        try:
+            return get_or_compute("jd_requirements", lambda: extract_jd_requirements(job_description), "", jd_hash)
+        finally:
+            with _inflight_lock:
+                if _inflight.get(jd_hash) is key_lock:
+                    del _inflight[jd_hash]
+
+async def _aextract_and_store(job_description: str, jd_hash: str) -> dict:
+    try:
+        requirements = await aextract_jd_requirements(job_description)
+        if is_cacheable(requirements):
+            await asyncio.get_running_loop().run_in_executor(None, put_result, "jd_requirements", "", requirements, jd_hash)
+        return requirements
+    finally:
+        _async_inflight.pop(jd_hash, None)
+
+async def aget_jd_requirements(job_description: str) -> dict:
+    """Async get_jd_requirements; concurrent awaits on the same JD share one extraction task.
+
+    Result store reads and writes are SQLite calls, so they run off the event loop.
+    """
+    jd_hash = jd_requirements_hash(job_description)
+    stored = await asyncio.get_running_loop().run_in_executor(None, get_result, "jd_requirements", "", jd_hash)
+    if stored is not None:
+        return stored
+
+    task = _async_inflight.get(jd_hash)
+    if task is None:
+        task = _async_inflight[jd_hash] = asyncio.ensure_future(_aextract_and_store(job_description, jd_hash))
+    # Shielded so one cancelled caller does not abort the extraction other callers are waiting on
+    return await asyncio.shield(task)
+
+def render_requirements(requirements: dict) -> str:
+    """Compact one-line-per-requirement rendering used in comparison prompts"""
+    role = requirements.get("role", {})
+    lines = []
+    if role.get("title") or role.get("domain"):
+        lines.append(f"Role: {role.get('title', '')} ({role.get('domain', '')}, {role.get('seniority', 'unknown')})")
+    for item in requirements.get("requirements", []):
+        aliases = [alias for alias in item.get("aliases", []) if alias]
+        alias_text = f" (also: {', '.join(aliases)})" if aliases else ""
+        lines.append(f"- [{item.get('importance', 'important')}, {item.get('category', 'technical')}] {item.get('requirement', '')}{alias_text}")
+    return "\n".join(lines)
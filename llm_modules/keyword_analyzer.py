@@ -1,11 +1,24 @@
-from llm_modules.jd_comparator import compare_resume_with_jd
-from typing import List
+from llm_modules.jd_comparator import compare_resume_with_jd, acompare_resume_with_jd
+from typing import List, Optional
 import re
 
-def analyze_ats_keywords(parsed_resume: dict, job_description: str) -> dict:
-    """Performs full ATS keyword analysis between resume and job description"""
-    jd_analysis = compare_resume_with_jd(parsed_resume, job_description)
-    
+def analyze_ats_keywords(parsed_resume: dict, job_description: str, jd_analysis: dict = None) -> dict:
+    """Performs full ATS keyword analysis between resume and job description.
+
+    Pass a precomputed jd_analysis (the comparison result) to skip the comparison call.
+    """
+    if jd_analysis is None:
+        jd_analysis = compare_resume_with_jd(parsed_resume, job_description)
+    return build_ats_analysis(jd_analysis)
+
+async def aanalyze_ats_keywords(parsed_resume: dict, job_description: str, jd_analysis: dict = None, timeout: Optional[float] = None) -> dict:
+    """Async analyze_ats_keywords; only the comparison call is awaited"""
+    if jd_analysis is None:
+        jd_analysis = await acompare_resume_with_jd(parsed_resume, job_description, timeout=timeout)
+    return build_ats_analysis(jd_analysis)
+
+def build_ats_analysis(jd_analysis: dict) -> dict:
+    """Derives the ATS report from a comparison result"""
     if "error" in jd_analysis:
         return {"error": jd_analysis["error"]}
 
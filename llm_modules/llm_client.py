@@ -0,0 +1,57 @@
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from dotenv import load_dotenv
+from llm_modules.transport import (
+    RecordReplayTransport, AsyncRecordReplayTransport, MetricsTransport, AsyncMetricsTransport, TRANSPORT_MODES
+)
+import httpx
+import os
+
+load_dotenv()
+
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "live").lower()
+LLM_FIXTURE_DIR = os.getenv("LLM_FIXTURE_DIR", "llm_fixtures")
+LLM_REPLAY_LATENCY_MS = float(os.getenv("LLM_REPLAY_LATENCY_MS", "0"))
+HTTP_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+def check_transport_mode() -> None:
+    if LLM_TRANSPORT not in TRANSPORT_MODES:
+        raise ValueError(f"LLM_TRANSPORT must be one of {', '.join(TRANSPORT_MODES)}, got {LLM_TRANSPORT!r}")
+
+def get_client(module: str = "llm") -> OpenAI:
+    """Builds the OpenAI client for one llm_module, reporting metrics under that name and
+    routed through the record/replay transport when LLM_TRANSPORT asks for it"""
+    check_transport_mode()
+    if LLM_TRANSPORT == "live":
+        transport = MetricsTransport(module, httpx.HTTPTransport(limits=HTTP_LIMITS))
+        return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=DefaultHttpxClient(transport=transport))
+
+    transport = MetricsTransport(module, RecordReplayTransport(LLM_TRANSPORT, LLM_FIXTURE_DIR, LLM_REPLAY_LATENCY_MS))
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY") or "replay-only",
+        http_client=DefaultHttpxClient(transport=transport),
+        max_retries=0 if LLM_TRANSPORT == "strict" else 2
+    )
+
+def get_async_client(module: str = "llm") -> AsyncOpenAI:
+    """Async counterpart of get_client for the a* entry points.
+
+    Requests share one event loop instead of a thread each; every request is bounded
+    by LLM_TIMEOUT_SECONDS and is aborted when the awaiting task is cancelled.
+    """
+    check_transport_mode()
+    if LLM_TRANSPORT == "live":
+        transport = AsyncMetricsTransport(module, httpx.AsyncHTTPTransport(limits=HTTP_LIMITS))
+        return AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=DefaultAsyncHttpxClient(transport=transport),
+            timeout=LLM_TIMEOUT_SECONDS
+        )
+
+    transport = AsyncMetricsTransport(module, AsyncRecordReplayTransport(LLM_TRANSPORT, LLM_FIXTURE_DIR, LLM_REPLAY_LATENCY_MS))
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY") or "replay-only",
+        http_client=DefaultAsyncHttpxClient(transport=transport),
+        timeout=LLM_TIMEOUT_SECONDS,
+        max_retries=0 if LLM_TRANSPORT == "strict" else 2
+    )
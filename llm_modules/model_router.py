@@ -0,0 +1,97 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o"
+FAST_MODEL = os.getenv("FAST_FORMATTER_MODEL", "gpt-4o-mini")
+
+LOCAL_SECTIONS = {"Contact Information", "Contact"}
+LIST_SECTIONS = {"Skills", "Languages", "Interests", "Certifications", "Training", "Activities"}
+COMPLEX_SECTIONS = {"Experience", "Projects", "Summary", "Publications", "Volunteer", "Achievements"}
+
+LOCAL_LIST_MAX_WORDS_PER_ITEM = 5
+FAST_MODEL_MAX_WORDS = 120
+
+_stats_lock = threading.Lock()
+_stats = {
+    "decisions": {"local": 0, "fast": 0, "default": 0},
+    "llm_calls_avoided": 0,
+    "estimated_tokens_saved": 0,
+    "estimated_default_model_tokens_moved": 0,
+    "seconds": {"local": 0.0, "fast": 0.0, "default": 0.0},
+    "by_section": {},
+}
+
+def split_list_items(content: str) -> list:
+    """Splits list-like section content on commas, semicolons, pipes and bullet markers"""
+    parts = re.split(r'[,;|\n•▪●‣➤]|\s-\s|^\s*-\s', content)
+    return [part.strip(" .-*\t") for part in parts if part.strip(" .-*\t")]
+
+def is_simple_list(content: str) -> bool:
+    """True when every item in the content is a short phrase, e.g. a plain skills list"""
+    items = split_list_items(content)
+    if len(items) < 2:
+        return False
+    if ":" in content:
+        return False
+    return all(len(item.split()) <= LOCAL_LIST_MAX_WORDS_PER_ITEM for item in items)
+
+def route_section(section: str, content: str, local_only: bool = False) -> Dict[str, str]:
+    """Picks local formatting, the fast model or the default model for one section"""
+    words = len(content.split())
+
+    if local_only:
+        return {"route": "local", "model": None, "reason": "LLM capacity saturated, degraded to local formatting"}
+    if section in LOCAL_SECTIONS:
+        return {"route": "local", "model": None, "reason": "contact details are formatted deterministically"}
+    if section in LIST_SECTIONS and is_simple_list(content):
+        return {"route": "local", "model": None, "reason": "plain list of short items"}
+    if section in COMPLEX_SECTIONS:
+        return {"route": "default", "model": DEFAULT_MODEL, "reason": "complex section keeps the strongest model"}
+    if words <= FAST_MODEL_MAX_WORDS:
+        return {"route": "fast", "model": FAST_MODEL, "reason": f"short section ({words} words)"}
+    return {"route": "default", "model": DEFAULT_MODEL, "reason": f"long section ({words} words)"}
+
+def format_section_locally(section: str, content: str) -> str:
+    """Deterministic markdown formatting for contact details and simple lists"""
+    if section in LOCAL_SECTIONS:
+        lines = [line.strip() for line in content.split("\n") if line.strip()]
+        return f"### {section}\n\n" + "  \n".join(lines)
+
+    if section in LIST_SECTIONS or is_simple_list(content):
+        items = split_list_items(content)
+        return f"### {section}\n\n" + "\n".join(f"- {item}" for item in items)
+
+    sentences = [part.strip() for part in re.split(r'(?<=[.!?])\s+', content) if part.strip()]
+    return f"### {section}\n\n" + "\n".join(f"- {sentence}" for sentence in sentences)
+
+def record_routing_decision(section: str, decision: Dict[str, str], seconds: float, prompt_tokens: int) -> None:
+    """Accumulates routing decisions, latency and estimated savings"""
+    route = decision["route"]
+    with _stats_lock:
+        _stats["decisions"][route] += 1
+        _stats["seconds"][route] += seconds
+        _stats["by_section"].setdefault(section, {"local": 0, "fast": 0, "default": 0})[route] += 1
+        if route == "local":
+            _stats["llm_calls_avoided"] += 1
+            _stats["estimated_tokens_saved"] += prompt_tokens
+        elif route == "fast":
+            _stats["estimated_default_model_tokens_moved"] += prompt_tokens
+
+    logger.info(f"Formatter routed '{section}' to {route} ({decision['reason']}) in {seconds:.3f}s")
+
+def get_routing_stats() -> dict:
+    """Returns a snapshot of routing decisions and estimated savings"""
+    with _stats_lock:
+        return {
+            "decisions": dict(_stats["decisions"]),
+            "llm_calls_avoided": _stats["llm_calls_avoided"],
+            "estimated_tokens_saved": _stats["estimated_tokens_saved"],
+            "estimated_default_model_tokens_moved": _stats["estimated_default_model_tokens_moved"],
+            "seconds": dict(_stats["seconds"]),
+            "by_section": {section: dict(counts) for section, counts in _stats["by_section"].items()},
+        }
@@ -0,0 +1,194 @@
+from llm_modules.llm_client import get_client, get_async_client
+from llm_modules.transport import raise_fixture_miss
+from resume_parser.parsed_resume import render_resume_text
+from utils.result_store import get_or_compute, get_result, put_result, is_cacheable, hash_text
+from utils.token_estimator import estimate_tokens
+from typing import Dict, Optional
+import asyncio
+import json
+import os
+import threading
+
+client = get_client("resume_digest")
+async_client = get_async_client("resume_digest")
+
+DIGEST_MODEL = os.getenv("RESUME_DIGEST_MODEL", "gpt-4o-mini")
+USE_RESUME_DIGEST = os.getenv("USE_RESUME_DIGEST", "1") == "1"
+# Shorter resumes are sent as they are: their digest would not be much smaller
+DIGEST_MIN_TOKENS = int(os.getenv("RESUME_DIGEST_MIN_TOKENS", "600"))
+
+DIGEST_HEADER = "RESUME DIGEST (structured summary of the full resume; terms are quoted as the resume writes them)"
+
+_inflight_lock = threading.Lock()
+_inflight: Dict[str, threading.Lock] = {}
+_async_inflight: Dict[str, "asyncio.Task"] = {}
+
+def resume_digest_hash(resume: dict) -> str:
+    """Store key of a parsed resume's digest: the hash of the prompt text the digest is made from"""
+    return hash_text(render_resume_text(resume))
+
+def needs_digest(resume: dict) -> bool:
+    return estimate_tokens(render_resume_text(resume)) > DIGEST_MIN_TOKENS
+
+def build_digest_messages(resume_text: str) -> list:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a resume analyst. You condense a resume into a compact structured digest that "
+                "other assistants use instead of the full text to compare the candidate with job descriptions "
+                "and to write cover letters. Keep every fact that matters for that: roles, employers, dates, "
+                "skills, tools, certifications, education, projects and every number or measurable result. "
+                "Drop filler words, repeated statements and formatting. Never add, infer or embellish anything "
+                "the resume does not say, and quote skill and tool names exactly as the resume writes them."
+            )
+        },
+        {
+            "role": "user",
+            "content": (
+                f"RESUME:\n{resume_text}\n\n"
+                "Return JSON with these exact keys:\n"
+                "{\n"
+                "  \"headline\": {\"title\": \"current or target title\", \"seniority\": \"junior|mid|senior|lead|unknown\", \"years_experience\": \"as stated or derivable from dates, else unknown\", \"domain\": \"industry or function\"},\n"
+                "  \"roles\": [\n"
+                "    {\"title\": \"role\", \"organization\": \"employer\", \"period\": \"dates\", \"highlights\": [\"short achievement keeping its numbers\"]}\n"
+                "  ],\n"
+                "  \"skills\": [\"skill or tool as written\"],\n"
+                "  \"metrics\": [\"quantified result as written, e.g. 'reduced latency 30%'\"],\n"
+                "  \"projects\": [\n"
+                "    {\"name\": \"project\", \"summary\": \"one line\", \"technologies\": [\"tool\"]}\n"
+                "  ],\n"
+                "  \"education\": [\"degree, institution, year\"],\n"
+                "  \"certifications\": [\"certification\"]\n"
+                "}\n\n"
+                "Keep highlights under 20 words each and use empty lists for anything the resume does not have. "
+                "Return only the JSON."
+            )
+        }
+    ]
+
+def digest_request(resume_text: str) -> dict:
+    """Chat completion arguments for one digest, shared by the sync and async clients"""
+    return {
+        "model": DIGEST_MODEL,
+        "messages": build_digest_messages(resume_text),
+        "temperature": 0.0,
+        "max_tokens": 1500,
+        "response_format": {"type": "json_object"}
+    }
+
+def parse_digest_response(json_response: str) -> dict:
+    result = json.loads(json_response)
+    if not isinstance(result.get("roles"), list) or not isinstance(result.get("skills"), list):
+        return {"error": "Resume digest returned no roles or skills", "raw_response": json_response}
+    return result
+
+def extract_resume_digest(resume: dict) -> Optional[dict]:
+    """Digest of a resume, or None when the resume is short enough to send in full"""
+    if not needs_digest(resume):
+        return None
+    json_response = ""
+    try:
+        response = client.chat.completions.create(**digest_request(render_resume_text(resume)))
+        json_response = response.choices[0].message.content.strip()
+        return parse_digest_response(json_response)
+    except json.JSONDecodeError as e:
+        return {"error": "JSON parsing failed", "raw_response": json_response, "json_error": str(e)}
+    except Exception as e:
+        raise_fixture_miss(e)
+        return {"error": "Resume digest failed", "error_type": type(e).__name__, "error_message": str(e)}
+
+async def aextract_resume_digest(resume: dict) -> Optional[dict]:
+    if not needs_digest(resume):
+        return None
+    json_response = ""
+    try:
+        response = await async_client.chat.completions.create(**digest_request(render_resume_text(resume)))
+        json_response = response.choices[0].message.content.strip()
+        return parse_digest_response(json_response)
+    except json.JSONDecodeError as e:
+        return {"error": "JSON parsing failed", "raw_response": json_response, "json_error": str(e)}
+    except Exception as e:
+        raise_fixture_miss(e)
+        return {"error": "Resume digest failed", "error_type": type(e).__name__, "error_message": str(e)}
+
+def get_resume_digest(resume: dict) -> Optional[dict]:
+    """Digest of a parsed resume, computed once per resume content and shared.
+
+    Always pass the parsed resume: digesting the formatted sections would key a second
+    digest for the same resume.
+    """
+    if not needs_digest(resume):
+        return None
+    digest_key = resume_digest_hash(resume)
+    with _inflight_lock:
+        key_lock = _inflight.setdefault(digest_key, threading.Lock())
+
+    # Stages that start together (comparison, cover letters) wait for one digest instead of each paying for it
+    with key_lock:
+        try:
+            return get_or_compute("resume_digest", lambda: extract_resume_digest(resume), digest_key)
+        finally:
+            with _inflight_lock:
+                if _inflight.get(digest_key) is key_lock:
+                    del _inflight[digest_key]
+
+async def _aextract_and_store(resume: dict, digest_key: str) -> Optional[dict]:
+    try:
+        digest = await aextract_resume_digest(resume)
+        if is_cacheable(digest):
+            await asyncio.get_running_loop().run_in_executor(None, put_result, "resume_digest", digest_key, digest)
+        return digest
+    finally:
+        _async_inflight.pop(digest_key, None)
+
+async def aget_resume_digest(resume: dict) -> Optional[dict]:
+    """Async get_resume_digest; concurrent awaits on the same resume share one digest task.
+
+    Result store reads and writes are SQLite calls, so they run off the event loop.
+    """
+    if not needs_digest(resume):
+        return None
+    digest_key = resume_digest_hash(resume)
+    stored = await asyncio.get_running_loop().run_in_executor(None, get_result, "resume_digest", digest_key)
+    if stored is not None:
+        return stored
+
+    task = _async_inflight.get(digest_key)
+    if task is None:
+        task = _async_inflight[digest_key] = asyncio.ensure_future(_aextract_and_store(resume, digest_key))
+    return await asyncio.shield(task)
+
+def render_digest(digest: dict) -> str:
+    """Compact line-per-fact rendering used in place of the resume text in prompts"""
+    lines = [DIGEST_HEADER]
+    headline = digest.get("headline") or {}
+    if any(headline.values()):
+        lines.append(
+            f"Profile: {headline.get('title', '')} ({headline.get('seniority', 'unknown')}, "
+            f"{headline.get('years_experience', 'unknown')} years, {headline.get('domain', '')})"
+        )
+    for role in digest.get("roles", []):
+        lines.append(f"Role: {role.get('title', '')} at {role.get('organization', '')} ({role.get('period', '')})")
+        lines.extend(f"  - {highlight}" for highlight in role.get("highlights", []))
+    if digest.get("skills"):
+        lines.append(f"Skills: {', '.join(digest['skills'])}")
+    if digest.get("metrics"):
+        lines.append("Results: " + "; ".join(digest["metrics"]))
+    for project in digest.get("projects", []):
+        technologies = f" [{', '.join(project['technologies'])}]" if project.get("technologies") else ""
+        lines.append(f"Project: {project.get('name', '')} - {project.get('summary', '')}{technologies}")
+    if digest.get("education"):
+        lines.append("Education: " + "; ".join(digest["education"]))
+    if digest.get("certifications"):
+        lines.append("Certifications: " + "; ".join(digest["certifications"]))
+    return "\n".join(lines)
+
+def resume_prompt_text(resume: dict, digest: Optional[dict]) -> tuple:
+    """(text, source) for a prompt - the rendered digest when it exists and is smaller, else the resume"""
+    resume_text = render_resume_text(resume)
+    if is_cacheable(digest):
+        digest_text = render_digest(digest)
+        if estimate_tokens(digest_text) < estimate_tokens(resume_text):
+            return digest_text, "digest"
+    return resume_text, "full_text"
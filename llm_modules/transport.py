@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+import httpx
+from utils.metrics import record_llm_request
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_MODES = ("live", "record", "replay", "strict")
+
+class FixtureMissError(RuntimeError):
+    """Raised in strict replay mode when a request has no recorded fixture"""
+
+def raise_fixture_miss(error: BaseException) -> None:
+    """Re-raises a FixtureMissError behind error, if there is one.
+
+    The openai client wraps transport errors in APIConnectionError and the llm_modules turn
+    failures into error results; callers run this first so a strict miss fails the run.
+    """
+    while error is not None:
+        if isinstance(error, FixtureMissError):
+            raise error
+        error = error.__cause__ or error.__context__
+
+def fixture_key(request: httpx.Request) -> str:
+    """Hashes the method, path and canonical JSON body of a request"""
+    body = request.content or b""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+    except ValueError:
+        pass
+    digest = hashlib.sha256()
+    digest.update(request.method.encode("utf-8"))
+    digest.update(request.url.path.encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+class RecordReplayTransport(httpx.BaseTransport):
+    """httpx transport that records OpenAI responses to fixture files and replays them.
+
+    Modes:
+        record  - always call the network and write each response to a fixture
+        replay  - serve fixtures, calling the network (and recording) only on a miss
+        strict  - serve fixtures and raise FixtureMissError on a miss
+
+    Only successful (2xx) responses are recorded, so an auth or rate-limit error is never replayed.
+    """
+
+    def __init__(self, mode: str, fixture_dir: str, latency_ms: float = 0.0, inner: Optional[httpx.BaseTransport] = None):
+        if mode not in ("record", "replay", "strict"):
+            raise ValueError(f"Unsupported transport mode: {mode}")
+        self.mode = mode
+        self.fixture_dir = fixture_dir
+        self.latency_ms = latency_ms
+        self.inner = inner or httpx.HTTPTransport()
+        self._lock = threading.Lock()
+
+    def _fixture_path(self, key: str) -> str:
+        return os.path.join(self.fixture_dir, f"{key}.json")
+
+    def _load(self, key: str) -> Optional[dict]:
+        path = self._fixture_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, key: str, request: httpx.Request, response: httpx.Response, body: bytes) -> None:
+        try:
+            request_body = json.loads(request.content or b"{}")
+        except ValueError:
+            request_body = None
+        fixture = {
+            "request": {"method": request.method, "path": request.url.path, "body": request_body},
+            "status_code": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": body.decode("utf-8"),
+        }
+        with self._lock:
+            os.makedirs(self.fixture_dir, exist_ok=True)
+            tmp_path = self._fixture_path(key) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(fixture, f, indent=2)
+            os.replace(tmp_path, self._fixture_path(key))
+
+    def _replay(self, fixture: dict, request: httpx.Request) -> httpx.Response:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._fixture_response(fixture, request)
+
+    def _fixture_response(self, fixture: dict, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            status_code=fixture["status_code"],
+            headers={"content-type": fixture["content_type"]},
+            content=fixture["body"].encode("utf-8"),
+            request=request,
+        )
+
+    def _recorded_response(self, key: str, request: httpx.Request, response: httpx.Response, body: bytes) -> httpx.Response:
+        if 200 <= response.status_code < 300:
+            self._save(key, request, response, body)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers={"content-type": response.headers.get("content-type", "application/json")},
+            content=body,
+            request=request,
+        )
+
+    def _record(self, key: str, request: httpx.Request) -> httpx.Response:
+        response = self.inner.handle_request(request)
+        body = response.read()
+        response.close()
+        return self._recorded_response(key, request, response, body)
+
+    def _lookup(self, request: httpx.Request) -> tuple:
+        """(key, fixture) for a request; fixture is None when the network must be called"""
+        key = fixture_key(request)
+        if self.mode == "record":
+            return key, None
+        fixture = self._load(key)
+        if fixture is None:
+            if self.mode == "strict":
+                message = f"No recorded fixture {key} for {request.method} {request.url.path} in {self.fixture_dir}"
+                logger.error(message)
+                raise FixtureMissError(message)
+            logger.info(f"Fixture miss {key}, recording live response")
+        return key, fixture
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        key, fixture = self._lookup(request)
+        if fixture is not None:
+            return self._replay(fixture, request)
+        return self._record(key, request)
+
+    def close(self) -> None:
+        self.inner.close()
+
+class AsyncRecordReplayTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of RecordReplayTransport sharing the same fixture files"""
+
+    def __init__(self, mode: str, fixture_dir: str, latency_ms: float = 0.0, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.fixtures = RecordReplayTransport(mode, fixture_dir, latency_ms, inner=httpx.HTTPTransport())
+        self.latency_ms = latency_ms
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Fixture files are read and written on the default executor, off the event loop"""
+        await request.aread()
+        loop = asyncio.get_running_loop()
+        key, fixture = await loop.run_in_executor(None, self.fixtures._lookup, request)
+        if fixture is not None:
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            return self.fixtures._fixture_response(fixture, request)
+
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        return await loop.run_in_executor(None, self.fixtures._recorded_response, key, request, response, body)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+def request_model(request: httpx.Request) -> str:
+    try:
+        return json.loads(request.content or b"{}").get("model", "unknown")
+    except ValueError:
+        return "unknown"
+
+def is_retry(request: httpx.Request) -> bool:
+    return request.headers.get("x-stainless-retry-count", "0") not in ("", "0")
+
+def response_usage(response: httpx.Response) -> Optional[dict]:
+    """Token usage of a read JSON response, None otherwise"""
+    if response.status_code != 200 or "json" not in response.headers.get("content-type", ""):
+        return None
+    try:
+        return json.loads(response.content).get("usage")
+    except ValueError:
+        return None
+
+class MetricsTransport(httpx.BaseTransport):
+    """Wraps another transport and reports latency, tokens, errors and retries per llm_module"""
+
+    def __init__(self, module: str, inner: httpx.BaseTransport):
+        self.module = module
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        model, retry = request_model(request), is_retry(request)
+
+        start = time.perf_counter()
+        try:
+            response = self.inner.handle_request(request)
+        except Exception as e:
+            record_llm_request(self.module, model, time.perf_counter() - start, None, retry=retry, reason=type(e).__name__)
+            raise
+
+        if response.status_code == 200 and "json" in response.headers.get("content-type", ""):
+            response.read()
+        record_llm_request(self.module, model, time.perf_counter() - start, response.status_code, response_usage(response), retry)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+class AsyncMetricsTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of MetricsTransport; cancelled requests are reported as errors"""
+
+    def __init__(self, module: str, inner: httpx.AsyncBaseTransport):
+        self.module = module
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        model, retry = request_model(request), is_retry(request)
+
+        start = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except (Exception, asyncio.CancelledError) as e:
+            record_llm_request(self.module, model, time.perf_counter() - start, None, retry=retry, reason=type(e).__name__)
+            raise
+
+        if response.status_code == 200 and "json" in response.headers.get("content-type", ""):
+            await response.aread()
+        record_llm_request(self.module, model, time.perf_counter() - start, response.status_code, response_usage(response), retry)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
@@ -0,0 +1,135 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.field_extractor import extract_fields_from_resume
+
+SECTION_SEPARATOR = "\n\n"
+
+class ParsedResume(Mapping):
+    """Parsed resume held as one text buffer with (start, end) spans per section and per line.
+
+    Behaves like the read-only Dict[str, str] the parser used to return, so existing
+    callers keep working, while contact fields and the prompt rendering are computed once.
+    """
+
+    __slots__ = ("text", "contact", "pages", "_sections", "_lines", "_prompt_text")
+
+    def __init__(self, text: str, sections: Dict[str, Tuple[int, int]], lines: Dict[str, List[Tuple[int, int]]], contact: Optional[dict] = None, pages: int = 0):
+        self.text = text
+        self.pages = pages
+        self._sections = sections
+        self._lines = lines
+        self.contact = contact if contact is not None else extract_fields_from_resume(self.raw_text())
+        self._prompt_text = None
+
+    @classmethod
+    def from_lines(cls, section_lines: Dict[str, List[str]], contact: Optional[dict] = None, joiners: Optional[Dict[str, str]] = None, pages: int = 0) -> "ParsedResume":
+        """Builds the buffer from per-section lines; lines are joined with a space unless joiners says otherwise"""
+        joiners = joiners or {}
+        parts = []
+        sections = {}
+        lines = {}
+        offset = 0
+        for section, section_content in section_lines.items():
+            if not section_content:
+                continue
+            if parts:
+                parts.append(SECTION_SEPARATOR)
+                offset += len(SECTION_SEPARATOR)
+            joiner = joiners.get(section, " ")
+            start = offset
+            spans = []
+            for index, line in enumerate(section_content):
+                if index:
+                    parts.append(joiner)
+                    offset += len(joiner)
+                parts.append(line)
+                spans.append((offset, offset + len(line)))
+                offset += len(line)
+            sections[section] = (start, offset)
+            lines[section] = spans
+        return cls("".join(parts), sections, lines, contact, pages)
+
+    @classmethod
+    def from_sections(cls, sections: Dict[str, str], contact: Optional[dict] = None, pages: int = 0) -> "ParsedResume":
+        """Wraps a plain section dict, treating newlines inside a section as line breaks"""
+        return cls.from_lines(
+            {section: content.split("\n") for section, content in sections.items() if content},
+            contact,
+            joiners={section: "\n" for section in sections},
+            pages=pages,
+        )
+
+    @classmethod
+    def from_payload(cls, payload: Optional[dict]) -> "ParsedResume":
+        """Restores a stored payload with its line spans.
+
+        Payloads from older stores only hold joined section strings (or are a plain section
+        dict); those are split on newlines, which loses lines joined with spaces.
+        """
+        if not payload:
+            return cls.from_lines({})
+        if isinstance(payload.get("lines"), dict):
+            return cls.from_lines(payload["lines"], payload.get("contact"), payload.get("joiners"), payload.get("pages", 0))
+        if "sections" in payload and isinstance(payload["sections"], dict):
+            return cls.from_sections(payload["sections"], payload.get("contact"), payload.get("pages", 0))
+        return cls.from_sections(payload)
+
+    def __getitem__(self, section: str) -> str:
+        start, end = self._sections[section]
+        return self.text[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sections)
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def __repr__(self) -> str:
+        return f"ParsedResume(sections={list(self._sections)}, chars={len(self.text)})"
+
+    def lines(self, section: str) -> List[str]:
+        """Original extracted lines of one section"""
+        return [self.text[start:end] for start, end in self._lines.get(section, [])]
+
+    def raw_text(self) -> str:
+        """All lines in reading order, one per line"""
+        return "\n".join(
+            self.text[start:end] for spans in self._lines.values() for start, end in spans
+        )
+
+    def prompt_text(self) -> str:
+        """Sections rendered as 'Section:\\ncontent' blocks for LLM prompts, built once"""
+        if self._prompt_text is None:
+            self._prompt_text = render_resume_text(self.items())
+        return self._prompt_text
+
+    def joiner(self, section: str) -> str:
+        """Text between consecutive lines of a section"""
+        spans = self._lines.get(section, [])
+        if len(spans) < 2:
+            return " "
+        return self.text[spans[0][1]:spans[1][0]]
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self.items())
+
+    def to_payload(self) -> dict:
+        """JSON-serializable form for the result store and worker pipes; empty when nothing was parsed.
+
+        Holds each section's lines and joiner so from_payload rebuilds the same spans.
+        """
+        if not self._sections:
+            return {}
+        return {
+            "lines": {section: self.lines(section) for section in self._sections},
+            "joiners": {section: self.joiner(section) for section in self._sections},
+            "contact": self.contact,
+            "pages": self.pages,
+        }
+
+def render_resume_text(sections) -> str:
+    """Renders resume sections into the 'Section:\\ncontent' prompt layout shared by the llm_modules"""
+    if isinstance(sections, ParsedResume):
+        return sections.prompt_text()
+    items = sections.items() if isinstance(sections, Mapping) else sections
+    return SECTION_SEPARATOR.join(f"{section}:\n{content}" for section, content in items)
@@ -2,12 +2,29 @@ import pdfplumber
 from collections import defaultdict
 import re
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 import os
+import tempfile
+import time
 from utils.field_extractor import extract_fields_from_resume
+from resume_parser.parsed_resume import ParsedResume
+from utils.metrics import record_parse
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ParseError(Exception):
+    """A resume could not be parsed; the message is safe to show to the user"""
+
+    def __init__(self, message: str, reason: str = "invalid"):
+        super().__init__(message)
+        self.reason = reason
+
+    def __reduce__(self):
+        return (type(self), (str(self), self.reason))
+
+class ParseLimitError(ParseError):
+    """A resume exceeded a parse limit; reason is size, pages, timeout or memory"""
+
 def initialize_analyzer():
     """Checks and loads the PDF parser"""
     try:
@@ -195,17 +212,21 @@ def get_section_summary(sections: Dict[str, str]) -> Dict[str, int]:
         summary[section] = word_count
     return summary
 
-def parse_resume_sections(pdf_path: str, analyzer) -> Dict[str, str]:
-    """Parses a resume PDF into structured sections"""
+def parse_resume_sections(pdf_path: str, analyzer, max_pages: Optional[int] = None) -> ParsedResume:
+    """Parses a resume PDF into structured sections, refusing PDFs longer than max_pages"""
     if not os.path.exists(pdf_path):
         logger.error(f"PDF file not found: {pdf_path}")
-        return {}
+        return ParsedResume.from_lines({})
 
+    start = time.perf_counter()
     sections = defaultdict(list)
     current_section = "Header"
 
     with pdfplumber.open(pdf_path) as pdf:
-        logger.info(f"Processing {len(pdf.pages)} pages")
+        page_count = len(pdf.pages)
+        if max_pages is not None and page_count > max_pages:
+            raise ParseLimitError(f"The resume has {page_count} pages; at most {max_pages} are supported.", "pages")
+        logger.info(f"Processing {page_count} pages")
 
         all_lines = []
         for page_num, page in enumerate(pdf.pages, 1):
@@ -257,12 +278,10 @@ def parse_resume_sections(pdf_path: str, analyzer) -> Dict[str, str]:
 
             sections[current_section].append(cleaned_line)
 
-    result_sections = {}
+    section_lines = {}
     for section, lines in sections.items():
-        if lines:
-            content = ' '.join(lines)
-            if len(content.strip()) > 5:
-                result_sections[section] = content.strip()
+        if lines and len(' '.join(lines).strip()) > 5:
+            section_lines[section] = lines
 
     full_text = '\n'.join(all_lines)
     contact_info = extract_fields_from_resume(full_text)
@@ -283,15 +302,25 @@ def parse_resume_sections(pdf_path: str, analyzer) -> Dict[str, str]:
         if full_link not in header_info:
             header_info.append(f"Link: {full_link}")
 
-    if "Header" in result_sections and header_info:
-        combined_header = result_sections["Header"] + "\n" + '\n'.join(header_info)
-        result_sections["Contact Information"] = combined_header
-        del result_sections["Header"]
+    header_lines = section_lines.pop("Header", None)
+    if header_lines and header_info:
+        section_lines["Contact Information"] = [' '.join(header_lines)] + header_info
     elif header_info:
-        result_sections["Contact Information"] = '\n'.join(header_info)
-    elif "Header" in result_sections:
-        result_sections["Contact Information"] = result_sections["Header"]
-        del result_sections["Header"]
-
-    logger.info(f"Successfully parsed {len(result_sections)} sections")
-    return result_sections
\ No newline at end of file
+        section_lines["Contact Information"] = header_info
+    elif header_lines:
+        section_lines["Contact Information"] = [' '.join(header_lines)]
+
+    parsed = ParsedResume.from_lines(section_lines, contact_info, joiners={"Contact Information": "\n"}, pages=page_count)
+    record_parse(time.perf_counter() - start, page_count)
+    logger.info(f"Successfully parsed {len(parsed)} sections")
+    return parsed
+
+def parse_resume_bytes(resume_bytes: bytes, max_pages: Optional[int] = None) -> ParsedResume:
+    """Writes uploaded PDF bytes to a temp file, parses it and removes the file"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(resume_bytes)
+        resume_path = tmp_file.name
+    try:
+        return parse_resume_sections(resume_path, initialize_analyzer(), max_pages)
+    finally:
+        os.remove(resume_path)
@@ -0,0 +1,221 @@
+"""Pre-warmed worker processes that parse resume PDFs under hard limits.
+
+pdfplumber runs outside the server process, so a pathological PDF can only take
+down its own worker. Each parse is bounded by PARSE_TIMEOUT_SECONDS of wall-clock
+time, PARSE_MAX_RSS_MB of worker memory and PARSE_MAX_PAGES pages; a worker that
+hits the time or memory limit is killed and replaced. PARSE_WORKERS sizes the pool
+independently of UI and API concurrency, and callers queue for a free worker.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Optional, Tuple
+from resume_parser.parsed_resume import ParsedResume
+from resume_parser.parser import ParseError, ParseLimitError, initialize_analyzer, parse_resume_bytes
+from utils.metrics import record_parse, record_parse_failure, PARSE_WORKER_RESTARTS, PARSE_WORKERS_BUSY
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+PARSE_TIMEOUT_SECONDS = float(os.getenv("PARSE_TIMEOUT_SECONDS", "30"))
+PARSE_MAX_RSS_MB = int(os.getenv("PARSE_MAX_RSS_MB", "512"))
+PARSE_MAX_PAGES = int(os.getenv("PARSE_MAX_PAGES", "10"))
+PARSE_MAX_BYTES = int(os.getenv("PARSE_MAX_BYTES", str(10 * 1024 * 1024)))
+PARSE_MAX_TASKS_PER_WORKER = int(os.getenv("PARSE_MAX_TASKS_PER_WORKER", "200"))
+PARSE_QUEUE_TIMEOUT = float(os.getenv("PARSE_QUEUE_TIMEOUT", "60"))
+PARSE_WARMUP_TIMEOUT = float(os.getenv("PARSE_WARMUP_TIMEOUT", "60"))
+
+MEMORY_CHECK_INTERVAL = 0.05
+# Reasons after which a worker is killed instead of reused
+RESTART_REASONS = ("timeout", "memory", "crash")
+
+class ParseBusy(ParseError):
+    """No parse worker became free within PARSE_QUEUE_TIMEOUT"""
+
+def _worker_main(conn, max_pages: int, max_rss_bytes: int) -> None:
+    """Worker loop: receives PDF bytes, replies ("ok", ParsedResume) or ("error", ParseError)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None and max_rss_bytes:
+        # Hard backstop for allocations faster than the parent's RSS checks
+        try:
+            resource.setrlimit(resource.RLIMIT_DATA, (max_rss_bytes, max_rss_bytes))
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not limit parse worker memory: {e}")
+    initialize_analyzer()
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            resume_bytes = conn.recv()
+        except EOFError:
+            return
+        if resume_bytes is None:
+            return
+        try:
+            conn.send(("ok", parse_resume_bytes(resume_bytes, max_pages)))
+        except MemoryError:
+            conn.send(("error", ParseLimitError("The resume needs more memory to parse than is allowed.", "memory")))
+            return
+        except ParseError as e:
+            conn.send(("error", e))
+        except Exception as e:
+            logger.exception("Resume parse failed")
+            conn.send(("error", ParseError(f"The file could not be read as a resume PDF ({type(e).__name__}).")))
+
+def _rss_bytes(pid: int) -> int:
+    """Resident memory of a process, 0 where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+class _Worker:
+    def __init__(self, context, max_pages: int, max_rss_bytes: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, max_pages, max_rss_bytes), name="resume-parse", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.tasks = 0
+
+    def wait_ready(self, timeout: float) -> None:
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise ParseError("The resume parser did not start in time; please try again.", "crash")
+        self.conn.recv()
+        self.ready = True
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+class ParsePool:
+    """Fixed-size pool of parse worker processes with per-parse limits"""
+
+    def __init__(self, workers: int = PARSE_WORKERS, timeout: float = PARSE_TIMEOUT_SECONDS,
+                 max_rss_mb: int = PARSE_MAX_RSS_MB, max_pages: int = PARSE_MAX_PAGES, max_bytes: int = PARSE_MAX_BYTES,
+                 max_tasks_per_worker: int = PARSE_MAX_TASKS_PER_WORKER, queue_timeout: float = PARSE_QUEUE_TIMEOUT):
+        self.context = multiprocessing.get_context("spawn")
+        self.timeout = timeout
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.queue_timeout = queue_timeout
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._closed = False
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self.context, self.max_pages, self.max_rss_bytes)
+
+    def parse(self, resume_bytes: bytes) -> ParsedResume:
+        """Parses a PDF on a free worker; raises ParseError subclasses with user-facing messages"""
+        if len(resume_bytes) > self.max_bytes:
+            record_parse_failure("size")
+            raise ParseLimitError(f"The resume file is larger than {self.max_bytes // (1024 * 1024)} MB.", "size")
+        try:
+            worker = self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            record_parse_failure("busy")
+            raise ParseBusy("All resume parsers are busy; please try again in a moment.", "busy")
+
+        PARSE_WORKERS_BUSY.inc()
+        restart = None
+        try:
+            parsed, seconds = self._run(worker, resume_bytes)
+        except ParseError as e:
+            record_parse_failure(e.reason)
+            if e.reason in RESTART_REASONS:
+                restart = e.reason
+            raise
+        finally:
+            PARSE_WORKERS_BUSY.dec()
+            worker.tasks += 1
+            if restart is None and worker.tasks >= self.max_tasks_per_worker:
+                restart = "recycled"
+            self._release(worker, restart)
+
+        record_parse(seconds, parsed.pages)
+        return parsed
+
+    def _run(self, worker: _Worker, resume_bytes: bytes) -> Tuple[ParsedResume, float]:
+        try:
+            worker.wait_ready(PARSE_WARMUP_TIMEOUT)
+            start = time.perf_counter()
+            deadline = start + self.timeout
+            worker.conn.send(resume_bytes)
+            while not worker.conn.poll(MEMORY_CHECK_INTERVAL):
+                if not worker.process.is_alive():
+                    raise ParseError("The resume parser stopped unexpectedly; please try again.", "crash")
+                if self.max_rss_bytes and _rss_bytes(worker.process.pid) > self.max_rss_bytes:
+                    raise ParseLimitError("The resume needs more memory to parse than is allowed.", "memory")
+                if time.perf_counter() > deadline:
+                    raise ParseLimitError(f"The resume took longer than {self.timeout:g}s to parse.", "timeout")
+            status, value = worker.conn.recv()
+        except (EOFError, OSError):
+            raise ParseError("The resume parser stopped unexpectedly; please try again.", "crash")
+        if status == "error":
+            raise value
+        return value, time.perf_counter() - start
+
+    def _release(self, worker: _Worker, restart: Optional[str]) -> None:
+        if restart is None:
+            self._idle.put(worker)
+            return
+        PARSE_WORKER_RESTARTS.inc(reason=restart)
+        if restart == "recycled":
+            worker.stop()
+        else:
+            logger.warning(f"Killing parse worker {worker.process.pid} ({restart})")
+            worker.kill()
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
+_pool: Optional[ParsePool] = None
+_pool_lock = threading.Lock()
+
+def parse_pool() -> ParsePool:
+    """The process-wide pool, started (and warmed) on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool()
+            atexit.register(_pool.close)
+        return _pool
+
+def parse_resume(resume_bytes: bytes) -> ParsedResume:
+    return parse_pool().parse(resume_bytes)
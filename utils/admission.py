@@ -0,0 +1,200 @@
+"""Admission control for expensive LLM stages.
+
+Every stage run belongs to an owner `(user_id, session_id)`. A run is admitted only
+while the global, per-user and per-session concurrency limits and the per-minute
+rate limits all allow it. Waiting runs are queued per user and admitted round-robin
+across users, so one user hammering a button cannot starve everyone else.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", os.getenv("JOB_WORKERS", "4")))
+ADMISSION_USER_MAX_ACTIVE = int(os.getenv("ADMISSION_USER_MAX_ACTIVE", "2"))
+ADMISSION_SESSION_MAX_ACTIVE = int(os.getenv("ADMISSION_SESSION_MAX_ACTIVE", "1"))
+ADMISSION_USER_PER_MINUTE = int(os.getenv("ADMISSION_USER_PER_MINUTE", "8"))
+ADMISSION_SESSION_PER_MINUTE = int(os.getenv("ADMISSION_SESSION_PER_MINUTE", "4"))
+ADMISSION_SESSION_MAX_QUEUED = int(os.getenv("ADMISSION_SESSION_MAX_QUEUED", "3"))
+ADMISSION_SATURATION_QUEUE = int(os.getenv("ADMISSION_SATURATION_QUEUE", "20"))
+
+RATE_WINDOW = 60.0
+
+Owner = Tuple[str, str]
+
+class AdmissionRejected(RuntimeError):
+    """Raised when an owner already has the maximum number of runs waiting"""
+
+class AdmissionController:
+    """Fair, limit-aware gate in front of the background job workers"""
+
+    def __init__(self, max_active: int = ADMISSION_MAX_ACTIVE, user_max_active: int = ADMISSION_USER_MAX_ACTIVE,
+                 session_max_active: int = ADMISSION_SESSION_MAX_ACTIVE, user_per_minute: int = ADMISSION_USER_PER_MINUTE,
+                 session_per_minute: int = ADMISSION_SESSION_PER_MINUTE, session_max_queued: int = ADMISSION_SESSION_MAX_QUEUED,
+                 saturation_queue: int = ADMISSION_SATURATION_QUEUE):
+        self.max_active = max_active
+        self.user_max_active = user_max_active
+        self.session_max_active = session_max_active
+        self.user_per_minute = user_per_minute
+        self.session_per_minute = session_per_minute
+        self.session_max_queued = session_max_queued
+        self.saturation_queue = saturation_queue
+
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[str, Deque[dict]]" = OrderedDict()
+        self._tickets: Dict[str, dict] = {}
+        self._active: Dict[str, dict] = {}
+        self._starts: Dict[str, Deque[float]] = {}
+        self._pump_thread: Optional[threading.Thread] = None
+
+    def enqueue(self, ticket_id: str, owner: Owner, dispatch: Callable[[], None]) -> None:
+        """Queues a run; dispatch() is called once it is admitted"""
+        user, session = owner
+        with self._cond:
+            queued = sum(1 for t in self._tickets.values() if t["session"] == session)
+            if queued >= self.session_max_queued:
+                raise AdmissionRejected(
+                    f"You already have {queued} analyses waiting; wait for one to finish before starting another"
+                )
+            ticket = {"id": ticket_id, "user": user, "session": session, "dispatch": dispatch, "queued_at": time.time()}
+            self._tickets[ticket_id] = ticket
+            self._queues.setdefault(user, deque()).append(ticket)
+            self._ensure_pump()
+            self._cond.notify_all()
+
+    def release(self, ticket_id: str) -> None:
+        """Frees the slot of a finished run"""
+        with self._cond:
+            if self._active.pop(ticket_id, None) is not None:
+                self._cond.notify_all()
+
+    def cancel(self, ticket_id: str) -> bool:
+        """Drops a run that is still waiting; returns False once it was admitted"""
+        with self._cond:
+            ticket = self._tickets.pop(ticket_id, None)
+            if ticket is None:
+                return False
+            queue = self._queues.get(ticket["user"])
+            if queue is not None:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[ticket["user"]]
+            self._cond.notify_all()
+            return True
+
+    def position(self, ticket_id: str) -> Optional[int]:
+        """1-based place in line under round-robin admission, or None when not waiting"""
+        with self._cond:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is None:
+                return None
+            index = self._queues[ticket["user"]].index(ticket)
+            ahead = index
+            passed_own_user = False
+            for user, queue in self._queues.items():
+                if user == ticket["user"]:
+                    passed_own_user = True
+                    continue
+                ahead += min(len(queue), index if passed_own_user else index + 1)
+            return ahead + 1
+
+    def waiting(self) -> int:
+        with self._cond:
+            return len(self._tickets)
+
+    def active(self) -> int:
+        with self._cond:
+            return len(self._active)
+
+    def saturated(self) -> bool:
+        """True when every slot is busy and the line is long; callers should fall back to cached or local results"""
+        with self._cond:
+            return len(self._active) >= self.max_active and len(self._tickets) >= self.saturation_queue
+
+    def prune_rate_windows(self) -> int:
+        """Forgets rate-limit windows with no recent starts, e.g. of sessions that went idle"""
+        now = time.time()
+        with self._cond:
+            idle = [key for key in list(self._starts) if not self._recent_starts(key, now)]
+            for key in idle:
+                del self._starts[key]
+            return len(idle)
+
+    def _recent_starts(self, key: str, now: float) -> Deque[float]:
+        starts = self._starts.setdefault(key, deque())
+        while starts and now - starts[0] >= RATE_WINDOW:
+            starts.popleft()
+        return starts
+
+    def _blocked_until(self, ticket: dict, now: float) -> Optional[float]:
+        """0 when admissible now, a timestamp when only a rate limit blocks it, None when a concurrency limit does"""
+        user_active = sum(1 for t in self._active.values() if t["user"] == ticket["user"])
+        session_active = sum(1 for t in self._active.values() if t["session"] == ticket["session"])
+        if user_active >= self.user_max_active or session_active >= self.session_max_active:
+            return None
+
+        retry_at = 0.0
+        for key, limit in ((f"user:{ticket['user']}", self.user_per_minute), (f"session:{ticket['session']}", self.session_per_minute)):
+            starts = self._recent_starts(key, now)
+            if len(starts) >= limit:
+                retry_at = max(retry_at, starts[0] + RATE_WINDOW)
+        return retry_at
+
+    def _admit_ready(self) -> Tuple[list, Optional[float]]:
+        """Admits waiting runs round-robin across users; returns them and the next rate-limit wake-up"""
+        admitted = []
+        next_wake = None
+        now = time.time()
+        progress = True
+        while progress and len(self._active) < self.max_active and self._queues:
+            progress = False
+            for user in list(self._queues):
+                if len(self._active) >= self.max_active:
+                    break
+                ticket = self._queues[user][0]
+                blocked = self._blocked_until(ticket, now)
+                if blocked is None:
+                    continue
+                if blocked:
+                    next_wake = blocked if next_wake is None else min(next_wake, blocked)
+                    continue
+
+                self._queues[user].popleft()
+                if self._queues[user]:
+                    self._queues.move_to_end(user)
+                else:
+                    del self._queues[user]
+                del self._tickets[ticket["id"]]
+                self._active[ticket["id"]] = ticket
+                self._recent_starts(f"user:{ticket['user']}", now).append(now)
+                self._recent_starts(f"session:{ticket['session']}", now).append(now)
+                admitted.append(ticket)
+                progress = True
+        return admitted, next_wake
+
+    def _ensure_pump(self) -> None:
+        if self._pump_thread is None or not self._pump_thread.is_alive():
+            self._pump_thread = threading.Thread(target=self._pump, daemon=True, name="admission")
+            self._pump_thread.start()
+
+    def _pump(self) -> None:
+        while True:
+            with self._cond:
+                admitted, next_wake = self._admit_ready()
+                if not admitted:
+                    timeout = max(0.05, next_wake - time.time()) if next_wake else None
+                    self._cond.wait(timeout)
+                    continue
+
+            for ticket in admitted:
+                try:
+                    ticket["dispatch"]()
+                except Exception:
+                    logger.exception(f"Dispatching admitted run {ticket['id']} failed")
+                    self.release(ticket["id"])
+
+controller = AdmissionController()
@@ -0,0 +1,128 @@
+"""Content-addressed local store for large per-session artifacts.
+
+Values are serialized to JSON and written once per content hash under ARTIFACT_DIR,
+so session state only has to hold the hash. A byte-bounded in-process cache keeps
+recently used artifacts decoded; everything else stays on disk until it has gone
+unused for ARTIFACT_TTL seconds.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "artifacts")
+ARTIFACT_CACHE_BYTES = int(os.getenv("ARTIFACT_CACHE_BYTES", str(64 * 1024 * 1024)))
+ARTIFACT_TTL = float(os.getenv("ARTIFACT_TTL", str(7 * 24 * 3600)))
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, Optional[Callable]], Tuple[Any, int]]" = OrderedDict()
+_cache_size = 0
+
+class ArtifactMissing(KeyError):
+    """Raised when a referenced artifact was pruned from disk"""
+
+def _path(ref: str) -> str:
+    return os.path.join(ARTIFACT_DIR, ref[:2], f"{ref}.json.z")
+
+def _touch(path: str) -> None:
+    """Marks an artifact as used so prune_artifacts keeps it"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _cache_put(key: Tuple[str, Optional[Callable]], value: Any, size: int) -> None:
+    global _cache_size
+    if size > ARTIFACT_CACHE_BYTES:
+        return
+    with _cache_lock:
+        previous = _cache.pop(key, None)
+        if previous is not None:
+            _cache_size -= previous[1]
+        _cache[key] = (value, size)
+        _cache_size += size
+        while _cache_size > ARTIFACT_CACHE_BYTES:
+            _, (_, evicted_size) = _cache.popitem(last=False)
+            _cache_size -= evicted_size
+
+def _cache_get(key: Tuple[str, Optional[Callable]]) -> Tuple[bool, Any]:
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return False, None
+        _cache.move_to_end(key)
+        return True, entry[0]
+
+def put_artifact(value: Any) -> str:
+    """Stores a JSON-serializable value and returns its reference"""
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    ref = hashlib.sha256(data).hexdigest()
+    path = _path(ref)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp_path, path)
+    _cache_put((ref, None), json.loads(data), len(data))
+    return ref
+
+def get_artifact(ref: str, decode: Optional[Callable[[Any], Any]] = None) -> Any:
+    """Loads an artifact, optionally decoded; cached values are shared, so treat them as read-only"""
+    found, value = _cache_get((ref, decode))
+    if found:
+        # Cache hits count as use too, or a busy session's artifact would age out on disk
+        _touch(_path(ref))
+        return value
+
+    path = _path(ref)
+    try:
+        with open(path, "rb") as f:
+            data = zlib.decompress(f.read())
+        _touch(path)
+    except FileNotFoundError:
+        raise ArtifactMissing(ref)
+
+    value = json.loads(data)
+    if decode is not None:
+        value = decode(value)
+    _cache_put((ref, decode), value, len(data))
+    return value
+
+def artifact_size(ref: str) -> int:
+    """Bytes the artifact takes on disk, 0 once pruned"""
+    try:
+        return os.path.getsize(_path(ref))
+    except OSError:
+        return 0
+
+def cache_bytes() -> int:
+    with _cache_lock:
+        return _cache_size
+
+def prune_artifacts(max_age: float = ARTIFACT_TTL, keep: Iterable[str] = ()) -> int:
+    """Deletes artifacts nobody has stored or read for max_age seconds, except the refs in keep"""
+    cutoff = time.time() - max_age
+    kept = {os.path.basename(_path(ref)) for ref in keep}
+    removed = 0
+    for root, _, files in os.walk(ARTIFACT_DIR):
+        for name in files:
+            if name in kept:
+                continue
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Could not prune artifact {path}: {e}")
+    return removed
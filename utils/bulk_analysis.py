@@ -0,0 +1,307 @@
+"""Offline bulk rescoring of stored resumes against a set of job descriptions.
+
+Instead of one interactive call per request, a run writes every request of a
+workload to a JSONL batch file, submits it through a batch backend (the provider's
+batch API or the local stand-in, see llm_modules.batch_backend), polls until it
+finishes and fans the replies back through the same functions the UI uses, storing
+comparisons and ATS reports under the keys the pages read.
+
+A run has two rounds: "prepare" extracts missing JD requirement lists and resume
+digests, and "compare" sends the comparisons that read them. Progress is kept in
+<run dir>/manifest.json after every step, so rerunning with the same --run-dir after
+a crash or with --no-wait continues where the run stopped instead of paying again.
+
+    python -m utils.bulk_analysis --jd-dir open_roles/ --run-dir batch_runs/nightly
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from llm_modules.batch_backend import BATCH_BACKEND, BatchBackend, TERMINAL_STATES, get_batch_backend, batch_request_line, result_content
+from llm_modules.jd_comparator import USE_JD_REQUIREMENTS, plan_comparison, finish_planned_comparison, parse_comparison_response
+from llm_modules.jd_requirements import jd_requirements_hash, requirement_chunks, requirements_request, parse_requirements_response, merge_chunk_results
+from llm_modules.keyword_analyzer import analyze_ats_keywords
+from llm_modules.resume_digest import USE_RESUME_DIGEST, needs_digest, resume_digest_hash, digest_request, parse_digest_response
+from resume_parser.parsed_resume import ParsedResume, render_resume_text
+from utils.result_store import get_result, put_result, is_cacheable, list_resume_hashes, hash_text
+from utils.jd_fingerprint import similar_jd_result, register_jd
+
+logger = logging.getLogger(__name__)
+
+BULK_RUN_DIR = os.getenv("BULK_RUN_DIR", "batch_runs")
+BULK_POLL_INTERVAL = float(os.getenv("BULK_POLL_INTERVAL", "60"))
+
+ROUNDS = ("prepare", "compare")
+
+class BulkRun:
+    """One workload's manifest: its resumes, JDs and the state of each round"""
+
+    def __init__(self, run_dir: str, manifest: dict):
+        self.run_dir = run_dir
+        self.manifest = manifest
+
+    @classmethod
+    def create(cls, run_dir: str, resume_hashes: List[str], jds: Dict[str, str], backend: str, force: bool = False) -> "BulkRun":
+        os.makedirs(run_dir, exist_ok=True)
+        run = cls(run_dir, {
+            "created_at": time.time(),
+            "backend": backend,
+            "force": force,
+            "resumes": resume_hashes,
+            "jds": jds,
+            "rounds": {},
+        })
+        run.save()
+        return run
+
+    @classmethod
+    def load(cls, run_dir: str) -> Optional["BulkRun"]:
+        path = os.path.join(run_dir, "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return cls(run_dir, json.load(f))
+
+    def save(self) -> None:
+        """Writes the manifest atomically so a crash leaves either the old or the new one"""
+        path = os.path.join(self.run_dir, "manifest.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def round(self, name: str) -> Optional[dict]:
+        return self.manifest["rounds"].get(name)
+
+def load_parsed(resume_hash: str) -> Optional[ParsedResume]:
+    payload = get_result("parsed", resume_hash)
+    return ParsedResume.from_payload(payload) if payload else None
+
+def load_jds(paths: Iterable[str]) -> Dict[str, str]:
+    """JD texts keyed by the jd_hash the app and API use for them"""
+    jds = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if text.strip():
+            jds[hash_text(text)] = text
+    return jds
+
+def plan_prepare(run: BulkRun) -> List[dict]:
+    """Tasks for the requirement lists and digests the comparisons will read but are not stored yet"""
+    tasks = []
+    if USE_JD_REQUIREMENTS:
+        seen = set()
+        for text in run.manifest["jds"].values():
+            requirements_hash = jd_requirements_hash(text)
+            if requirements_hash in seen or get_result("jd_requirements", "", requirements_hash) is not None:
+                continue
+            seen.add(requirements_hash)
+            tasks.append({
+                "kind": "jd_requirements", "key": requirements_hash,
+                "requests": [requirements_request(chunk) for chunk in requirement_chunks(text)],
+            })
+    if USE_RESUME_DIGEST:
+        seen = set()
+        for resume_hash in run.manifest["resumes"]:
+            parsed = load_parsed(resume_hash)
+            if parsed is None or not needs_digest(parsed):
+                continue
+            digest_hash = resume_digest_hash(parsed)
+            if digest_hash in seen or get_result("resume_digest", digest_hash) is not None:
+                continue
+            seen.add(digest_hash)
+            tasks.append({
+                "kind": "resume_digest", "key": digest_hash,
+                "requests": [digest_request(render_resume_text(parsed))],
+            })
+    return tasks
+
+def stored_inputs(parsed: ParsedResume, text: str) -> tuple:
+    """(requirements, digest) the comparison reads, as the prepare round left them in the store"""
+    requirements = get_result("jd_requirements", "", jd_requirements_hash(text)) if USE_JD_REQUIREMENTS else None
+    digest = get_result("resume_digest", resume_digest_hash(parsed)) if USE_RESUME_DIGEST and needs_digest(parsed) else None
+    return requirements, digest
+
+def plan_compare(run: BulkRun) -> List[dict]:
+    """Tasks for every resume/JD pair without a stored comparison (every pair with force)"""
+    tasks = []
+    for resume_hash in run.manifest["resumes"]:
+        parsed = load_parsed(resume_hash)
+        if parsed is None:
+            logger.warning(f"Resume {resume_hash} has no stored parse; skipping it")
+            continue
+        for jd_hash, text in run.manifest["jds"].items():
+            stored = get_result("jd_comparison", resume_hash, jd_hash)
+            if stored is None and not run.manifest["force"]:
+                stored = similar_jd_result("jd_comparison", resume_hash, jd_hash, text)
+                if stored is not None:
+                    put_result("jd_comparison", resume_hash, stored, jd_hash)
+            if stored is not None and not run.manifest["force"]:
+                if get_result("ats_analysis", resume_hash, jd_hash) is None:
+                    store_ats(parsed, text, stored, resume_hash, jd_hash)
+                continue
+            plan = plan_comparison(parsed, text, *stored_inputs(parsed, text))
+            tasks.append({"kind": "jd_comparison", "resume_hash": resume_hash, "jd_hash": jd_hash, "requests": plan["requests"]})
+    return tasks
+
+def write_batch_file(run: BulkRun, name: str, tasks: List[dict]) -> str:
+    """Writes the round's requests as batch input lines and swaps each task's requests for their custom ids"""
+    path = os.path.join(run.run_dir, f"{name}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for task_index, task in enumerate(tasks):
+            custom_ids = []
+            for request_index, body in enumerate(task.pop("requests")):
+                custom_id = f"{name}-{task_index}-{request_index}"
+                f.write(json.dumps(batch_request_line(custom_id, body)) + "\n")
+                custom_ids.append(custom_id)
+            task["custom_ids"] = custom_ids
+    return path
+
+def parse_reply(result: Optional[dict], parse: Callable[[str], dict]) -> dict:
+    """One parsed reply, or an error dict for failed, unparseable or missing results"""
+    if result is None:
+        return {"error": "Batch returned no result for this request"}
+    json_response = ""
+    try:
+        json_response = result_content(result)
+        return parse(json_response)
+    except json.JSONDecodeError as e:
+        return {"error": "JSON parsing failed", "raw_response": json_response, "json_error": str(e)}
+    except Exception as e:
+        return {"error": "Batch request failed", "error_type": type(e).__name__, "error_message": str(e)}
+
+def store_ats(parsed: ParsedResume, text: str, comparison: dict, resume_hash: str, jd_hash: str) -> None:
+    ats = analyze_ats_keywords(parsed, text, jd_analysis=comparison)
+    if is_cacheable(ats):
+        put_result("ats_analysis", resume_hash, ats, jd_hash)
+
+def apply_task(run: BulkRun, task: dict, results: Dict[str, dict]) -> bool:
+    """Stores one task's outcome; False when it failed and is left for the next run"""
+    replies = [results.get(custom_id) for custom_id in task["custom_ids"]]
+
+    if task["kind"] == "jd_requirements":
+        requirements = merge_chunk_results([parse_reply(reply, parse_requirements_response) for reply in replies])
+        if not is_cacheable(requirements):
+            return False
+        put_result("jd_requirements", "", requirements, task["key"])
+        return True
+
+    if task["kind"] == "resume_digest":
+        digest = parse_reply(replies[0], parse_digest_response)
+        if not is_cacheable(digest):
+            return False
+        put_result("resume_digest", task["key"], digest)
+        return True
+
+    resume_hash, jd_hash = task["resume_hash"], task["jd_hash"]
+    parsed, text = load_parsed(resume_hash), run.manifest["jds"][jd_hash]
+    # Re-planned from the same stored inputs, so chunking and labels match what was sent
+    plan = plan_comparison(parsed, text, *stored_inputs(parsed, text))
+    if len(plan["requests"]) != len(replies):
+        logger.warning(f"Comparison inputs for {resume_hash}/{jd_hash} changed since the batch was written; skipping")
+        return False
+    comparison = finish_planned_comparison(plan, [parse_reply(reply, parse_comparison_response) for reply in replies])
+    if not is_cacheable(comparison):
+        return False
+    put_result("jd_comparison", resume_hash, comparison, jd_hash)
+    register_jd(jd_hash, text)
+    store_ats(parsed, text, comparison, resume_hash, jd_hash)
+    return True
+
+def wait_for_batch(backend: BatchBackend, batch_id: str, poll_interval: float) -> dict:
+    while True:
+        status = backend.status(batch_id)
+        logger.info(f"Batch {batch_id}: {status['state']} ({status['completed']} done, {status['failed']} failed of {status['total']})")
+        if status["state"] in TERMINAL_STATES:
+            return status
+        time.sleep(poll_interval)
+
+def advance_round(run: BulkRun, name: str, backend: BatchBackend, wait: bool, poll_interval: float) -> bool:
+    """Moves one round as far as it can go; True once its results are applied"""
+    state = run.round(name)
+    if state is None:
+        tasks = plan_prepare(run) if name == "prepare" else plan_compare(run)
+        input_path = write_batch_file(run, name, tasks)
+        state = run.manifest["rounds"][name] = {"state": "planned", "input": input_path, "tasks": tasks}
+        run.save()
+        logger.info(f"Round {name}: {len(tasks)} tasks")
+
+    if state["state"] == "planned":
+        if not state["tasks"]:
+            state["state"] = "applied"
+            run.save()
+            return True
+        # Saved before the batch starts, so a crash in between never starts (and pays for) a second one
+        state["file_id"] = backend.upload(state["input"])
+        state["state"] = "submitting"
+        run.save()
+
+    if state["state"] == "submitting":
+        batch_id = backend.find_batch(state["file_id"])
+        if batch_id is None:
+            batch_id = backend.start(state["file_id"])
+        state["batch_id"] = batch_id
+        state["state"] = "submitted"
+        run.save()
+        logger.info(f"Round {name}: submitted batch {state['batch_id']}")
+
+    if state["state"] == "submitted":
+        if wait:
+            status = wait_for_batch(backend, state["batch_id"], poll_interval)
+        else:
+            status = backend.status(state["batch_id"])
+            if status["state"] not in TERMINAL_STATES:
+                logger.info(f"Round {name}: batch {state['batch_id']} is {status['state']}; run again to collect it")
+                return False
+        results = {result["custom_id"]: result for result in backend.results(state["batch_id"])}
+        stored = sum(apply_task(run, task, results) for task in state["tasks"])
+        state.update({"state": "applied", "batch_state": status["state"], "stored": stored, "failed": len(state["tasks"]) - stored})
+        run.save()
+        logger.info(f"Round {name}: stored {stored} of {len(state['tasks'])} tasks")
+    return True
+
+def run_bulk(run: BulkRun, backend: Optional[BatchBackend] = None, wait: bool = True, poll_interval: float = BULK_POLL_INTERVAL) -> bool:
+    """Advances every round in order; True when the whole run has been applied"""
+    backend = backend or get_batch_backend(run.manifest["backend"])
+    for name in ROUNDS:
+        if not advance_round(run, name, backend, wait, poll_interval):
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore stored resumes against job descriptions with batch requests")
+    parser.add_argument("--jd", action="append", default=[], help="JD text file (repeatable)")
+    parser.add_argument("--jd-dir", help="Directory of JD .txt files")
+    parser.add_argument("--resume-hash", action="append", default=[], help="Stored resume to score (default: every stored resume)")
+    parser.add_argument("--run-dir", help="Run directory; an existing run there is continued")
+    parser.add_argument("--backend", default=None, help="Batch backend: openai or local (default: BATCH_BACKEND)")
+    parser.add_argument("--force", action="store_true", help="Rescore pairs that already have a stored comparison")
+    parser.add_argument("--no-wait", action="store_true", help="Submit or check the current batch and exit instead of polling")
+    parser.add_argument("--poll-interval", type=float, default=BULK_POLL_INTERVAL)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    run_dir = args.run_dir or os.path.join(BULK_RUN_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    run = BulkRun.load(run_dir)
+    if run is None:
+        paths = args.jd + (sorted(glob.glob(os.path.join(args.jd_dir, "*.txt"))) if args.jd_dir else [])
+        jds = load_jds(paths)
+        if not jds:
+            parser.error("no job descriptions given (--jd or --jd-dir)")
+        resumes = args.resume_hash or list_resume_hashes("parsed")
+        backend_name = (args.backend or BATCH_BACKEND).lower()
+        run = BulkRun.create(run_dir, resumes, jds, backend_name, args.force)
+        logger.info(f"Run {run_dir}: {len(resumes)} resumes x {len(jds)} JDs")
+    else:
+        logger.info(f"Continuing run {run_dir}")
+
+    backend = get_batch_backend(args.backend or run.manifest["backend"])
+    done = run_bulk(run, backend, wait=not args.no_wait, poll_interval=args.poll_interval)
+    summary = {name: {k: v for k, v in state.items() if k not in ("tasks", "input")} for name, state in run.manifest["rounds"].items()}
+    print(json.dumps({"run_dir": run_dir, "done": done, "rounds": summary}, indent=2))
+
+if __name__ == "__main__":
+    main()
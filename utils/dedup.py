@@ -0,0 +1,78 @@
+"""Near-duplicate detection for short texts such as resume bullets.
+
+Texts are reduced to word shingles and MinHash signatures; two texts are duplicates
+when their estimated Jaccard similarity reaches the threshold, or when almost all of
+the shorter one's shingles appear in the longer one (a chunk cut out of a bigger block).
+"""
+import hashlib
+import random
+import re
+from typing import List, Sequence, Set
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+SIMILARITY_THRESHOLD = 0.8
+CONTAINMENT_THRESHOLD = 0.9
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+
+def normalize_words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Word n-grams of the text; texts shorter than size give one shingle of all their words"""
+    words = normalize_words(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def hash64(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash_signature(shingle_set: Set[str]) -> List[int]:
+    hashes = [hash64(shingle) for shingle in shingle_set]
+    if not hashes:
+        return [_MERSENNE_PRIME] * NUM_PERMUTATIONS
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def estimated_similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+def containment(smaller: Set[str], larger: Set[str]) -> float:
+    return len(smaller & larger) / len(smaller) if smaller else 0.0
+
+def near_duplicate_groups(texts: Sequence[str], threshold: float = SIMILARITY_THRESHOLD, containment_threshold: float = CONTAINMENT_THRESHOLD) -> List[List[int]]:
+    """Groups the indices of near-identical texts, in first-occurrence order.
+
+    The first index of each group is its representative: the longest text of the group,
+    so a rewrite of it covers everything its duplicates said.
+    """
+    shingle_sets = [shingles(text) for text in texts]
+    signatures = [minhash_signature(s) for s in shingle_sets]
+
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(texts)):
+        for j in range(i + 1, len(texts)):
+            if find(i) == find(j) or not shingle_sets[i] or not shingle_sets[j]:
+                continue
+            small, large = sorted((shingle_sets[i], shingle_sets[j]), key=len)
+            if estimated_similarity(signatures[i], signatures[j]) >= threshold or containment(small, large) >= containment_threshold:
+                parent[find(j)] = find(i)
+
+    groups = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    ordered = sorted(groups.values(), key=lambda group: group[0])
+    return [sorted(group, key=lambda i: (-len(texts[i]), i)) for group in ordered]
@@ -0,0 +1,210 @@
+import hashlib
+import io
+import re
+import threading
+import unicodedata
+import zipfile
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from docx import Document
+from fpdf import FPDF
+from utils.job_queue import submit_job, update_progress
+from utils.metrics import record_cache
+
+EXPORT_CACHE_SIZE = 64
+
+EXPORT_FORMATS = {
+    "TXT": ("txt", "text/plain"),
+    "PDF": ("pdf", "application/pdf"),
+    "DOCX": ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+}
+
+_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def export_key(text: str, export_format: str) -> str:
+    """Content hash identifying one rendered artifact/format pair"""
+    return hashlib.sha256(f"{export_format}\0{text}".encode("utf-8")).hexdigest()
+
+def get_cached_export(key: str) -> Optional[bytes]:
+    """Returns previously rendered bytes, refreshing their LRU position"""
+    with _cache_lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+    record_cache("export", data is not None)
+    return data
+
+def _cache_export(key: str, data: bytes) -> None:
+    with _cache_lock:
+        _cache[key] = data
+        _cache.move_to_end(key)
+        while len(_cache) > EXPORT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def clean_pdf_text(text: str) -> str:
+    """Reduces text to ASCII so the core FPDF fonts can render it"""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+def strip_inline_markdown(text: str) -> str:
+    """Drops bold/italic markers from a line of markdown"""
+    return re.sub(r'(\*\*|__)(.+?)\1', r'\2', text)
+
+def classify_line(line: str) -> tuple:
+    """Splits a markdown-ish line into (kind, text) where kind is heading, bullet, text or blank"""
+    stripped = line.strip()
+    if not stripped:
+        return "blank", ""
+    if stripped.startswith("#"):
+        return "heading", strip_inline_markdown(stripped.lstrip("#").strip())
+    if re.match(r'^[-*•]\s+', stripped):
+        return "bullet", strip_inline_markdown(re.sub(r'^[-*•]\s+', '', stripped))
+    return "text", strip_inline_markdown(stripped)
+
+def render_txt(text: str) -> bytes:
+    return text.encode("utf-8")
+
+def render_pdf(text: str) -> bytes:
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=12)
+    line_height = 6
+
+    for line in clean_pdf_text(text).split("\n"):
+        kind, content = classify_line(line)
+        if kind == "blank":
+            pdf.ln(line_height)
+        elif kind == "heading":
+            pdf.set_font("Arial", style="B", size=13)
+            pdf.multi_cell(0, line_height + 2, content)
+        elif kind == "bullet":
+            pdf.set_font("Arial", size=11)
+            pdf.multi_cell(0, line_height, f"- {content}")
+        else:
+            pdf.set_font("Arial", size=11)
+            pdf.multi_cell(0, line_height, content)
+
+    output = pdf.output(dest="S")
+    return output.encode("latin-1") if isinstance(output, str) else bytes(output)
+
+def render_docx(text: str) -> bytes:
+    doc = Document()
+    for line in text.split("\n"):
+        kind, content = classify_line(line)
+        if kind == "heading":
+            doc.add_heading(content, level=2)
+        elif kind == "bullet":
+            doc.add_paragraph(content, style="List Bullet")
+        else:
+            doc.add_paragraph(content)
+
+    doc_io = io.BytesIO()
+    doc.save(doc_io)
+    return doc_io.getvalue()
+
+RENDERERS = {
+    "TXT": render_txt,
+    "PDF": render_pdf,
+    "DOCX": render_docx,
+}
+
+def render_export(text: str, export_format: str) -> bytes:
+    """Renders text to TXT/PDF/DOCX bytes, rendering each content/format pair only once"""
+    key = export_key(text, export_format)
+    cached = get_cached_export(key)
+    if cached is not None:
+        return cached
+
+    data = RENDERERS[export_format](text)
+    _cache_export(key, data)
+    return data
+
+def export_file_name(base_name: str, export_format: str) -> str:
+    return f"{base_name}.{EXPORT_FORMATS[export_format][0]}"
+
+def export_mime(export_format: str) -> str:
+    return EXPORT_FORMATS[export_format][1]
+
+def bundle_key(documents: Dict[str, str], formats: List[str]) -> str:
+    """Content hash identifying a multi-document export"""
+    parts = [export_key(text, name) for name, text in sorted(documents.items())]
+    return hashlib.sha256("\0".join(parts + sorted(formats)).encode("utf-8")).hexdigest()
+
+def render_bundle(documents: Dict[str, str], formats: List[str]) -> bytes:
+    """Renders every document in every format in one pass and zips the results"""
+    key = bundle_key(documents, formats)
+    cached = get_cached_export(key)
+    if cached is not None:
+        return cached
+
+    total = max(1, len(documents) * len(formats))
+    done = 0
+    zip_io = io.BytesIO()
+    with zipfile.ZipFile(zip_io, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in documents.items():
+            for export_format in formats:
+                archive.writestr(export_file_name(name, export_format), render_export(text, export_format))
+                done += 1
+                update_progress(done / total, f"Rendered {done} of {total} files")
+
+    data = zip_io.getvalue()
+    _cache_export(key, data)
+    return data
+
+def _render_bundle_job(documents: Dict[str, str], formats: List[str]) -> str:
+    render_bundle(documents, formats)
+    return bundle_key(documents, formats)
+
+def submit_export_batch(documents: Dict[str, str], formats: List[str]) -> str:
+    """Renders a large export on the background workers; the job result is the bundle's cache key"""
+    return submit_job(
+        "export_bundle",
+        _render_bundle_job,
+        args=(documents, formats),
+        key=bundle_key(documents, formats)
+    )
+
+def _normalize_words(text: str) -> str:
+    return " ".join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+def build_tailored_resume(formatted: Dict[str, str], optimization_results: dict) -> str:
+    """Combines the formatted sections with optimized bullets into one markdown resume"""
+    rewrites = []
+    optimized_bullets = [b for b in optimization_results.get("improvement_analysis", []) if b.get("optimized")]
+    for bullet_index, bullet in enumerate(optimized_bullets):
+        # Near-duplicates were rewritten once; the rewrite replaces every occurrence
+        for text in [bullet.get("original", "")] + bullet.get("duplicates", []):
+            original = _normalize_words(text)
+            if original:
+                rewrites.append((original, bullet["optimized"], bullet_index))
+
+    used = set()
+    sections = []
+    for section, text in formatted.items():
+        lines = []
+        for line in text.split("\n"):
+            kind, content = classify_line(line)
+            normalized = _normalize_words(content)
+            replacement = None
+            if kind in ("bullet", "text") and normalized:
+                for index, (original, optimized, _) in enumerate(rewrites):
+                    if index not in used and (original == normalized or (len(original) > 30 and original in normalized)):
+                        replacement = optimized
+                        used.add(index)
+                        break
+            lines.append(f"- {replacement}" if replacement else line)
+
+        body = "\n".join(lines).strip()
+        if not body.lstrip().startswith("#"):
+            body = f"## {section}\n\n{body}"
+        sections.append(body)
+
+    placed = {rewrites[index][2] for index in used}
+    leftovers = [
+        optimized_bullets[bullet_index]["optimized"]
+        for bullet_index in dict.fromkeys(entry[2] for entry in rewrites) if bullet_index not in placed
+    ]
+    if leftovers:
+        sections.append("## Tailored Highlights\n\n" + "\n".join(f"- {b}" for b in leftovers))
+
+    return "\n\n".join(sections) + "\n"
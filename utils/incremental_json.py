@@ -0,0 +1,81 @@
+"""Incremental parsing of a JSON object that arrives in streamed text chunks.
+
+Only the structure needed to find completed array items is tracked (string and
+escape state plus the container stack), so each chunk is scanned once.
+"""
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+class IncrementalJSONItems:
+    """Emits the items of selected top-level arrays as soon as each item closes.
+
+    Text before the root object (such as a ```json fence) is skipped. Items that fail to
+    parse are dropped; the complete response stays the authoritative result.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys = set(keys)
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.in_string = False
+        self.escape = False
+        self.stack: List[str] = []
+        self.string_start = 0
+        self.last_string: Optional[str] = None
+        self.current_key: Optional[str] = None
+        self.array_key: Optional[str] = None
+        self.item_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consumes the next chunk and returns the (key, item) pairs it completed"""
+        self.buffer += text
+        items = []
+        buffer = self.buffer
+        while self.pos < len(buffer) and not self.finished:
+            char = buffer[self.pos]
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self.stack.append("{")
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        self.last_string = self._decode(buffer[self.string_start:self.pos + 1])
+            elif char == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif char == ":" and len(self.stack) == 1:
+                self.current_key = self.last_string
+            elif char in "{[":
+                if char == "[" and len(self.stack) == 1 and self.current_key in self.keys:
+                    self.array_key = self.current_key
+                elif char == "{" and self.array_key and self.stack == ["{", "["]:
+                    self.item_start = self.pos
+                self.stack.append(char)
+            elif char in "}]":
+                self.stack.pop()
+                if char == "}" and self.item_start is not None and self.stack == ["{", "["]:
+                    item = self._decode(buffer[self.item_start:self.pos + 1])
+                    if item is not None:
+                        items.append((self.array_key, item))
+                    self.item_start = None
+                elif char == "]" and len(self.stack) == 1:
+                    self.array_key = None
+                elif not self.stack:
+                    self.finished = True
+            self.pos += 1
+        return items
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
@@ -0,0 +1,88 @@
+"""Near-duplicate job descriptions, so results computed for one posting serve its copies.
+
+The same job is often pasted with different whitespace, reordered bullets or another
+footer, which gives it a new jd_hash and misses every exact-key cache. Each JD is
+normalized to its set of lines (boilerplate stripped, words lowercased, punctuation
+and line order ignored) and indexed by the hash of that set. A JD reuses results only
+from JDs with the same line set, so any wording change in a requirement is scored afresh.
+"""
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, List, Optional, Set
+from utils.dedup import normalize_words
+from utils.jd_preprocessor import strip_boilerplate
+from utils.metrics import record_cache, JD_NEAR_DUPLICATE_REUSE
+from utils.result_store import get_connection, get_result, hash_payload
+
+logger = logging.getLogger(__name__)
+
+USE_JD_NEAR_DUPLICATES = os.getenv("USE_JD_NEAR_DUPLICATES", "1") == "1"
+MAX_CANDIDATES = 20
+
+def jd_lines(job_description: str) -> Set[str]:
+    """Normalized lines of the boilerplate-free JD; equal sets mean the same posting"""
+    lines = set()
+    for line in (strip_boilerplate(job_description) or job_description or "").split("\n"):
+        words = normalize_words(line)
+        if words:
+            lines.add(" ".join(words))
+    return lines
+
+def lines_hash(lines: Set[str]) -> str:
+    return hash_payload(sorted(lines))
+
+def jd_fingerprint(job_description: str) -> str:
+    return lines_hash(jd_lines(job_description))
+
+def register_jd(jd_hash: str, job_description: str) -> None:
+    """Adds a JD to the index; registering the same jd_hash again is a no-op"""
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jd_line_sets (jd_hash, lines_hash, created_at) VALUES (?, ?, ?)",
+                (jd_hash, jd_fingerprint(job_description), time.time())
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"JD fingerprint index write failed: {e}")
+
+def similar_jds(job_description: str, exclude: str = "") -> List[str]:
+    """jd_hashes of indexed JDs with the same normalized lines, most recent first"""
+    try:
+        rows = get_connection().execute(
+            "SELECT jd_hash FROM jd_line_sets WHERE lines_hash = ? AND jd_hash != ? ORDER BY created_at DESC LIMIT ?",
+            (jd_fingerprint(job_description), exclude, MAX_CANDIDATES)
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"JD fingerprint lookup failed: {e}")
+        return []
+    return [jd_hash for (jd_hash,) in rows]
+
+def similar_jd_result(kind: str, resume_hash: str, jd_hash: str, job_description: str) -> Optional[Any]:
+    """A stored result of this kind for the same resume and a JD with the same lines, or None.
+
+    Also indexes the JD so later copies of it are found. A reused dict result records
+    its source under analysis_metadata.reused_from; callers store it under their own
+    jd_hash like any computed result.
+    """
+    if not USE_JD_NEAR_DUPLICATES or not job_description:
+        return None
+    candidates = similar_jds(job_description, exclude=jd_hash)
+    register_jd(jd_hash, job_description)
+
+    for candidate_hash in candidates:
+        result = get_result(kind, resume_hash, candidate_hash)
+        if result is None:
+            continue
+        record_cache(f"jd_near_duplicate:{kind}", True)
+        JD_NEAR_DUPLICATE_REUSE.inc(kind=kind)
+        if isinstance(result, dict):
+            metadata = dict(result.get("analysis_metadata") or {})
+            metadata["reused_from"] = {"jd_hash": candidate_hash}
+            result = dict(result, analysis_metadata=metadata)
+        return result
+
+    record_cache(f"jd_near_duplicate:{kind}", False)
+    return None
@@ -0,0 +1,99 @@
+import re
+from typing import List
+from utils.token_estimator import estimate_tokens
+
+BOILERPLATE_HEADINGS = [
+    r"benefits?", r"perks?(?:\s*(?:&|and)\s*benefits?)?", r"what we offer", r"why (?:join|work)(?: with)? us",
+    r"compensation(?:\s*(?:&|and)\s*benefits?)?", r"salary(?: range)?", r"pay range",
+    r"equal (?:employment )?opportunity(?: employer)?", r"eeo(?: statement)?", r"diversity(?:,? equity)?(?:,? (?:and|&) inclusion)?",
+    r"accommodations?", r"reasonable accommodations?", r"privacy(?: notice| policy)?", r"about us",
+    r"about the company", r"our culture", r"life at .{1,40}", r"how to apply", r"disclaimer",
+]
+
+BOILERPLATE_PATTERNS = [
+    r"\bequal (?:employment )?opportunity\b",
+    r"\bwithout regard to (?:race|color|religion|sex|gender|age|national origin)\b",
+    r"\b(?:race|color|religion),? (?:sex|gender|national origin)\b",
+    r"\bprotected (?:veteran|class|characteristic)s?\b",
+    r"\breasonable accommodations?\b",
+    r"\b(?:401\s?\(?k\)?|paid time off|pto|parental leave|health,? dental,? (?:and|&) vision)\b",
+    r"\bapplicant privacy\b",
+    r"\be-?verify\b",
+]
+
+_heading_re = re.compile(
+    r"^\s*(?:#+\s*)?(?:" + "|".join(BOILERPLATE_HEADINGS) + r")\s*:?\s*$", re.IGNORECASE
+)
+_boilerplate_re = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+_bullet_re = re.compile(r"^\s*(?:[-*•▪●‣➤]|\d+[.)])\s+")
+
+def is_heading(line: str) -> bool:
+    """Short lines ending in a colon or without terminal punctuation look like JD headings"""
+    stripped = line.strip().lstrip("#").strip()
+    if not stripped or len(stripped) > 60 or _bullet_re.match(line):
+        return False
+    return stripped.endswith(":") or (len(stripped.split()) <= 6 and not stripped.endswith((".", ",", ";")))
+
+def strip_boilerplate(job_description: str) -> str:
+    """Drops benefits, EEO, privacy and similar boilerplate blocks from a job description"""
+    if not job_description:
+        return ""
+
+    kept = []
+    skipping = False
+    for line in job_description.split("\n"):
+        if _heading_re.match(line):
+            skipping = True
+            continue
+        if skipping and is_heading(line) and not _boilerplate_re.search(line):
+            skipping = False
+        if skipping:
+            continue
+        if line.strip() and not _bullet_re.match(line) and _boilerplate_re.search(line):
+            continue
+        kept.append(line)
+
+    text = "\n".join(kept)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def split_jd_chunks(job_description: str, max_tokens: int) -> List[str]:
+    """Splits a JD into chunks under max_tokens, keeping headings with the requirement lines that follow them"""
+    blocks = []
+    current = []
+    for line in job_description.split("\n"):
+        if is_heading(line) and current:
+            blocks.append("\n".join(current))
+            current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+
+    pieces = []
+    for block in blocks:
+        if estimate_tokens(block) <= max_tokens:
+            pieces.append(block)
+            continue
+        lines = block.split("\n")
+        heading = lines[0] if is_heading(lines[0]) else ""
+        group = [heading] if heading else []
+        for line in lines[1:] if heading else lines:
+            if group and estimate_tokens("\n".join(group + [line])) > max_tokens:
+                pieces.append("\n".join(group))
+                group = [heading] if heading else []
+            group.append(line)
+        if group:
+            pieces.append("\n".join(group))
+
+    chunks = []
+    current_chunk = ""
+    for piece in pieces:
+        candidate = f"{current_chunk}\n\n{piece}" if current_chunk else piece
+        if current_chunk and estimate_tokens(candidate) > max_tokens:
+            chunks.append(current_chunk)
+            current_chunk = piece
+        else:
+            current_chunk = candidate
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
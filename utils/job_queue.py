@@ -0,0 +1,229 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from utils.result_store import save_job, load_job, is_cacheable
+from utils.metrics import QUEUE_DEPTH
+from utils.admission import controller as admission
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "600"))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="resume-job")
+_jobs: Dict[str, dict] = {}
+_futures: Dict[str, Future] = {}
+_lock = threading.Lock()
+_current = threading.local()
+
+def make_job_id(kind: str, key: Optional[str] = None) -> str:
+    """Builds a job id, deterministic when a key is given so resubmissions attach to the same job"""
+    if key is None:
+        return f"{kind}-{uuid.uuid4().hex[:16]}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return f"{kind}-{digest}"
+
+def _reusable(job: Optional[dict], cacheable: Callable[[Any], bool]) -> bool:
+    """Whether a submission may attach to this job instead of running again"""
+    if job is None or job["status"] in ("failed", "cancelled"):
+        return False
+    return job["status"] != "done" or cacheable(job["result"])
+
+def submit_job(kind: str, fn: Callable, args: tuple = (), kwargs: Optional[dict] = None, key: Optional[str] = None, owner: Optional[Tuple[str, str]] = None, cacheable: Callable[[Any], bool] = is_cacheable) -> str:
+    """Queues fn(*args, **kwargs) on the background workers and returns its job id.
+
+    Jobs with an owner (user_id, session_id) wait for admission control before they
+    reach a worker; AdmissionRejected is raised when the owner's line is full. Every
+    owner that attaches to a queued or running job is recorded, so cancel_job by one of
+    them leaves the job running for the rest. A job whose result fails cacheable (e.g.
+    an error dict) finishes but is not persisted, and the next submission runs it again
+    instead of attaching to it.
+    """
+    job_id = make_job_id(kind, key)
+
+    with _lock:
+        existing = _jobs.get(job_id)
+        if _reusable(existing, cacheable):
+            if owner and existing["status"] in ("queued", "running") and list(owner) not in existing["owners"]:
+                existing["owners"].append(list(owner))
+            return job_id
+
+        if existing is None and key is not None:
+            persisted = load_job(job_id)
+            if _reusable(persisted, cacheable):
+                _jobs[job_id] = persisted
+                return job_id
+
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "progress": 0.0,
+            "message": "Waiting for a worker",
+            "result": None,
+            "error": None,
+            "owner": list(owner) if owner else None,
+            "owners": [list(owner)] if owner else [],
+            "ticket": uuid.uuid4().hex if owner else None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        _jobs[job_id] = job
+        if owner is None:
+            _futures[job_id] = _executor.submit(_run_job, job, fn, args, kwargs or {}, cacheable)
+            return job_id
+
+    ticket = job["ticket"]
+
+    def dispatch():
+        with _lock:
+            if _jobs.get(job_id) is not job or job["status"] == "cancelled":
+                admission.release(ticket)
+                return
+            _futures[job_id] = _executor.submit(_run_job, job, fn, args, kwargs or {}, cacheable)
+
+    try:
+        admission.enqueue(ticket, owner, dispatch)
+    except Exception:
+        with _lock:
+            if _jobs.get(job_id) is job:
+                del _jobs[job_id]
+        raise
+    return job_id
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Returns a snapshot of a job, falling back to its persisted result"""
+    if not job_id:
+        return None
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            snapshot = dict(job)
+            if job.get("partial"):
+                snapshot["partial"] = {key: list(items) for key, items in job["partial"].items()}
+            if snapshot["status"] == "queued" and snapshot.get("ticket"):
+                position = admission.position(snapshot["ticket"])
+                if position is not None:
+                    snapshot["queue_position"] = position
+                    snapshot["message"] = f"Waiting in line - position {position}"
+            return snapshot
+
+    persisted = load_job(job_id)
+    if persisted is not None:
+        with _lock:
+            _jobs.setdefault(job_id, persisted)
+    return persisted
+
+def update_progress(progress: float, message: str = "") -> None:
+    """Reports progress for the job running on the current worker thread"""
+    job = getattr(_current, "job", None)
+    if job is None:
+        return
+    with _lock:
+        if job["status"] == "running":
+            job["progress"] = max(0.0, min(1.0, progress))
+            if message:
+                job["message"] = message
+
+def partial_reporter() -> Callable[[str, Any], None]:
+    """Returns a callback that appends streamed items to the current job's partial result.
+
+    The callback is bound to the job running on this worker thread, so it can be handed to
+    code that runs on other threads. Pages read the items from get_job()["partial"].
+    """
+    job = getattr(_current, "job", None)
+
+    def report(key: str, item: Any) -> None:
+        if job is None:
+            return
+        with _lock:
+            if job["status"] == "running":
+                job.setdefault("partial", {}).setdefault(key, []).append(item)
+
+    return report
+
+def cancel_job(job_id: str, owner: Optional[Tuple[str, str]] = None) -> bool:
+    """Cancels a queued job or discards the result of a running one.
+
+    With an owner only that owner is detached; the job is cancelled once no other owner is attached.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return False
+        if owner is not None:
+            owners = job.get("owners") or []
+            if list(owner) in owners:
+                owners.remove(list(owner))
+            if owners:
+                return False
+        future = _futures.pop(job_id, None)
+        if future is not None and future.cancel() and job.get("ticket"):
+            admission.release(job["ticket"])
+        elif future is None and job.get("ticket"):
+            admission.cancel(job["ticket"])
+        job.update(status="cancelled", message="Cancelled", finished_at=time.time())
+    return True
+
+def prune_finished_jobs(max_age: float = JOB_RETENTION_SECONDS) -> int:
+    """Drops finished job records from memory; done jobs stay readable from the result store"""
+    cutoff = time.time() - max_age
+    with _lock:
+        stale = [
+            job_id for job_id, job in _jobs.items()
+            if job["status"] in ("done", "failed", "cancelled") and (job.get("finished_at") or 0) < cutoff
+        ]
+        for job_id in stale:
+            del _jobs[job_id]
+    return len(stale)
+
+def pending_jobs() -> int:
+    """Counts jobs that are queued or running"""
+    with _lock:
+        return sum(1 for job in _jobs.values() if job["status"] in ("queued", "running"))
+
+QUEUE_DEPTH.set_function(pending_jobs)
+
+def _run_job(job: dict, fn: Callable, args: tuple, kwargs: dict, cacheable: Callable[[Any], bool]) -> None:
+    """Executes a queued job and records its outcome.
+
+    Updates go to this job's own record; a job cancelled and then resubmitted under the
+    same id has a new record that the old worker never touches.
+    """
+    job_id, ticket = job["id"], job.get("ticket")
+    with _lock:
+        if job["status"] == "cancelled":
+            if ticket:
+                admission.release(ticket)
+            return
+        job["status"] = "running"
+        job["message"] = "Running"
+
+    _current.job = job
+    try:
+        result = fn(*args, **kwargs)
+        with _lock:
+            if job["status"] == "cancelled":
+                return
+            job.pop("partial", None)
+            job.update(status="done", progress=1.0, message="Completed", result=result, finished_at=time.time())
+            snapshot = dict(job)
+        if cacheable(result):
+            save_job(snapshot)
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        with _lock:
+            if job["status"] != "cancelled":
+                job.update(status="failed", message="Failed", error=str(e), finished_at=time.time())
+    finally:
+        _current.job = None
+        with _lock:
+            if _jobs.get(job_id) is job:
+                _futures.pop(job_id, None)
+        if ticket:
+            admission.release(ticket)
@@ -0,0 +1,268 @@
+"""Process-wide counters, gauges and histograms exposed in the Prometheus text format.
+
+The parser, the shared OpenAI client, the result store, the export cache and the
+job queue all report here; `start_metrics_server` serves `GET /metrics` on a
+local port next to the Streamlit server.
+"""
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+SESSION_ACTIVE_WINDOW = float(os.getenv("SESSION_ACTIVE_WINDOW", "900"))
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+PARSE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+_registry_lock = threading.Lock()
+_registry: Dict[str, "Metric"] = {}
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for every label set, without the HELP/TYPE header"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in sorted(values.items())]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Reads the value from function at scrape time (unlabelled gauges only)"""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} callback failed: {e}")
+                return []
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in sorted(values.items())]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            counts = {key: list(values) for key, values in self._counts.items()}
+            sums = dict(self._sums)
+        lines = []
+        for key in sorted(counts):
+            for bound, count in zip(self.buckets, counts[key]):
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sums[key])}")
+            lines.append(f"{self.name}_count{labels} {counts[key][-1]}")
+        return lines
+
+def _register(metric: Metric) -> Metric:
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+def counter(name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+    return _register(Counter(name, documentation, labels))
+
+def gauge(name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+    return _register(Gauge(name, documentation, labels))
+
+def histogram(name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, labels, buckets))
+
+LLM_REQUEST_SECONDS = histogram("resume_tailor_llm_request_seconds", "OpenAI HTTP request latency", ("module", "model"))
+LLM_TOKENS = counter("resume_tailor_llm_tokens_total", "OpenAI tokens used", ("module", "model", "type"))
+LLM_ERRORS = counter("resume_tailor_llm_errors_total", "Failed OpenAI requests", ("module", "reason"))
+LLM_RETRIES = counter("resume_tailor_llm_retries_total", "OpenAI requests that were client retries", ("module",))
+CACHE_REQUESTS = counter("resume_tailor_cache_requests_total", "Cache lookups by cache and outcome", ("cache", "result"))
+PARSE_SECONDS = histogram("resume_tailor_parse_seconds", "Resume PDF parse duration", ("pages",), PARSE_BUCKETS)
+PARSE_FAILURES = counter("resume_tailor_parse_failures_total", "Resume parses rejected or failed, by reason", ("reason",))
+PARSE_WORKER_RESTARTS = counter("resume_tailor_parse_worker_restarts_total", "Parse worker processes replaced, by reason", ("reason",))
+PARSE_WORKERS_BUSY = gauge("resume_tailor_parse_workers_busy", "Parse worker processes currently parsing")
+JD_NEAR_DUPLICATE_REUSE = counter(
+    "resume_tailor_jd_near_duplicate_reuse_total", "Results reused from a near-identical JD, by result kind", ("kind",)
+)
+ACTIVE_SESSIONS = gauge("resume_tailor_active_sessions", f"Sessions seen in the last {int(SESSION_ACTIVE_WINDOW)}s")
+QUEUE_DEPTH = gauge("resume_tailor_job_queue_depth", "Background jobs queued or running")
+SESSION_STATE_BYTES = gauge("resume_tailor_session_state_bytes", "Bytes held in session state, summed over tracked sessions")
+SESSION_STATE_MAX_BYTES = gauge("resume_tailor_session_state_max_bytes", "Bytes held in session state by the largest tracked session")
+SESSION_ARTIFACT_BYTES = gauge("resume_tailor_session_artifact_bytes", "On-disk bytes of the artifacts tracked sessions reference")
+ARTIFACT_CACHE_BYTES = gauge("resume_tailor_artifact_cache_bytes", "Bytes of decoded artifacts held in the in-process cache")
+
+def record_llm_request(module: str, model: str, seconds: float, status: Optional[int], usage: Optional[dict] = None, retry: bool = False, reason: Optional[str] = None) -> None:
+    """Records one OpenAI HTTP attempt"""
+    LLM_REQUEST_SECONDS.observe(seconds, module=module, model=model or "unknown")
+    if retry:
+        LLM_RETRIES.inc(module=module)
+    if reason or (status is not None and status >= 400):
+        LLM_ERRORS.inc(module=module, reason=reason or f"http_{status}")
+    if usage:
+        record_llm_tokens(module, model, usage)
+
+def record_llm_tokens(module: str, model: str, usage: dict) -> None:
+    """Records token usage; streamed responses report it from their final chunk"""
+    LLM_TOKENS.inc(usage.get("prompt_tokens", 0), module=module, model=model or "unknown", type="prompt")
+    LLM_TOKENS.inc(usage.get("completion_tokens", 0), module=module, model=model or "unknown", type="completion")
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def page_bucket(pages: int) -> str:
+    """Caps the page-count label so it stays low-cardinality"""
+    return str(pages) if pages < 5 else "5+"
+
+def record_parse(seconds: float, pages: int) -> None:
+    PARSE_SECONDS.observe(seconds, pages=page_bucket(pages))
+
+def record_parse_failure(reason: str) -> None:
+    PARSE_FAILURES.inc(reason=reason)
+
+_sessions_lock = threading.Lock()
+_sessions: Dict[str, float] = {}
+
+def touch_session(session_id: str) -> None:
+    """Marks a UI session as active; idle sessions age out of the gauge"""
+    now = time.time()
+    with _sessions_lock:
+        _sessions[session_id] = now
+        for stale in [sid for sid, seen in _sessions.items() if now - seen > SESSION_ACTIVE_WINDOW]:
+            del _sessions[stale]
+
+def active_session_count() -> int:
+    cutoff = time.time() - SESSION_ACTIVE_WINDOW
+    with _sessions_lock:
+        return sum(1 for seen in _sessions.values() if seen >= cutoff)
+
+ACTIVE_SESSIONS.set_function(active_session_count)
+
+def render_prometheus() -> str:
+    """Renders every registered metric in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+_server_attempted = False
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Starts the /metrics endpoint once per process; later calls are no-ops"""
+    global _server, _server_attempted
+    with _server_lock:
+        if _server_attempted:
+            return _server
+        _server_attempted = True
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True, name="metrics").start()
+        logger.info(f"Metrics available at http://{host}:{_server.server_address[1]}/metrics")
+        return _server
@@ -0,0 +1,248 @@
+"""Dependency-aware executor for the tailoring pipeline.
+
+Stages declare the stages they depend on and the external inputs they read. A run
+resolves every stage the targets need, starts each one as soon as its dependencies
+are done (independent stages run concurrently) and memoizes every node by its
+input hashes, both in memory (shared by concurrent runs) and in the result store.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from resume_parser.worker_pool import parse_resume
+from resume_parser.parsed_resume import ParsedResume
+from llm_modules.formatter import format_resume_sections_with_llm, formatting_succeeded
+from llm_modules.jd_comparator import compare_resume_with_jd
+from llm_modules.keyword_analyzer import analyze_ats_keywords
+from llm_modules.bullet_rewriter import optimize_resume_bullets
+from llm_modules.cover_letter import generate_cover_letter
+from llm_modules.resume_digest import USE_RESUME_DIGEST, get_resume_digest
+from utils.result_store import get_result, put_result, is_cacheable, hash_payload
+from utils.jd_fingerprint import similar_jd_result
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "8"))
+PIPELINE_MEMO_SIZE = int(os.getenv("PIPELINE_MEMO_SIZE", "256"))
+
+class Stage:
+    """One pipeline node.
+
+    fn is called with keyword arguments named after its dependencies and params.
+    kind/variant_params map the node onto the result store key the pages already use.
+    hooks are optional callbacks taken from the run inputs; they never affect the node key.
+    Every run attached to a node receives its hook calls, see HookFanOut.
+    """
+
+    def __init__(self, name: str, fn: Callable, deps: Tuple[str, ...] = (), params: Tuple[str, ...] = (),
+                 kind: Optional[str] = None, variant_params: Tuple[str, ...] = (), hooks: Tuple[str, ...] = (),
+                 cacheable: Callable[[Any], bool] = is_cacheable,
+                 encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.params = tuple(params)
+        self.kind = kind
+        self.variant_params = tuple(variant_params)
+        self.hooks = tuple(hooks)
+        self.cacheable = cacheable
+        self.encode = encode
+        self.decode = decode
+
+class HookFanOut:
+    """Passes each call of a node's hook on to every run attached to the node.
+
+    A run that attaches while the node is already computing first receives the calls
+    made so far, in order, so it sees the same stream as the run that started it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: List[tuple] = []
+        self._subscribers: List[Callable] = []
+
+    def subscribe(self, callback: Callable) -> None:
+        with self._lock:
+            for args in self._calls:
+                callback(*args)
+            self._subscribers.append(callback)
+
+    def __call__(self, *args) -> None:
+        with self._lock:
+            self._calls.append(args)
+            for callback in self._subscribers:
+                callback(*args)
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage], max_workers: int = PIPELINE_WORKERS, memo_size: int = PIPELINE_MEMO_SIZE):
+        self.stages: Dict[str, Stage] = {stage.name: stage for stage in stages}
+        self.memo_size = memo_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._memo: "OrderedDict[tuple, Future]" = OrderedDict()
+        self._fanouts: Dict[tuple, Dict[str, HookFanOut]] = {}
+        self._lock = threading.Lock()
+
+    def order(self, targets: Iterable[str]) -> List[str]:
+        """Every stage the targets need, dependencies first"""
+        ordered, visiting = [], set()
+
+        def visit(name: str) -> None:
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline cycle through stage '{name}'")
+            if name not in self.stages:
+                raise KeyError(f"Unknown pipeline stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for target in targets:
+            visit(target)
+        return ordered
+
+    def reads_jd(self, name: str) -> bool:
+        stage = self.stages[name]
+        return "jd_text" in stage.params or any(self.reads_jd(dep) for dep in stage.deps)
+
+    def store_key(self, name: str, inputs: Dict[str, Any]) -> Tuple[str, str, str]:
+        """(resume_hash, jd_hash, variant) for a node, matching the keys used across the app"""
+        stage = self.stages[name]
+        jd_hash = inputs["jd_hash"] if self.reads_jd(name) else ""
+        variant = hash_payload([inputs.get(param) for param in stage.variant_params]) if stage.variant_params else ""
+        return inputs["resume_hash"], jd_hash, variant
+
+    def run(self, targets: Iterable[str], inputs: Dict[str, Any], provided: Optional[Dict[str, Any]] = None,
+            progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+        """Runs the targets and everything they need; provided seeds already-known stage results.
+
+        inputs must carry resume_hash and jd_hash alongside the raw params the stages read.
+        Returns the result of every stage that ran or was provided.
+        """
+        results: Dict[str, Any] = dict(provided or {})
+        pending = [name for name in self.order(targets) if name not in results]
+        total = len(pending)
+        running: Dict[Future, str] = {}
+
+        while pending or running:
+            for name in [n for n in pending if all(dep in results for dep in self.stages[n].deps)]:
+                pending.remove(name)
+                running[self._submit(name, inputs, results)] = name
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                if progress is not None:
+                    progress((total - len(pending) - len(running)) / max(1, total), f"Finished {name}")
+        return results
+
+    def _submit(self, name: str, inputs: Dict[str, Any], results: Dict[str, Any]) -> Future:
+        memo_key = (name,) + self.store_key(name, inputs)
+        stage = self.stages[name]
+        started = False
+        with self._lock:
+            future = self._memo.get(memo_key)
+            if future is not None:
+                self._memo.move_to_end(memo_key)
+                fanouts = self._fanouts.get(memo_key, {})
+            else:
+                fanouts = {hook: HookFanOut() for hook in stage.hooks}
+                kwargs = {dep: results[dep] for dep in stage.deps}
+                kwargs.update({param: inputs[param] for param in stage.params})
+                kwargs.update(fanouts)
+                future = self._executor.submit(self._compute, name, memo_key, kwargs)
+                self._memo[memo_key] = future
+                if fanouts:
+                    self._fanouts[memo_key] = fanouts
+                self._evict()
+                started = True
+
+            # Under the lock, so the node cannot finish and drop its fan-outs in between
+            for hook, fanout in fanouts.items():
+                if inputs.get(hook) is not None:
+                    fanout.subscribe(inputs[hook])
+
+        if started:
+            future.add_done_callback(lambda f: self._finished(memo_key, f))
+        return future
+
+    def _compute(self, name: str, memo_key: tuple, kwargs: Dict[str, Any]) -> Any:
+        stage = self.stages[name]
+        resume_hash, jd_hash, variant = memo_key[1:]
+        if stage.kind:
+            stored = get_result(stage.kind, resume_hash, jd_hash, variant)
+            if stored is not None:
+                return stage.decode(stored) if stage.decode else stored
+
+        result = stage.fn(**kwargs)
+        if stage.kind and stage.cacheable(result):
+            put_result(stage.kind, resume_hash, stage.encode(result) if stage.encode else result, jd_hash, variant)
+        return result
+
+    def _finished(self, memo_key: tuple, future: Future) -> None:
+        """Drops the node's hook fan-outs; errors are not memoized so the next run retries them"""
+        failed = future.exception() is not None or not self.stages[memo_key[0]].cacheable(future.result())
+        with self._lock:
+            if self._memo.get(memo_key) is not future:
+                return
+            self._fanouts.pop(memo_key, None)
+            if failed:
+                del self._memo[memo_key]
+
+    def _evict(self) -> None:
+        while len(self._memo) > self.memo_size:
+            oldest_key, oldest = next(iter(self._memo.items()))
+            if not oldest.done():
+                break
+            del self._memo[oldest_key]
+
+def cover_letter_succeeded(letter: str) -> bool:
+    return not letter.startswith("[Error")
+
+def _parse(resume_bytes: bytes) -> ParsedResume:
+    return parse_resume(resume_bytes)
+
+def _format(parsed: ParsedResume) -> dict:
+    return format_resume_sections_with_llm(parsed)
+
+def _digest(parsed: ParsedResume) -> Optional[dict]:
+    # Stored by content rather than upload hash so direct callers of the llm_modules share it
+    return get_resume_digest(parsed)
+
+def _compare(parsed: ParsedResume, jd_text: str, resume_hash: str, jd_hash: str, on_item: Optional[Callable[[str, Any], None]] = None, digest: Optional[dict] = None) -> dict:
+    # The same posting pasted with trivial differences reuses the comparison made for it
+    reused = similar_jd_result("jd_comparison", resume_hash, jd_hash, jd_text)
+    if reused is not None:
+        return reused
+    return compare_resume_with_jd(parsed, jd_text, on_item=on_item, digest=digest)
+
+def _ats(comparison: dict, jd_text: str) -> dict:
+    return analyze_ats_keywords(None, jd_text, jd_analysis=comparison)
+
+def _bullets(formatted: dict, jd_text: str) -> dict:
+    return optimize_resume_bullets(formatted, jd_text)
+
+def _cover_letter(formatted: dict, jd_text: str, candidate_name: str, company_name: str, role_title: str, tone: str, length: str, digest: Optional[dict] = None) -> str:
+    return generate_cover_letter(formatted, jd_text, candidate_name, company_name, role_title, tone, length, digest=digest)
+
+# Stages that prompt with the resume read the shared digest instead when it is enabled
+DIGEST_DEPS = ("digest",) if USE_RESUME_DIGEST else ()
+
+STAGES = [
+    Stage("parsed", _parse, params=("resume_bytes",), kind="parsed",
+          encode=lambda parsed: parsed.to_payload(), decode=ParsedResume.from_payload, cacheable=bool),
+    Stage("formatted", _format, deps=("parsed",), kind="formatted", cacheable=formatting_succeeded),
+    Stage("digest", _digest, deps=("parsed",)),
+    Stage("comparison", _compare, deps=("parsed",) + DIGEST_DEPS, params=("jd_text", "resume_hash", "jd_hash"),
+          kind="jd_comparison", hooks=("on_item",)),
+    Stage("ats", _ats, deps=("comparison",), params=("jd_text",), kind="ats_analysis"),
+    Stage("bullets", _bullets, deps=("formatted",), params=("jd_text",), kind="bullet_optimization"),
+    Stage("cover_letter", _cover_letter, deps=("formatted",) + DIGEST_DEPS,
+          params=("jd_text", "candidate_name", "company_name", "role_title", "tone", "length"),
+          kind="cover_letter", variant_params=("candidate_name", "company_name", "role_title", "tone", "length"),
+          cacheable=cover_letter_succeeded),
+]
+
+pipeline = Pipeline(STAGES)
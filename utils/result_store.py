@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional
+from utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "results.db")
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    kind TEXT NOT NULL,
+    resume_hash TEXT NOT NULL,
+    jd_hash TEXT NOT NULL DEFAULT '',
+    variant TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (kind, resume_hash, jd_hash, variant)
+);
+CREATE INDEX IF NOT EXISTS idx_results_resume ON results (resume_hash, kind);
+CREATE INDEX IF NOT EXISTS idx_results_jd ON results (jd_hash, kind);
+CREATE TABLE IF NOT EXISTS jd_line_sets (
+    jd_hash TEXT PRIMARY KEY,
+    lines_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jd_line_sets_lines ON jd_line_sets (lines_hash);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+def get_connection() -> sqlite3.Connection:
+    """Returns this thread's connection to the result store, creating the schema on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(RESULT_STORE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(RESULT_STORE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+def hash_bytes(data: bytes) -> str:
+    """Returns the SHA-256 hex digest of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def hash_text(text: str) -> str:
+    """Hashes text after collapsing whitespace so trivial spacing changes share a key"""
+    normalized = " ".join((text or "").split())
+    return hash_bytes(normalized.encode("utf-8"))
+
+def hash_payload(payload: Any) -> str:
+    """Hashes any JSON-serializable value, e.g. a sections dict or a set of options"""
+    return hash_bytes(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"))
+
+def get_result(kind: str, resume_hash: str, jd_hash: str = "", variant: str = "") -> Optional[Any]:
+    """Looks up a stored result, returning None when it has not been computed yet"""
+    try:
+        row = get_connection().execute(
+            "SELECT payload FROM results WHERE kind = ? AND resume_hash = ? AND jd_hash = ? AND variant = ?",
+            (kind, resume_hash, jd_hash, variant)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Result store lookup failed: {e}")
+        return None
+    record_cache(f"result_store:{kind}", row is not None)
+    return json.loads(row[0]) if row else None
+
+def put_result(kind: str, resume_hash: str, payload: Any, jd_hash: str = "", variant: str = "") -> None:
+    """Stores a computed result, replacing any previous one with the same key"""
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (kind, resume_hash, jd_hash, variant, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, resume_hash, jd_hash, variant, json.dumps(payload), time.time())
+            )
+    except (sqlite3.Error, TypeError) as e:
+        logger.warning(f"Result store write failed for {kind}: {e}")
+
+def list_resume_hashes(kind: str) -> List[str]:
+    """Resume hashes with a stored result of this kind, e.g. every parsed resume"""
+    try:
+        rows = get_connection().execute(
+            "SELECT DISTINCT resume_hash FROM results WHERE kind = ? ORDER BY resume_hash", (kind,)
+        ).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Result store listing failed: {e}")
+        return []
+    return [row[0] for row in rows]
+
+def is_cacheable(result: Any) -> bool:
+    """Error results are never stored so they get recomputed next time"""
+    if not result:
+        return False
+    if isinstance(result, dict) and "error" in result:
+        return False
+    return True
+
+def get_or_compute(kind: str, compute: Callable[[], Any], resume_hash: str, jd_hash: str = "", variant: str = "", cacheable: Callable[[Any], bool] = is_cacheable) -> Any:
+    """Returns the stored result for a key or computes and stores it"""
+    cached = get_result(kind, resume_hash, jd_hash, variant)
+    if cached is not None:
+        return cached
+
+    result = compute()
+    if cacheable(result):
+        put_result(kind, resume_hash, result, jd_hash, variant)
+    return result
+
+def save_job(job: dict) -> None:
+    """Persists a background job record"""
+    try:
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, payload, updated_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), time.time())
+            )
+    except (sqlite3.Error, TypeError) as e:
+        logger.warning(f"Could not persist job {job.get('id')}: {e}")
+
+def load_job(job_id: str) -> Optional[dict]:
+    """Reads a persisted background job record"""
+    try:
+        row = get_connection().execute("SELECT payload FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Could not load job {job_id}: {e}")
+        return None
+    return json.loads(row[0]) if row else None
@@ -0,0 +1,216 @@
+"""Bounded per-session memory for the Streamlit UI.
+
+Large values (parsed and formatted resume, JD, analyses, cover letters) live in the
+artifact store and session state only keeps their references. Every rerun reports
+the session's footprint here; sessions idle for SESSION_IDLE_TIMEOUT are evicted
+(their artifact references and large state values deleted), and a periodic sweep
+prunes process-wide leftovers by age: finished job records, rate-limit windows and
+artifacts no tracked session references.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.admission import controller as admission
+from utils.artifact_store import ArtifactMissing, put_artifact, get_artifact, artifact_size, cache_bytes, prune_artifacts
+from utils.job_queue import prune_finished_jobs
+from utils.metrics import (
+    touch_session, SESSION_STATE_BYTES, SESSION_STATE_MAX_BYTES, SESSION_ARTIFACT_BYTES, ARTIFACT_CACHE_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+# State values at least this large are deleted when their session is evicted
+SESSION_EVICT_KEY_BYTES = int(os.getenv("SESSION_EVICT_KEY_BYTES", "4096"))
+
+REFS_KEY = "artifact_refs"
+_MISSING = object()
+_INTERNAL_FIELDS = ("refs", "handle", "large_keys")
+
+_lock = threading.Lock()
+_sessions: Dict[str, dict] = {}
+_last_sweep = 0.0
+
+class SessionArtifacts:
+    """Dict-like view of one session's large values, stored off-heap in the artifact store.
+
+    codecs maps a name to (encode, decode) for values that are not plain JSON.
+    Returned values may be shared with other sessions; assign a new value instead of mutating one.
+    """
+
+    def __init__(self, state, codecs: Optional[Dict[str, Tuple[Callable, Callable]]] = None):
+        self.state = state
+        self.codecs = codecs or {}
+
+    def _refs(self) -> Dict[str, str]:
+        if REFS_KEY not in self.state:
+            self.state[REFS_KEY] = {}
+        return self.state[REFS_KEY]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        ref = self._refs().get(name)
+        if ref is None:
+            return default
+        decode = self.codecs[name][1] if name in self.codecs else None
+        try:
+            return get_artifact(ref, decode)
+        except ArtifactMissing:
+            logger.warning(f"Artifact {name} ({ref}) was pruned; dropping the reference")
+            self._refs().pop(name, None)
+            return default
+
+    def __getitem__(self, name: str) -> Any:
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if value is None:
+            self.discard(name)
+            return
+        encode = self.codecs[name][0] if name in self.codecs else None
+        self._refs()[name] = put_artifact(encode(value) if encode else value)
+
+    def ref(self, name: str) -> Optional[str]:
+        """Content hash of the stored value, usable as a cache key for values derived from it"""
+        return self._refs().get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._refs()
+
+    def discard(self, name: str) -> None:
+        self._refs().pop(name, None)
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for name, value in values.items():
+            self[name] = value
+
+def estimate_size(value: Any) -> int:
+    """Approximate bytes a session state value keeps alive"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if getattr(value, "size", None) is not None and isinstance(value.size, int):
+        return value.size
+    if isinstance(value, (dict, list, tuple)):
+        try:
+            return len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            pass
+    return sys.getsizeof(value)
+
+def track_session(session_id: str, state, handle=None) -> dict:
+    """Records a rerun: last activity, bytes held in session state and artifacts referenced.
+
+    handle is the same state reachable from other threads (st.session_state only resolves
+    inside the session's own script run); eviction deletes the session's large keys through it.
+    """
+    refs = dict(state.get(REFS_KEY, {}))
+    sizes = {key: estimate_size(value) for key, value in state.items()}
+    entry = {
+        "last_seen": time.time(),
+        "refs": set(refs.values()),
+        "state_bytes": sum(sizes.values()),
+        "artifact_bytes": sum(artifact_size(ref) for ref in refs.values()),
+        "artifacts": len(refs),
+        "handle": handle,
+        "large_keys": [key for key, size in sizes.items() if key == REFS_KEY or size >= SESSION_EVICT_KEY_BYTES],
+    }
+    with _lock:
+        _sessions[session_id] = entry
+    touch_session(session_id)
+    maybe_sweep()
+    return entry
+
+def session_memory_report() -> List[dict]:
+    """Per-session footprint, largest first"""
+    with _lock:
+        report = [
+            dict({key: value for key, value in entry.items() if key not in _INTERNAL_FIELDS}, session_id=session_id)
+            for session_id, entry in _sessions.items()
+        ]
+    return sorted(report, key=lambda entry: entry["state_bytes"] + entry["artifact_bytes"], reverse=True)
+
+def live_artifact_refs() -> set:
+    """Artifact refs held by the sessions still tracked"""
+    with _lock:
+        return set().union(*(entry["refs"] for entry in _sessions.values()))
+
+def evict_idle_sessions(idle_timeout: float = SESSION_IDLE_TIMEOUT) -> List[str]:
+    """Evicts sessions idle for idle_timeout: untracks them and deletes their large state.
+
+    The artifact references and every value of at least SESSION_EVICT_KEY_BYTES are removed,
+    so the artifacts only they referenced become prunable; a returning session starts over
+    from the upload. Sessions tracked without a handle are only untracked.
+    """
+    cutoff = time.time() - idle_timeout
+    with _lock:
+        idle = {
+            session_id: _sessions.pop(session_id)
+            for session_id in [session_id for session_id, entry in _sessions.items() if entry["last_seen"] < cutoff]
+        }
+    for entry in idle.values():
+        _release_state(entry)
+    return list(idle)
+
+def _release_state(entry: dict) -> None:
+    handle = entry["handle"]
+    if handle is None:
+        return
+    for key in entry["large_keys"]:
+        try:
+            del handle[key]
+        except KeyError:
+            pass
+
+def sweep() -> None:
+    """Evicts idle sessions and prunes stale process-wide state"""
+    evicted = evict_idle_sessions()
+    jobs = prune_finished_jobs()
+    windows = admission.prune_rate_windows()
+    artifacts = prune_artifacts(keep=live_artifact_refs())
+    if evicted or jobs or artifacts:
+        logger.info(
+            f"Session sweep: {len(evicted)} idle sessions evicted, {jobs} finished jobs, "
+            f"{windows} rate-limit windows, {artifacts} stale artifacts released"
+        )
+
+def maybe_sweep() -> None:
+    """Starts a background sweep at most once per SESSION_SWEEP_INTERVAL"""
+    global _last_sweep
+    now = time.time()
+    with _lock:
+        if now - _last_sweep < SESSION_SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+    threading.Thread(target=_sweep_safely, daemon=True, name="session-sweep").start()
+
+def _sweep_safely() -> None:
+    try:
+        sweep()
+    except Exception:
+        logger.exception("Session sweep failed")
+
+def _state_bytes_total() -> int:
+    with _lock:
+        return sum(entry["state_bytes"] for entry in _sessions.values())
+
+def _state_bytes_max() -> int:
+    with _lock:
+        return max((entry["state_bytes"] for entry in _sessions.values()), default=0)
+
+def _artifact_bytes_total() -> int:
+    with _lock:
+        return sum(entry["artifact_bytes"] for entry in _sessions.values())
+
+SESSION_STATE_BYTES.set_function(_state_bytes_total)
+SESSION_STATE_MAX_BYTES.set_function(_state_bytes_max)
+SESSION_ARTIFACT_BYTES.set_function(_artifact_bytes_total)
+ARTIFACT_CACHE_BYTES.set_function(cache_bytes)
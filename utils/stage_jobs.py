@@ -0,0 +1,123 @@
+import json
+from typing import Dict, List, Optional, Tuple
+from llm_modules.cover_letter import generate_cover_letter_variants, variant_key
+from llm_modules.resume_digest import USE_RESUME_DIGEST
+from utils.admission import AdmissionRejected
+from utils.job_queue import submit_job, cancel_job, update_progress, partial_reporter
+from utils.pipeline import pipeline
+from utils.result_store import put_result, hash_payload, is_cacheable
+
+def job_key(*parts) -> str:
+    """Builds a stable job key from the stage inputs"""
+    return json.dumps(parts, sort_keys=True, default=str)
+
+def run_comparison(parsed: dict, jd_text: str, resume_hash: str, jd_hash: str) -> dict:
+    """Runs the resume vs JD comparison node, shared with any ATS run on the same inputs.
+
+    Matched skills and gaps are published on the job as they stream in.
+    """
+    inputs = {"jd_text": jd_text, "resume_hash": resume_hash, "jd_hash": jd_hash, "on_item": partial_reporter()}
+    return pipeline.run(["comparison"], inputs, provided={"parsed": parsed})["comparison"]
+
+def run_ats_stages(parsed: dict, formatted: dict, jd_text: str, resume_hash: str, jd_hash: str) -> dict:
+    """Runs bullet optimization and the comparison feeding the ATS score concurrently as one background job"""
+    update_progress(0.1, "Optimizing resume bullets and analyzing ATS keywords...")
+    inputs = {"jd_text": jd_text, "resume_hash": resume_hash, "jd_hash": jd_hash}
+    results = pipeline.run(
+        ["bullets", "ats"], inputs,
+        provided={"parsed": parsed, "formatted": formatted},
+        progress=lambda fraction, message: update_progress(0.1 + 0.9 * fraction, message)
+    )
+    return {"bullet_optimization_result": results["bullets"], "ats_analysis_result": results["ats"]}
+
+def ats_report_complete(result: dict) -> bool:
+    """Neither stage of the ATS job returned an error"""
+    return all(is_cacheable(stage_result) for stage_result in result.values())
+
+def cover_letter_variant_hash(name: str, company: str, role: str, tone: str, length: str) -> str:
+    """Result store variant for one cover letter"""
+    return hash_payload([name, company, role, tone, length])
+
+def run_cover_letters(parsed: dict, formatted: dict, jd_text: str, name: str, company: str, role: str, variants: List[Tuple[str, str]], resume_hash: str, jd_hash: str) -> Dict[str, str]:
+    """Generates the requested cover letter variants and stores the successful ones.
+
+    The resume digest node is shared with the comparison, so each resume is digested once.
+    """
+    digest = None
+    if USE_RESUME_DIGEST:
+        update_progress(0.05, "Summarizing resume...")
+        inputs = {"resume_hash": resume_hash, "jd_hash": jd_hash}
+        digest = pipeline.run(["digest"], inputs, provided={"parsed": parsed})["digest"]
+    update_progress(0.1, f"Generating {len(variants)} cover letter variant(s)...")
+    letters = generate_cover_letter_variants(
+        formatted_resume=formatted, job_description=jd_text,
+        candidate_name=name, company_name=company, role_title=role, variants=variants, digest=digest
+    )
+    for tone, length in variants:
+        letter = letters[variant_key(tone, length)]
+        if not letter.startswith("[Error"):
+            put_result(
+                "cover_letter", resume_hash, letter, jd_hash,
+                variant=cover_letter_variant_hash(name, company, role, tone, length)
+            )
+    return letters
+
+def cover_letters_complete(letters: Dict[str, str]) -> bool:
+    """Every requested variant was generated"""
+    return bool(letters) and not any(letter.startswith("[Error") for letter in letters.values())
+
+def submit_comparison(parsed: dict, jd_text: str, resume_hash: str, jd_hash: str, owner: Optional[Tuple[str, str]] = None) -> str:
+    """Queues the comparison stage; identical inputs attach to the same job"""
+    return submit_job(
+        "jd_comparison",
+        run_comparison,
+        args=(parsed, jd_text, resume_hash, jd_hash),
+        key=job_key(resume_hash, jd_hash),
+        owner=owner
+    )
+
+def submit_ats_report(parsed: dict, formatted: dict, jd_text: str, resume_hash: str, jd_hash: str, owner: Optional[Tuple[str, str]] = None) -> str:
+    """Queues the bullet optimization and ATS stages; identical inputs attach to the same job"""
+    return submit_job(
+        "ats_report",
+        run_ats_stages,
+        args=(parsed, formatted, jd_text, resume_hash, jd_hash),
+        key=job_key(resume_hash, jd_hash),
+        owner=owner,
+        cacheable=ats_report_complete
+    )
+
+def submit_cover_letters(parsed: dict, formatted: dict, jd_text: str, name: str, company: str, role: str, variants: List[Tuple[str, str]], resume_hash: str, jd_hash: str, owner: Optional[Tuple[str, str]] = None) -> str:
+    """Queues cover letter generation; identical requests attach to the same job"""
+    return submit_job(
+        "cover_letter",
+        run_cover_letters,
+        args=(parsed, formatted, jd_text, name, company, role, variants, resume_hash, jd_hash),
+        key=job_key(resume_hash, jd_hash, name, company, role, variants),
+        owner=owner,
+        cacheable=cover_letters_complete
+    )
+
+def start_prefetch(parsed: dict, formatted: dict, jd_text: str, resume_hash: str, jd_hash: str, owner: Optional[Tuple[str, str]] = None) -> Dict[str, str]:
+    """Speculatively starts every analysis stage so the pages can attach to the results.
+
+    Raises AdmissionRejected when the owner's line is full; stages already queued are cancelled.
+    """
+    prefetch = {"inputs": job_key(resume_hash, jd_hash)}
+    try:
+        prefetch["jd_comparison_job"] = submit_comparison(parsed, jd_text, resume_hash, jd_hash, owner)
+        prefetch["ats_job"] = submit_ats_report(parsed, formatted, jd_text, resume_hash, jd_hash, owner)
+    except AdmissionRejected:
+        cancel_prefetch(prefetch, owner)
+        raise
+    return prefetch
+
+def cancel_prefetch(prefetch: Dict[str, str], owner: Optional[Tuple[str, str]] = None) -> None:
+    """Cancels in-flight prefetch jobs, e.g. when the resume or JD changes.
+
+    Jobs are shared by everyone who submitted the same inputs, so with an owner a job is
+    only cancelled once no other owner is still attached to it.
+    """
+    for name, job_id in prefetch.items():
+        if name.endswith("_job"):
+            cancel_job(job_id, owner)
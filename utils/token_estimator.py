@@ -0,0 +1,15 @@
+import re
+
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimates GPT token count locally from word, number and punctuation runs"""
+    if not text:
+        return 0
+    pieces = re.findall(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]", text)
+    long_word_extra = sum(len(p) // 8 for p in pieces if len(p) > 8)
+    return max(len(pieces) + long_word_extra, len(text) // CHARS_PER_TOKEN)
+
+def estimate_messages_tokens(messages: list) -> int:
+    """Estimates prompt tokens for a chat message list, including per-message overhead"""
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in messages) + 3